@@ -0,0 +1,209 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Per-event latency budgets for hooks, enforced by _trace.py's run wrapper.
+
+Claude Code runs the hooks matching one event in parallel, so an event
+costs as much as its slowest hook. Each event gets a budget; each hook gets
+a timeout no larger than its event's budget, and a policy for when it
+overruns:
+
+    open     the hook is killed and treated as "no decision" (exit 0)
+    closed   the hook is killed and the action is blocked (exit 2, with
+             the reason on stderr) - for guards whose silence must not
+             read as approval
+
+Config (JSON), first found of $CLAUDE_HOOK_BUDGETS,
+$CLAUDE_PROJECT_DIR/.claude/hook-budgets.json, ~/.claude/hook-budgets.json;
+entries override DEFAULT_BUDGETS key by key:
+
+    {
+      "events": {"PreToolUse": {"budget_ms": 1500, "policy": "open"}},
+      "hooks": {"dangerous-command-blocker": {"timeout_ms": 500, "policy": "closed"}}
+    }
+
+CLAUDE_HOOK_BUDGETS=off disables enforcement.
+
+Every overrun is counted in ~/.claude/cache/hook-budget-violations.json
+(per event/hook: count, policy, worst and last duration).
+
+Usage:
+    _budget.py show                  # Effective limits per event and configured hook
+    _budget.py violations [--json]
+    _budget.py reset
+"""
+
+import fcntl
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get("CLAUDE_CACHE_DIR", Path.home() / ".claude" / "cache"))
+VIOLATIONS_FILE = CACHE_DIR / "hook-budget-violations.json"
+POLICIES = ("open", "closed")
+
+DEFAULT_BUDGETS = {
+    "events": {
+        # Runs before every tool call: the user waits on it
+        "PreToolUse": {"budget_ms": 2000, "policy": "open"},
+        "UserPromptSubmit": {"budget_ms": 1000, "policy": "open"},
+        "PostToolUse": {"budget_ms": 10000, "policy": "open"},
+        "Notification": {"budget_ms": 5000, "policy": "open"},
+        "SessionStart": {"budget_ms": 10000, "policy": "open"},
+        "Stop": {"budget_ms": 10000, "policy": "open"},
+        "SubagentStop": {"budget_ms": 10000, "policy": "open"},
+        "PreCompact": {"budget_ms": 10000, "policy": "open"},
+        "SessionEnd": {"budget_ms": 10000, "policy": "open"},
+    },
+    "hooks": {
+        "dangerous-command-blocker": {"policy": "closed"},
+        "security-check": {"policy": "closed"},
+        # Cold language servers take seconds; the pool keeps warming in the background
+        "lsp-reference-checker": {"timeout_ms": 1000, "policy": "open"},
+    },
+}
+FALLBACK = {"budget_ms": 60000, "policy": "open"}  # events not listed: Claude Code's own default timeout
+
+
+@dataclass
+class Limit:
+    event: str
+    hook: str
+    timeout_ms: int
+    policy: str  # "open" or "closed"
+
+    @property
+    def exit_code(self) -> int:
+        """Exit code the wrapper reports for a hook killed at this limit."""
+        return 2 if self.policy == "closed" else 0
+
+    def message(self, elapsed_ms: float) -> str:
+        outcome = "blocking (fail-closed)" if self.policy == "closed" else "continuing without it (fail-open)"
+        return (f"hook {self.hook} exceeded its {self.timeout_ms} ms {self.event} budget "
+                f"({elapsed_ms:.0f} ms); {outcome}")
+
+
+def enabled() -> bool:
+    return os.environ.get("CLAUDE_HOOK_BUDGETS", "").lower() not in ("off", "0", "false")
+
+
+def config_source() -> tuple[str, dict]:
+    """(origin, config) with the first config file found merged over DEFAULT_BUDGETS."""
+    candidates = [os.environ.get("CLAUDE_HOOK_BUDGETS")]
+    project = os.environ.get("CLAUDE_PROJECT_DIR")
+    if project:
+        candidates.append(str(Path(project) / ".claude" / "hook-budgets.json"))
+    candidates.append(str(Path.home() / ".claude" / "hook-budgets.json"))
+    config = {section: {k: dict(v) for k, v in entries.items()} for section, entries in DEFAULT_BUDGETS.items()}
+    for candidate in filter(None, candidates):
+        try:
+            loaded = json.loads(Path(candidate).read_text())
+        except OSError:
+            continue
+        except ValueError as e:
+            print(f"hook budgets: invalid JSON in {candidate} ({e}); using defaults", file=sys.stderr)
+            return "<default>", config
+        for section in ("events", "hooks"):
+            for name, entry in (loaded.get(section) or {}).items():
+                if isinstance(entry, dict):
+                    config[section].setdefault(name, {}).update(entry)
+        return candidate, config
+    return "<default>", config
+
+
+def limit_for(event: str | None, hook: str, config: dict | None = None) -> Limit:
+    """Timeout and policy for hook when it runs for event (event may be unknown)."""
+    if config is None:
+        config = config_source()[1]
+    event = event or "unknown"
+    event_entry = config["events"].get(event, FALLBACK)
+    hook_entry = config["hooks"].get(hook, {})
+    budget = int(event_entry.get("budget_ms", FALLBACK["budget_ms"]))
+    timeout = min(int(hook_entry.get("timeout_ms", budget)), budget)
+    policy = hook_entry.get("policy") or event_entry.get("policy") or "open"
+    return Limit(event, hook, timeout, policy if policy in POLICIES else "open")
+
+
+# ============================================================
+# VIOLATION COUNTERS
+# ============================================================
+
+
+def count_violation(limit: Limit, elapsed_ms: float, path: Path = VIOLATIONS_FILE):
+    """Add one overrun to the per event/hook counters (read-modify-write under a flock)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        raw = b""
+        while chunk := os.read(fd, 65536):
+            raw += chunk
+        try:
+            counters = json.loads(raw or b"{}")
+        except ValueError:
+            counters = {}
+        entry = counters.setdefault(f"{limit.event}/{limit.hook}", {"count": 0, "worst_ms": 0})
+        entry["count"] += 1
+        entry["policy"] = limit.policy
+        entry["timeout_ms"] = limit.timeout_ms
+        entry["worst_ms"] = max(entry["worst_ms"], round(elapsed_ms, 1))
+        entry["last_ms"] = round(elapsed_ms, 1)
+        entry["last_ts"] = round(time.time(), 3)
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, json.dumps(counters, indent=2, sort_keys=True).encode(), 0)
+    finally:
+        os.close(fd)
+
+
+def violations(path: Path = VIOLATIONS_FILE) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "show"
+
+    if command == "show":
+        origin, config = config_source()
+        print(f"Budgets: {origin}{'' if enabled() else ' (enforcement off)'}")
+        for event in config["events"]:
+            limit = limit_for(event, "*", config)
+            print(f"  {event:<18} {limit.timeout_ms:>6} ms  fail-{limit.policy}")
+        for hook, entry in sorted(config["hooks"].items()):
+            timeout = f"{entry['timeout_ms']} ms" if "timeout_ms" in entry else "event budget"
+            print(f"  {hook:<30} {timeout:>12}  fail-{entry.get('policy', 'open (event)')}")
+        return 0
+
+    if command == "violations":
+        counters = violations()
+        if "--json" in args:
+            print(json.dumps(counters, indent=2))
+            return 0
+        if not counters:
+            print("No budget violations recorded")
+            return 0
+        for key, entry in sorted(counters.items(), key=lambda kv: -kv[1]["count"]):
+            stamp = time.strftime("%m-%d %H:%M", time.localtime(entry.get("last_ts", 0)))
+            print(f"  {entry['count']:>5}x  {key:<45} limit {entry.get('timeout_ms')} ms, "
+                  f"worst {entry['worst_ms']:.0f} ms, fail-{entry.get('policy')}, last {stamp}")
+        return 0
+
+    if command == "reset":
+        VIOLATIONS_FILE.unlink(missing_ok=True)
+        return 0
+
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Option parsing shared by the hook helpers' command lines.
+
+    args = sys.argv[1:]
+    jobs = option(args, "--jobs", 4, int)   # removes "--jobs N" from args
+    as_json = "--json" in args              # flags stay membership tests
+
+Whatever is left in args afterwards is positional. A missing or
+unconvertible value exits with status 2 and a one-line error, as argparse
+would.
+"""
+
+import sys
+
+
+def _usage_error(message: str):
+    print(message, file=sys.stderr)
+    sys.exit(2)
+
+
+def option(args: list[str], name: str, default=None, convert=str):
+    """Remove `name VALUE` from args and return convert(VALUE), or default if name is absent."""
+    if name not in args:
+        return default
+    idx = args.index(name)
+    if idx + 1 >= len(args):
+        _usage_error(f"{name}: expected a value")
+    value = args[idx + 1]
+    del args[idx:idx + 2]
+    try:
+        return convert(value)
+    except ValueError:
+        _usage_error(f"{name}: invalid value {value!r}")
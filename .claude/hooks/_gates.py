@@ -0,0 +1,442 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Quality-gate engine for task-completed-gate and teammate-idle-gate.
+
+Discovers the checks a repo defines, runs independent ones in parallel,
+stops at the first blocking failure and caches results by a hash of the
+worktree's contents, so an unchanged tree never rebuilds.
+
+Checks come from .claude/gates.json when present:
+
+    {"checks": [
+      {"name": "build", "run": "npm run build", "timeout": 600},
+      {"name": "test", "run": "npm test", "after": ["build"]},
+      {"name": "lint", "run": "ruff check .", "blocking": false,
+       "events": ["TaskCompleted", "TeammateIdle"]}
+    ]}
+
+otherwise from the project files (package.json lint/typecheck/build
+scripts, Makefile lint/build targets, ruff config in pyproject.toml,
+Cargo.toml, go.mod). "after" orders dependent checks; everything else runs
+concurrently. A check applies to the events in "events" (default:
+TaskCompleted).
+
+Tree hash: the current index is copied to a temp GIT_INDEX_FILE, tracked
+changes are added to it and `git write-tree` names the result; untracked,
+non-ignored files are hashed without being written to the object store
+(`git hash-object --stdin-paths`) and folded into the key. Results live
+under the repo's common git dir (claude-gates/<key>.json), shared by every
+teammate and worktree; a per-key lock makes concurrent callers wait for the
+first run and reuse it. Passes are cached; failures only for
+FAIL_CACHE_SECONDS, so a fix outside the tree (an installed tool, a service
+coming back) is picked up; timeouts and launch errors are not cached.
+
+Usage:
+    _gates.py [--event TaskCompleted] [--root DIR] [--jobs N] [--no-cache]
+    _gates.py --list [--event E]     # Discovered checks
+    _gates.py --hook                 # Hook mode: event and cwd from stdin JSON;
+                                     # exit 2 with feedback on blocking failure
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from _git_state import find_git_dirs  # noqa: E402
+from _cli import option  # noqa: E402
+
+DEFAULT_EVENT = "TaskCompleted"
+DEFAULT_TIMEOUT = 300
+OUTPUT_TAIL = 2000
+CACHE_MAX_AGE = 7 * 24 * 3600
+FAIL_CACHE_SECONDS = 120
+
+
+@dataclass
+class Check:
+    name: str
+    run: str
+    blocking: bool = True
+    after: list[str] = field(default_factory=list)
+    timeout: int = DEFAULT_TIMEOUT
+    events: list[str] = field(default_factory=lambda: [DEFAULT_EVENT])
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.name}\0{self.run}"
+
+
+@dataclass
+class Result:
+    name: str
+    status: str  # pass | fail | timeout | error | skipped
+    seconds: float = 0.0
+    output: str = ""
+    cached: bool = False
+    blocking: bool = True
+
+
+# ============================================================
+# DISCOVERY
+# ============================================================
+
+
+def _package_runner(root: Path) -> str:
+    if (root / "pnpm-lock.yaml").exists():
+        return "pnpm run"
+    if (root / "yarn.lock").exists():
+        return "yarn run"
+    if (root / "bun.lockb").exists() or (root / "bun.lock").exists():
+        return "bun run"
+    return "npm run"
+
+
+def _make_targets(makefile: Path) -> set[str]:
+    try:
+        text = makefile.read_text(errors="ignore")
+    except OSError:
+        return set()
+    return set(re.findall(r"^([A-Za-z0-9_.-]+)\s*:(?!=)", text, re.MULTILINE))
+
+
+def discover_checks(root: Path) -> list[Check]:
+    """Checks from .claude/gates.json, else inferred from the project files."""
+    config = root / ".claude" / "gates.json"
+    if config.exists():
+        data = json.loads(config.read_text())
+        return [
+            Check(
+                name=c["name"],
+                run=c["run"],
+                blocking=c.get("blocking", True),
+                after=list(c.get("after", [])),
+                timeout=int(c.get("timeout", DEFAULT_TIMEOUT)),
+                events=list(c.get("events", [DEFAULT_EVENT])),
+            )
+            for c in data.get("checks", [])
+        ]
+
+    checks: list[Check] = []
+    package_json = root / "package.json"
+    if package_json.exists():
+        try:
+            scripts = json.loads(package_json.read_text()).get("scripts", {})
+        except (OSError, ValueError):
+            scripts = {}
+        runner = _package_runner(root)
+        for script in ("lint", "typecheck", "build"):
+            if script in scripts:
+                checks.append(Check(script, f"{runner} {script}"))
+
+    targets = _make_targets(root / "Makefile")
+    for target in ("lint", "build"):
+        if target in targets and not any(c.name == target for c in checks):
+            checks.append(Check(target, f"make {target}"))
+
+    pyproject = root / "pyproject.toml"
+    if pyproject.exists() and "[tool.ruff" in pyproject.read_text(errors="ignore"):
+        if not any(c.name == "lint" for c in checks):
+            ruff = "ruff" if shutil.which("ruff") else "uvx ruff"
+            checks.append(Check("ruff", f"{ruff} check ."))
+
+    if (root / "Cargo.toml").exists():
+        checks.append(Check("cargo-check", "cargo check --quiet"))
+    if (root / "go.mod").exists():
+        checks.append(Check("go-vet", "go vet ./..."))
+
+    return checks
+
+
+# ============================================================
+# TREE HASH + CACHE
+# ============================================================
+
+
+def _git(root: Path, *args: str, env: dict | None = None) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=root, capture_output=True, text=True, check=True, timeout=60, env=env,
+    ).stdout.strip()
+
+
+def _untracked(root: Path) -> list[tuple[str, str]]:
+    """(path, blob id) for untracked, non-ignored files; hashed, never written."""
+    listed = subprocess.run(
+        ["git", "ls-files", "-z", "--others", "--exclude-standard", "--", "."], cwd=root,
+        capture_output=True, text=True, check=True, timeout=60,
+    ).stdout.split("\0")
+    # Nested repositories are listed as "dir/": keyed by path only
+    files = [p for p in listed if p and not p.endswith("/")]
+    hashed = subprocess.run(
+        ["git", "hash-object", "--stdin-paths"], cwd=root, input="\n".join(files),
+        capture_output=True, text=True, check=True, timeout=60,
+    ).stdout.split() if files else []
+    return sorted(zip(files, hashed)) + [(p, "") for p in listed if p.endswith("/")]
+
+
+def worktree_tree_hash(root: Path) -> str | None:
+    """Cache key for the worktree as it is now, without touching the real index or
+    writing objects for untracked files."""
+    dirs = find_git_dirs(root)
+    if dirs is None:
+        return None
+    index = dirs[1] / "index"
+    try:
+        with tempfile.TemporaryDirectory(prefix="claude-gates-") as tmp:
+            tmp_index = Path(tmp) / "index"
+            if index.exists():
+                # Reuse the index's stat data so unchanged files are not re-hashed
+                shutil.copyfile(index, tmp_index)
+            env = {**os.environ, "GIT_INDEX_FILE": str(tmp_index)}
+            _git(root, "add", "-u", ".", env=env)
+            tree = _git(root, "write-tree", env=env)
+        untracked = _untracked(root)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if not untracked:
+        return tree
+    digest = hashlib.sha1(tree.encode())
+    for path, blob in untracked:
+        digest.update(f"\0{path}\0{blob}".encode())
+    return digest.hexdigest()
+
+
+def _cache_dir(root: Path) -> Path | None:
+    dirs = find_git_dirs(root)
+    return dirs[2] / "claude-gates" if dirs else None
+
+
+def _load_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _reusable(entry: dict, now: float) -> bool:
+    """Passes hold for the tree's lifetime, failures for FAIL_CACHE_SECONDS."""
+    return entry.get("status") == "pass" or now - entry.get("at", 0) < FAIL_CACHE_SECONDS
+
+
+def _store_cache(path: Path, cache: dict):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(cache))
+    tmp.replace(path)
+    # Drop results for trees nobody has looked at in a week
+    cutoff = time.time() - CACHE_MAX_AGE
+    for old in path.parent.glob("*.json"):
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+                old.with_suffix(".lock").unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+# ============================================================
+# EXECUTION
+# ============================================================
+
+
+def _start(check: Check, root: Path) -> subprocess.Popen:
+    # New session so a stop-on-failure can kill the whole process group
+    return subprocess.Popen(
+        check.run, shell=True, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, errors="replace", start_new_session=True,
+    )
+
+
+def _kill(proc: subprocess.Popen):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _run_one(check: Check, root: Path, procs: dict, stop: threading.Event) -> Result:
+    start = time.monotonic()
+    if stop.is_set():
+        return Result(check.name, "skipped", blocking=check.blocking)
+    try:
+        proc = _start(check, root)
+    except OSError as e:
+        return Result(check.name, "error", 0.0, str(e), blocking=check.blocking)
+    procs[check.name] = proc
+    if stop.is_set():
+        # Raced with a blocking failure elsewhere
+        _kill(proc)
+    try:
+        output, _ = proc.communicate(timeout=check.timeout)
+        status = "pass" if proc.returncode == 0 else "fail"
+    except subprocess.TimeoutExpired:
+        _kill(proc)
+        output, _ = proc.communicate()
+        status = "timeout"
+    finally:
+        procs.pop(check.name, None)
+    return Result(check.name, status, time.monotonic() - start, (output or "")[-OUTPUT_TAIL:], blocking=check.blocking)
+
+
+def execute(checks: list[Check], root: Path, cached: dict, jobs: int) -> list[Result]:
+    """Run checks respecting `after`, in parallel, stopping at the first blocking failure."""
+    by_name = {c.name: c for c in checks}
+    results: dict[str, Result] = {}
+    for name, entry in cached.items():
+        if name in by_name:
+            results[name] = Result(name, entry["status"], entry["seconds"], entry["output"],
+                                   cached=True, blocking=by_name[name].blocking)
+
+    def failed_blocking() -> bool:
+        return any(r.blocking and r.status != "pass" and r.status != "skipped" for r in results.values())
+
+    pending = [c for c in checks if c.name not in results]
+    procs: dict[str, subprocess.Popen] = {}
+    stop = threading.Event()
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while (pending or running) and not failed_blocking():
+            ready = [
+                c for c in pending
+                if all(results.get(dep, Result(dep, "")).status == "pass" or dep not in by_name for dep in c.after)
+            ]
+            blocked = [
+                c for c in pending
+                if any(dep in results and results[dep].status != "pass" for dep in c.after)
+            ]
+            for check in blocked:
+                pending.remove(check)
+                results[check.name] = Result(check.name, "skipped", output="dependency did not pass",
+                                             blocking=check.blocking)
+            # Submit no more than can run now, so checks not yet started can still be skipped
+            for check in ready[:max(0, jobs - len(running))]:
+                pending.remove(check)
+                running[pool.submit(_run_one, check, root, procs, stop)] = check
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                check = running.pop(future)
+                results[check.name] = future.result()
+
+        if failed_blocking():
+            stop.set()
+            for proc in list(procs.values()):
+                _kill(proc)
+            for future, check in running.items():
+                result = future.result()
+                results[check.name] = Result(check.name, "skipped", result.seconds,
+                                             "stopped after a blocking failure", blocking=check.blocking)
+            for check in pending:
+                results[check.name] = Result(check.name, "skipped", output="stopped after a blocking failure",
+                                             blocking=check.blocking)
+            pending = []
+
+    # Left over without a failure: their `after` can never be satisfied (a cycle)
+    for check in pending:
+        results[check.name] = Result(check.name, "error", output=f"unsatisfiable after: {', '.join(check.after)}")
+
+    return [results[c.name] for c in checks if c.name in results]
+
+
+def run_gates(root: Path, event: str = DEFAULT_EVENT, jobs: int | None = None, use_cache: bool = True) -> list[Result]:
+    """Discover, run (or reuse) and return the results of the gates for an event."""
+    checks = [c for c in discover_checks(root) if event in c.events]
+    if not checks:
+        return []
+    jobs = jobs or min(len(checks), os.cpu_count() or 2)
+
+    tree = worktree_tree_hash(root) if use_cache else None
+    cache_dir = _cache_dir(root) if tree else None
+    if not cache_dir:
+        return execute(checks, root, {}, jobs)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = cache_dir / f"{tree}.json"
+    with open(cache_dir / f"{tree}.lock", "a") as lock:
+        # Teammates on the same tree wait here for the first run, then reuse it
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            cache = _load_cache(cache_path)
+            now = time.time()
+            cached = {c.name: cache[c.cache_key] for c in checks
+                      if c.cache_key in cache and _reusable(cache[c.cache_key], now)}
+            results = execute(checks, root, cached, jobs)
+            by_name = {r.name: r for r in results}
+            for check in checks:
+                result = by_name.get(check.name)
+                if result and not result.cached and result.status in ("pass", "fail"):
+                    cache[check.cache_key] = {"status": result.status, "seconds": round(result.seconds, 2),
+                                              "output": result.output, "at": round(now, 3)}
+            _store_cache(cache_path, cache)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return results
+
+
+def blocking_failure(results: list[Result]) -> Result | None:
+    return next((r for r in results if r.blocking and r.status in ("fail", "timeout", "error")), None)
+
+
+def main():
+    args = sys.argv[1:]
+    event = option(args, "--event", DEFAULT_EVENT)
+    root = Path(option(args, "--root", ".")).resolve()
+    jobs = option(args, "--jobs", None, int)
+
+    if "--hook" in args:
+        try:
+            data = json.load(sys.stdin)
+        except json.JSONDecodeError:
+            sys.exit(0)
+        event = data.get("hook_event_name", event)
+        root = Path(data.get("cwd") or root)
+
+    if "--list" in args:
+        for check in discover_checks(root):
+            mark = "*" if event in check.events else " "
+            after = f"  (after {', '.join(check.after)})" if check.after else ""
+            print(f" {mark} {check.name:<16} {check.run}{after}{'' if check.blocking else '  [advisory]'}")
+        return 0
+
+    try:
+        results = run_gates(root, event, jobs, use_cache="--no-cache" not in args)
+    except (ValueError, KeyError) as e:
+        # Broken .claude/gates.json: report it, but never wedge the session on it
+        print(f"Invalid .claude/gates.json: {e}", file=sys.stderr)
+        return 0 if "--hook" in args else 2
+    failure = blocking_failure(results)
+
+    if "--hook" in args:
+        if failure:
+            verb = {"fail": "failed", "timeout": "timed out", "error": "could not start"}[failure.status]
+            print(f"Quality gate '{failure.name}' {verb} before {event}:\n{failure.output}", file=sys.stderr)
+            sys.exit(2)
+        sys.exit(0)
+
+    for r in results:
+        note = " (cached)" if r.cached else ""
+        print(f"  [{r.status.upper():<7}] {r.name:<16} {r.seconds:6.1f}s{note}")
+    if failure:
+        print(f"\nBlocking failure: {failure.name}\n{failure.output}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Shared, cached git state for uncommitted-check, the gate hooks and
+validate-docs' changelog freshness check.
+
+Instead of each consumer shelling out to rev-parse / diff / status, they
+ask this module and share one answer, stored in <git dir>/claude-git-state.json:
+
+  head()        HEAD commit, read straight from HEAD / refs / packed-refs
+                (no subprocess)
+  head_files()  files changed by the HEAD commit; cached per commit id
+                forever, since a commit never changes
+  status()      one `git status --porcelain=v2 --branch -z` parsed into
+                branch, upstream, ahead/behind, staged, unstaged,
+                untracked and conflicted paths
+
+status() is reused while the stat (mtime, size) of .git/index, HEAD and
+the checked-out ref are unchanged and the cached answer is younger than
+STATUS_TTL seconds. Staging, committing and switching branches invalidate
+it at once; the TTL bounds how long an unstaged edit can go unseen
+(default 2 s: long enough for hooks fired back-to-back by one event).
+With CLAUDE_GIT_FSMONITOR=1 the status call also enables
+core.fsmonitor and core.untrackedCache, which makes it cheap on large
+repos where git's fsmonitor daemon is available.
+
+Usage:
+    _git_state.py                 # Human-readable summary
+    _git_state.py --json          # Everything as JSON
+    _git_state.py dirty           # Exit 1 if anything is uncommitted
+    _git_state.py head-files      # Files changed by HEAD
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+STATUS_TTL = float(os.environ.get("CLAUDE_GIT_STATE_TTL", "2"))
+USE_FSMONITOR = os.environ.get("CLAUDE_GIT_FSMONITOR") == "1"
+CACHE_NAME = "claude-git-state.json"
+HEAD_FILES_KEEP = 32
+
+
+def find_git_dirs(root: Path | str = ".") -> tuple[Path, Path, Path] | None:
+    """(worktree root, git dir, common dir) for root, found without running git."""
+    path = Path(root).resolve()
+    for candidate in (path, *path.parents):
+        dot_git = candidate / ".git"
+        if dot_git.is_dir():
+            return candidate, dot_git, dot_git
+        if dot_git.is_file():
+            # Linked worktree or submodule: ".git" holds "gitdir: <path>"
+            text = dot_git.read_text().strip()
+            if not text.startswith("gitdir:"):
+                return None
+            git_dir = (candidate / text.split(":", 1)[1].strip()).resolve()
+            commondir = git_dir / "commondir"
+            common = (git_dir / commondir.read_text().strip()).resolve() if commondir.exists() else git_dir
+            return candidate, git_dir, common
+    return None
+
+
+def stat_key(*paths: Path) -> list:
+    """[mtime_ns, size] per path (None if missing): a cheap "did it change" key."""
+    key = []
+    for p in paths:
+        try:
+            st = p.stat()
+            key.append([st.st_mtime_ns, st.st_size])
+        except OSError:
+            key.append(None)
+    return key
+
+
+def _read_ref(common: Path, ref: str) -> str | None:
+    loose = common / ref
+    if loose.is_file():
+        return loose.read_text().strip() or None
+    packed = common / "packed-refs"
+    if packed.is_file():
+        for line in packed.read_text().splitlines():
+            if line.endswith(" " + ref) and not line.startswith(("#", "^")):
+                return line.split(" ", 1)[0]
+    return None
+
+
+def _head_ref(git_dir: Path) -> tuple[str | None, str | None]:
+    """(symbolic ref or None if detached, commit id or None if unborn)."""
+    try:
+        text = (git_dir / "HEAD").read_text().strip()
+    except OSError:
+        return None, None
+    if text.startswith("ref:"):
+        return text[4:].strip(), None
+    return None, text
+
+
+class GitState:
+    """Cached git facts for one worktree; cheap to construct, lazy to query."""
+
+    def __init__(self, root: Path | str = "."):
+        dirs = find_git_dirs(root)
+        if dirs is None:
+            raise FileNotFoundError(f"not a git repository: {root}")
+        self.root, self.git_dir, self.common_dir = dirs
+        self._cache_path = self.git_dir / CACHE_NAME
+        self._cache: dict | None = None
+
+    # -- cache file -------------------------------------------------
+
+    def _load(self) -> dict:
+        if self._cache is None:
+            try:
+                self._cache = json.loads(self._cache_path.read_text())
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save(self):
+        tmp = self._cache_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(self._cache))
+            tmp.replace(self._cache_path)
+        except OSError:
+            pass
+
+    def _git(self, *args: str, timeout: int = 60) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", *args], cwd=self.root, capture_output=True, text=True, timeout=timeout)
+
+    # -- HEAD -------------------------------------------------------
+
+    @property
+    def branch_ref(self) -> str | None:
+        return _head_ref(self.git_dir)[0]
+
+    def head(self) -> str | None:
+        """Full id of the HEAD commit, or None on an unborn branch."""
+        ref, commit = _head_ref(self.git_dir)
+        return commit if ref is None else _read_ref(self.common_dir, ref)
+
+    def head_files(self) -> list[str]:
+        """Paths changed by the HEAD commit (vs. its first parent; all files for a root commit)."""
+        commit = self.head()
+        if not commit:
+            return []
+        cache = self._load()
+        per_commit = cache.setdefault("head_files", {})
+        if commit not in per_commit:
+            result = self._git("diff-tree", "--no-commit-id", "--name-only", "-r", "--root", "-m",
+                               "--first-parent", commit)
+            files = sorted(set(result.stdout.splitlines())) if result.returncode == 0 else []
+            per_commit[commit] = files
+            for old in list(per_commit)[:-HEAD_FILES_KEEP]:
+                del per_commit[old]
+            self._save()
+        return per_commit[commit]
+
+    # -- status -----------------------------------------------------
+
+    def _status_key(self) -> list:
+        ref = self.branch_ref
+        ref_paths = [self.common_dir / ref, self.common_dir / "packed-refs"] if ref else []
+        return stat_key(self.git_dir / "index", self.git_dir / "HEAD", *ref_paths)
+
+    def status(self, max_age: float = STATUS_TTL) -> dict:
+        cache = self._load()
+        key = self._status_key()
+        entry = cache.get("status")
+        if entry and entry["key"] == key and time.time() - entry["at"] < max_age:
+            return entry["value"]
+
+        args = ["status", "--porcelain=v2", "--branch", "-z"]
+        if USE_FSMONITOR:
+            args = ["-c", "core.fsmonitor=true", "-c", "core.untrackedCache=true", *args]
+        result = self._git(*args)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "git status failed")
+        value = parse_status_v2(result.stdout)
+        # Re-stat after the call: git status may refresh the index itself
+        cache["status"] = {"key": self._status_key(), "at": time.time(), "value": value}
+        self._save()
+        return value
+
+    def is_dirty(self, include_untracked: bool = True) -> bool:
+        s = self.status()
+        return bool(s["staged"] or s["unstaged"] or s["conflicted"] or (include_untracked and s["untracked"]))
+
+
+def parse_status_v2(out: str) -> dict:
+    """Parse `git status --porcelain=v2 --branch -z` output."""
+    state = {
+        "oid": None, "branch": None, "upstream": None, "ahead": 0, "behind": 0,
+        "staged": [], "unstaged": [], "untracked": [], "conflicted": [],
+    }
+    fields = out.split("\0")
+    i = 0
+    while i < len(fields):
+        line = fields[i]
+        i += 1
+        if not line:
+            continue
+        if line.startswith("# "):
+            _, name, *rest = line.split(" ")
+            if name == "branch.oid":
+                state["oid"] = None if rest[0] == "(initial)" else rest[0]
+            elif name == "branch.head":
+                state["branch"] = None if rest[0] == "(detached)" else rest[0]
+            elif name == "branch.upstream":
+                state["upstream"] = rest[0]
+            elif name == "branch.ab":
+                state["ahead"], state["behind"] = int(rest[0]), -int(rest[1])
+        elif line[0] == "?":
+            state["untracked"].append(line[2:])
+        elif line[0] == "u":
+            state["conflicted"].append(line.split(" ", 10)[10])
+        elif line[0] in "12":
+            parts = line.split(" ", 9 if line[0] == "2" else 8)
+            xy, path = parts[1], parts[-1]
+            if line[0] == "2":
+                # Renames/copies carry the original path in the next field
+                i += 1
+            if xy[0] != ".":
+                state["staged"].append(path)
+            if xy[1] != ".":
+                state["unstaged"].append(path)
+    return state
+
+
+_states: dict[Path, GitState] = {}
+
+
+def get_state(root: Path | str = ".") -> GitState:
+    """GitState for root, shared within the process."""
+    resolved = Path(root).resolve()
+    if resolved not in _states:
+        _states[resolved] = GitState(resolved)
+    return _states[resolved]
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        state = get_state(".")
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if "head-files" in args:
+        print("\n".join(state.head_files()))
+        return 0
+    if "dirty" in args:
+        return 1 if state.is_dirty() else 0
+
+    s = state.status()
+    if "--json" in args:
+        print(json.dumps({"root": str(state.root), "head": state.head(), **s}, indent=2))
+        return 0
+    print(f"Branch:     {s['branch'] or '(detached)'} @ {(state.head() or '(unborn)')[:12]}")
+    if s["upstream"]:
+        print(f"Upstream:   {s['upstream']} (ahead {s['ahead']}, behind {s['behind']})")
+    for label in ("staged", "unstaged", "untracked", "conflicted"):
+        print(f"{label.capitalize() + ':':<11} {len(s[label])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,743 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Pooled language servers for lsp-reference-checker and lsp-type-validator.
+
+A one-shot hook that starts a language server pays for process startup and
+workspace indexing on every edit. Instead, both hooks ask a small daemon
+over a Unix socket; the daemon keeps one warm server per (workspace,
+language) and shares it between them:
+
+  - the first request for a workspace/language starts the server and runs
+    the initialize handshake; later requests reuse it
+  - documents stay open; when a file changed on disk since the server last
+    saw it, the daemon sends one didChange with the changed range only
+    (full text if the server does not do incremental sync), versioned
+  - servers idle for IDLE_SECONDS are shut down; the daemon exits once it
+    has had no servers for as long
+  - clients start the daemon on demand; if it cannot be reached they get
+    None back and the hook should fail open
+  - reference results are cached per server, keyed by (symbol, SHA-256 of
+    the defining file, workspace generation); a repeat lookup costs a stat
+    scan of the workspace's source files instead of a server round trip
+    (see RefCache)
+
+Server commands per language default to LANGUAGE_SERVERS and can be
+overridden with $CLAUDE_LSP_SERVERS ('{"python": ["pylsp"]}'). The socket
+and lock live in $CLAUDE_LSP_POOL_DIR (default /tmp/claude-lsp-pool-<uid>).
+
+Usage:
+    _lsp_pool.py references FILE LINE COLUMN   # 1-based; print path:line:col per reference
+    _lsp_pool.py symbol FILE NAME              # references of the first NAME in FILE
+    _lsp_pool.py diagnostics FILE              # diagnostics after syncing FILE
+    _lsp_pool.py cache                         # reference cache hit rate per server
+    _lsp_pool.py status | stop
+    _lsp_pool.py serve                         # run the daemon in the foreground
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from collections import OrderedDict
+from urllib.parse import quote, unquote, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from _git_state import find_git_dirs, stat_key  # noqa: E402
+
+POOL_DIR = Path(os.environ.get("CLAUDE_LSP_POOL_DIR", f"/tmp/claude-lsp-pool-{os.getuid()}"))
+SOCKET_PATH = POOL_DIR / "pool.sock"
+LOCK_PATH = POOL_DIR / "daemon.lock"
+
+IDLE_SECONDS = float(os.environ.get("CLAUDE_LSP_IDLE", "600"))
+REQUEST_TIMEOUT = float(os.environ.get("CLAUDE_LSP_TIMEOUT", "30"))
+REF_CACHE_ENTRIES = int(os.environ.get("CLAUDE_LSP_REF_CACHE", "2048"))
+# Workspaces with more source files than this are not cached (the freshness scan would cost too much)
+REF_CACHE_SCAN_LIMIT = int(os.environ.get("CLAUDE_LSP_REF_CACHE_SCAN_LIMIT", "20000"))
+SCAN_SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", ".venv", "venv", "__pycache__", ".mypy_cache",
+                  ".pytest_cache", ".ruff_cache", "target", ".tox"}
+STARTUP_WAIT = 5.0
+
+LANGUAGE_SERVERS = {
+    "python": ["pyright-langserver", "--stdio"],
+    "typescript": ["typescript-language-server", "--stdio"],
+    "rust": ["rust-analyzer"],
+    "go": ["gopls"],
+}
+EXTENSIONS = {
+    ".py": "python", ".pyi": "python",
+    ".ts": "typescript", ".tsx": "typescript", ".js": "typescript", ".jsx": "typescript",
+    ".rs": "rust", ".go": "go",
+}
+ROOT_MARKERS = {
+    "python": ("pyproject.toml", "setup.py", "setup.cfg", "pyrightconfig.json"),
+    "typescript": ("tsconfig.json", "jsconfig.json", "package.json"),
+    "rust": ("Cargo.toml",),
+    "go": ("go.mod",),
+}
+
+
+def language_for(path: Path) -> str | None:
+    return EXTENSIONS.get(path.suffix.lower())
+
+
+def workspace_root(path: Path, language: str) -> Path:
+    """Nearest ancestor with a project marker for language, else with .git, else the file's directory."""
+    parents = list(path.resolve().parents)
+    for parent in parents:
+        if any((parent / m).exists() for m in ROOT_MARKERS.get(language, ())):
+            return parent
+    for parent in parents:
+        if (parent / ".git").exists():
+            return parent
+    return path.resolve().parent
+
+
+def server_command(language: str) -> list[str] | None:
+    overrides = os.environ.get("CLAUDE_LSP_SERVERS")
+    if overrides:
+        try:
+            configured = json.loads(overrides)
+            if language in configured:
+                return list(configured[language])
+        except ValueError:
+            pass
+    return LANGUAGE_SERVERS.get(language)
+
+
+def path_to_uri(path: Path) -> str:
+    return "file://" + quote(str(path.resolve()))
+
+
+def uri_to_path(uri: str) -> str:
+    return unquote(urlparse(uri).path)
+
+
+def _position(text: str, offset: int) -> dict:
+    """LSP position (0-based line, UTF-16 character) of a string offset."""
+    line = text.count("\n", 0, offset)
+    start = text.rfind("\n", 0, offset) + 1
+    return {"line": line, "character": len(text[start:offset].encode("utf-16-le")) // 2}
+
+
+def text_change(old: str, new: str) -> dict:
+    """One ranged contentChange turning old into new (common prefix/suffix trimmed)."""
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return {
+        "range": {"start": _position(old, prefix), "end": _position(old, len(old) - suffix)},
+        "text": new[prefix:len(new) - suffix],
+    }
+
+
+# ============================================================
+# LANGUAGE SERVER CONNECTION
+# ============================================================
+
+
+class LspServer:
+    """One running language server: JSON-RPC over stdio, open documents, latest diagnostics."""
+
+    def __init__(self, root: Path, language: str, command: list[str]):
+        self.root, self.language = root, language
+        self.proc = subprocess.Popen(command, cwd=root, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, start_new_session=True)
+        self.docs: dict[str, list] = {}  # uri -> [version, text]
+        self.ref_cache = RefCache(root, language)
+        self.diagnostics: dict[str, tuple[int | None, list]] = {}
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()  # serializes document sync + requests from clients
+        self._write_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending: dict[int, dict] = {}
+        self._next_id = 0
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+        try:
+            result = self.request("initialize", {
+                "processId": os.getpid(),
+                "rootUri": path_to_uri(root),
+                "rootPath": str(root),
+                "workspaceFolders": [{"uri": path_to_uri(root), "name": root.name}],
+                "capabilities": {"textDocument": {
+                    "synchronization": {"didSave": False},
+                    "publishDiagnostics": {"versionSupport": True},
+                    "references": {},
+                }},
+            })
+            sync = (result or {}).get("capabilities", {}).get("textDocumentSync", 1)
+            self.incremental = (sync.get("change") if isinstance(sync, dict) else sync) == 2
+            self.notify("initialized", {})
+        except Exception:
+            # Nobody else holds this process (it runs in its own session): don't leave it behind
+            self.proc.kill()
+            self.proc.wait()
+            raise
+
+    # -- JSON-RPC ---------------------------------------------------
+
+    def _send(self, message: dict):
+        body = json.dumps(message).encode()
+        with self._write_lock:
+            self.proc.stdin.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            self.proc.stdin.flush()
+
+    def _read_loop(self):
+        stream = self.proc.stdout
+        while True:
+            length = None
+            while True:
+                line = stream.readline()
+                if not line:
+                    with self._cond:
+                        self._cond.notify_all()
+                    return
+                line = line.strip()
+                if not line:
+                    break
+                name, _, value = line.decode("ascii", errors="replace").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            if length is None:
+                continue
+            message = json.loads(stream.read(length))
+            if "id" in message and "method" not in message:
+                with self._cond:
+                    self._pending[message["id"]] = message
+                    self._cond.notify_all()
+            elif message.get("method") == "textDocument/publishDiagnostics":
+                params = message["params"]
+                with self._cond:
+                    self.diagnostics[params["uri"]] = (params.get("version"), params.get("diagnostics", []))
+                    self._cond.notify_all()
+            elif "id" in message:
+                # Server-to-client request (configuration, progress tokens): acknowledge with null
+                self._send({"jsonrpc": "2.0", "id": message["id"], "result": None})
+
+    def request(self, method: str, params: dict, timeout: float = REQUEST_TIMEOUT):
+        with self._cond:
+            self._next_id += 1
+            request_id = self._next_id
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while request_id not in self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.alive():
+                    raise TimeoutError(f"{self.language} server: no reply to {method}")
+                self._cond.wait(remaining)
+            reply = self._pending.pop(request_id)
+        if "error" in reply:
+            raise RuntimeError(f"{method}: {reply['error'].get('message')}")
+        return reply.get("result")
+
+    def notify(self, method: str, params: dict):
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    # -- documents --------------------------------------------------
+
+    def sync(self, path: Path) -> tuple[str, str]:
+        """Make the server's copy of path match the disk; returns (uri, text)."""
+        uri = path_to_uri(path)
+        text = path.read_text(errors="replace")
+        doc = self.docs.get(uri)
+        if doc is None:
+            self.docs[uri] = [1, text]
+            self.notify("textDocument/didOpen", {"textDocument": {
+                "uri": uri, "languageId": self.language, "version": 1, "text": text}})
+        elif doc[1] != text:
+            doc[0] += 1
+            change = text_change(doc[1], text) if self.incremental else {"text": text}
+            doc[1] = text
+            self.notify("textDocument/didChange", {"textDocument": {"uri": uri, "version": doc[0]},
+                                                   "contentChanges": [change]})
+        return uri, text
+
+    def wait_diagnostics(self, uri: str, timeout: float) -> list:
+        version = self.docs[uri][0]
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                got = self.diagnostics.get(uri)
+                if got and (got[0] is None or got[0] >= version):
+                    return got[1]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.alive():
+                    return got[1] if got else []
+                self._cond.wait(remaining)
+
+    def shutdown(self):
+        try:
+            if self.alive():
+                self.request("shutdown", {}, timeout=2)
+                self.notify("exit", {})
+                self.proc.wait(timeout=2)
+        except Exception:
+            pass
+        if self.alive():
+            self.proc.kill()
+
+
+# ============================================================
+# POOL (daemon side)
+# ============================================================
+
+
+def _locations(result) -> list[dict]:
+    out = []
+    for loc in result or []:
+        uri = loc.get("uri") or loc.get("targetUri")
+        rng = loc.get("range") or loc.get("targetSelectionRange")
+        if uri and rng:
+            out.append({"path": uri_to_path(uri), "line": rng["start"]["line"] + 1,
+                        "column": rng["start"]["character"] + 1})
+    return out
+
+
+class RefCache:
+    """
+    Reference results of one server, keyed by (symbol, defining file
+    SHA-256, workspace generation).
+
+    Before every lookup the workspace's source files (the server's
+    language, SCAN_SKIP_DIRS pruned) are stat'ed and compared with the
+    previous scan. An entry is dropped when:
+      - a file in its result is changed or deleted, whether the pool synced
+        it or it changed behind the pool's back (scan, plus a re-stat of
+        the result's files on every hit for files outside the workspace)
+      - any new or changed file mentions the symbol's name: a reference may
+        have been added (only changed files are read)
+      - the workspace generation moves: git HEAD or index changed
+        (checkout, pull, commit, stash), which may touch any file at once
+    The defining file's hash is part of the key, so editing it simply
+    misses. Workspaces over REF_CACHE_SCAN_LIMIT files are not cached.
+    Least recently used entries go beyond REF_CACHE_ENTRIES.
+    """
+
+    def __init__(self, root: Path, language: str, max_entries: int = REF_CACHE_ENTRIES):
+        self.root = root
+        self.extensions = {ext for ext, lang in EXTENSIONS.items() if lang == language}
+        self.snapshot: dict[str, tuple[int, int]] | None = None
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple, dict] = OrderedDict()
+        self.by_path: dict[str, set] = {}
+        self.by_word: dict[str, set] = {}
+        dirs = find_git_dirs(root)
+        self._git_files = (dirs[1] / "HEAD", dirs[1] / "index") if dirs else ()
+        self._git_key = stat_key(*self._git_files)
+        self.generation = 0
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "edited": 0, "mentioned": 0,
+                         "workspace": 0, "evicted": 0}
+
+    def key(self, symbol: tuple, text: str, include_declaration: bool) -> tuple:
+        self._check_generation()
+        self._refresh()
+        digest = hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+        return symbol, digest, self.generation, include_declaration
+
+    def _check_generation(self):
+        git_key = stat_key(*self._git_files)
+        if git_key != self._git_key:
+            self._git_key = git_key
+            self.generation += 1
+            self.counters["workspace"] += len(self.entries)
+            self._clear()
+
+    def _scan(self) -> dict[str, tuple[int, int]] | None:
+        """path -> (mtime_ns, size) of the workspace's source files; None past REF_CACHE_SCAN_LIMIT."""
+        found: dict[str, tuple[int, int]] = {}
+        stack = [str(self.root)]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SCAN_SKIP_DIRS:
+                                stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in self.extensions:
+                            st = entry.stat()
+                            found[entry.path] = (st.st_mtime_ns, st.st_size)
+                    except OSError:
+                        continue
+                    if len(found) > REF_CACHE_SCAN_LIMIT:
+                        return None
+        return found
+
+    def _refresh(self):
+        """Drop entries that files changed since the previous scan may affect."""
+        current = self._scan()
+        previous, self.snapshot = self.snapshot, current
+        if current is None:
+            self.counters["workspace"] += len(self.entries)
+            self._clear()
+            return
+        if previous is None or not self.entries:
+            return
+        for path in previous.keys() - current.keys():
+            for key in list(self.by_path.get(path, ())):
+                self._drop(key, "edited")
+        for path, stat in current.items():
+            if previous.get(path) != stat:
+                try:
+                    text = Path(path).read_text(errors="replace")
+                except OSError:
+                    continue
+                self.file_changed(path, text)
+
+    def _clear(self):
+        self.entries.clear()
+        self.by_path.clear()
+        self.by_word.clear()
+
+    def get(self, key: tuple) -> list | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        if any(stat_key(Path(p)) != [st] for p, st in entry["files"].items()):
+            self._drop(key, "stale")
+            self.counters["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.counters["hits"] += 1
+        return entry["references"]
+
+    def put(self, key: tuple, word: str | None, defining: str, references: list[dict]):
+        if self.snapshot is None:
+            return  # workspace too large to keep fresh
+        paths = {defining, *(r["path"] for r in references)}
+        self.entries[key] = {"word": word, "references": references,
+                             "files": {p: stat_key(Path(p))[0] for p in paths}}
+        for p in paths:
+            self.by_path.setdefault(p, set()).add(key)
+        if word:
+            self.by_word.setdefault(word, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._drop(next(iter(self.entries)), "evicted")
+
+    def file_changed(self, path: str, text: str):
+        """The pool just (re)synced path with new text."""
+        for key in list(self.by_path.get(path, ())):
+            self._drop(key, "edited")
+        for word, keys in list(self.by_word.items()):
+            if re.search(rf"\b{re.escape(word)}\b", text):
+                for key in list(keys):
+                    self._drop(key, "mentioned")
+
+    def _drop(self, key: tuple, reason: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.counters[reason] += 1
+        for p in entry["files"]:
+            keys = self.by_path.get(p)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_path[p]
+        if entry["word"]:
+            keys = self.by_word.get(entry["word"])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_word[entry["word"]]
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {"entries": len(self.entries), "generation": self.generation, **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None}
+
+
+def _word_at(text: str, line: int, character: int) -> str | None:
+    lines = text.split("\n")
+    if not 0 <= line < len(lines):
+        return None
+    for match in re.finditer(r"\w+", lines[line]):
+        if match.start() <= character <= match.end():
+            return match.group()
+    return None
+
+
+class Pool:
+    def __init__(self):
+        self.servers: dict[tuple[str, str], LspServer] = {}
+        self.lock = threading.Lock()  # guards servers and starting; never held across a handshake
+        self.starting: dict[tuple[str, str], threading.Lock] = {}  # per-key lock while a server starts
+        self.last_activity = time.monotonic()
+
+    def server_for(self, path: Path) -> LspServer:
+        language = language_for(path)
+        if language is None:
+            raise ValueError(f"no language server for {path.suffix or path.name}")
+        root = workspace_root(path, language)
+        key = (str(root), language)
+        with self.lock:
+            self.last_activity = time.monotonic()  # keeps the reaper from exiting mid-handshake
+            server = self.servers.get(key)
+            if server is not None and server.alive():
+                server.last_used = self.last_activity
+                return server
+            starting = self.starting.setdefault(key, threading.Lock())
+
+        # A cold server can take seconds to initialize; only requests for the
+        # same workspace/language wait on it
+        with starting:
+            with self.lock:
+                server = self.servers.get(key)
+            if server is None or not server.alive():
+                command = server_command(language)
+                if not command:
+                    raise ValueError(f"no server configured for {language}")
+                server = LspServer(root, language, command)
+                with self.lock:
+                    self.servers[key] = server
+        with self.lock:
+            server.last_used = self.last_activity = time.monotonic()
+        return server
+
+    def handle(self, req: dict) -> dict:
+        op = req.get("op")
+        if op == "status":
+            now = time.monotonic()
+            return {"ok": True, "pid": os.getpid(), "servers": [
+                {"root": root, "language": lang, "pid": s.proc.pid, "alive": s.alive(), "documents": len(s.docs),
+                 "idle_seconds": round(now - s.last_used, 1), "ref_cache": s.ref_cache.stats()}
+                for (root, lang), s in self.servers.items()]}
+        if op == "stop":
+            self.evict(0)
+            return {"ok": True, "stopping": True}
+
+        path = Path(req["path"]).resolve()
+        server = self.server_for(path)
+        with server.lock:
+            uri = path_to_uri(path)
+            previous = server.docs.get(uri, [None, None])[1]
+            text = path.read_text(errors="replace")
+            if op in ("symbol", "references"):
+                include = bool(req.get("include_declaration", True))
+                if op == "symbol":
+                    word = req["name"]
+                    match = re.search(rf"\b{re.escape(word)}\b", text)
+                    if not match:
+                        return {"ok": True, "references": []}
+                    position = _position(text, match.start())
+                    symbol = ("name", word)
+                else:
+                    position = {"line": int(req["line"]) - 1, "character": int(req["column"]) - 1}
+                    word = _word_at(text, position["line"], position["character"])
+                    symbol = ("at", position["line"], position["character"])
+                key = server.ref_cache.key(symbol, text, include)
+                cached = server.ref_cache.get(key)
+                if cached is not None:
+                    return {"ok": True, "references": cached, "cached": True}
+
+            uri, text = server.sync(path)
+            if text != previous:
+                server.ref_cache.file_changed(str(path), text)
+            if op == "sync":
+                return {"ok": True, "version": server.docs[uri][0]}
+            if op == "diagnostics":
+                diags = server.wait_diagnostics(uri, float(req.get("wait", 10)))
+                return {"ok": True, "diagnostics": [
+                    {"line": d["range"]["start"]["line"] + 1, "column": d["range"]["start"]["character"] + 1,
+                     "severity": d.get("severity"), "message": d.get("message", "")} for d in diags]}
+            if op not in ("symbol", "references"):
+                return {"ok": False, "error": f"unknown op {op!r}"}
+            result = _locations(server.request("textDocument/references", {
+                "textDocument": {"uri": uri}, "position": position,
+                "context": {"includeDeclaration": include}}))
+            # Keyed on the text read above; if sync() saw a newer write, the hash will not match again
+            server.ref_cache.put(key, word, str(path), result)
+            return {"ok": True, "references": result, "cached": False}
+
+    def evict(self, idle_seconds: float) -> int:
+        now = time.monotonic()
+        with self.lock:
+            stale = [k for k, s in self.servers.items() if not s.alive() or now - s.last_used >= idle_seconds]
+            victims = [self.servers.pop(k) for k in stale]
+        for server in victims:
+            server.shutdown()
+        return len(victims)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            req = json.loads(self.rfile.readline() or b"{}")
+            reply = self.server.pool.handle(req)
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+        if reply.get("stopping"):
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve() -> int:
+    POOL_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    lock_fd = os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return 0  # another daemon owns the socket
+    SOCKET_PATH.unlink(missing_ok=True)
+    server = _Server(str(SOCKET_PATH), _Handler)
+    server.pool = Pool()
+
+    def reaper():
+        while True:
+            time.sleep(min(30.0, max(0.5, IDLE_SECONDS / 4)))
+            server.pool.evict(IDLE_SECONDS)
+            if not server.pool.servers and time.monotonic() - server.pool.last_activity >= IDLE_SECONDS:
+                server.shutdown()
+                return
+
+    threading.Thread(target=reaper, daemon=True).start()
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.pool.evict(0)
+        SOCKET_PATH.unlink(missing_ok=True)
+        server.server_close()
+        os.close(lock_fd)
+    return 0
+
+
+# ============================================================
+# CLIENT (hook side)
+# ============================================================
+
+
+def _send(req: dict, timeout: float) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(SOCKET_PATH))
+        sock.sendall(json.dumps(req).encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+
+def _spawn_daemon():
+    POOL_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "serve"], stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def request(req: dict, timeout: float = REQUEST_TIMEOUT, start: bool = True) -> dict | None:
+    """Send one request to the pool, starting the daemon if needed; None if it cannot be reached."""
+    try:
+        return _send(req, timeout)
+    except (FileNotFoundError, ConnectionRefusedError):
+        if not start:
+            return None
+    except (OSError, ValueError):
+        return None
+    _spawn_daemon()
+    deadline = time.monotonic() + STARTUP_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        try:
+            return _send(req, timeout)
+        except (FileNotFoundError, ConnectionRefusedError):
+            continue
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+def references(path: str, line: int, column: int) -> list[dict] | None:
+    reply = request({"op": "references", "path": str(path), "line": line, "column": column})
+    return reply["references"] if reply and reply.get("ok") else None
+
+
+def symbol_references(path: str, name: str) -> list[dict] | None:
+    reply = request({"op": "symbol", "path": str(path), "name": name})
+    return reply["references"] if reply and reply.get("ok") else None
+
+
+def diagnostics(path: str, wait: float = 10) -> list[dict] | None:
+    reply = request({"op": "diagnostics", "path": str(path), "wait": wait})
+    return reply["diagnostics"] if reply and reply.get("ok") else None
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "status"
+
+    if command == "serve":
+        return serve()
+    if command == "cache":
+        reply = request({"op": "status"}, start=False)
+        if not reply:
+            print("LSP pool not running", file=sys.stderr)
+            return 1
+        for server in reply["servers"]:
+            c = server["ref_cache"]
+            rate = f"{c['hit_rate']:.0%}" if c["hit_rate"] is not None else "-"
+            print(f"{server['language']:<10} {server['root']}")
+            print(f"  {c['hits']} hits / {c['misses']} misses ({rate}), {c['entries']} entries, "
+                  f"generation {c['generation']}")
+            print(f"  dropped: {c['stale']} stale, {c['edited']} edited, {c['mentioned']} mentioned, "
+                  f"{c['workspace']} on workspace change, {c['evicted']} evicted")
+        return 0
+    if command in ("status", "stop"):
+        reply = request({"op": command}, start=False)
+        print(json.dumps(reply or {"ok": False, "error": "pool not running"}, indent=2))
+        return 0 if reply else 1
+
+    if command == "references" and len(args) == 3:
+        req = {"op": "references", "path": args[0], "line": int(args[1]), "column": int(args[2])}
+    elif command == "symbol" and len(args) == 2:
+        req = {"op": "symbol", "path": args[0], "name": args[1]}
+    elif command == "diagnostics" and len(args) == 1:
+        req = {"op": "diagnostics", "path": args[0]}
+    else:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    reply = request(req)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if not reply or not reply.get("ok"):
+        print((reply or {}).get("error", "LSP pool unavailable"), file=sys.stderr)
+        return 1
+    for item in reply.get("references", reply.get("diagnostics", [])):
+        suffix = f" {item['message']}" if "message" in item else ""
+        print(f"{item.get('path', req['path'])}:{item['line']}:{item['column']}{suffix}")
+    print(f"({elapsed_ms:.1f} ms{', cached' if reply.get('cached') else ''})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
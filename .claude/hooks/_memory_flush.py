@@ -0,0 +1,287 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+PreCompact memory flush: dedup against stored entries, one batched write.
+
+Candidate memories (one per line, optionally tagged the way the memory
+prompts ask for them):
+
+    - [DECISION] Database: use Postgres for the job queue
+    - [PREFERENCE] Prefer ruff over flake8
+    plain untagged fact
+
+are normalized (case, whitespace, list markers) and content-hashed. The
+key of an entry is its tag plus the subject before the first ": ", or the
+whole normalized text if it has none. Against the memory_entries table in
+memory.db (one row per content hash):
+
+    hash already stored           -> duplicate, skipped
+    new hash, key already stored  -> changed, written; its log record
+                                     names the seq it supersedes
+    new hash, unknown key         -> new, written
+
+Entries sharing a subject ("Project: uses X", "Project: deploys to Y")
+are distinct facts and each stays a duplicate of itself afterwards.
+Everything that survives is appended to the memory log (_memory_log.py) in
+one batch and recorded in memory_entries in one transaction.
+
+Backpressure: one flusher at a time per memory dir. When teammates compact
+together, the others wait up to WAIT_SECONDS for flush.lock, then spool
+their candidates to flush-queue/ and return; the lock holder drains the
+queue in the same batch (or the next flush does). A per-session cooldown
+(precompact-guard's 60 s, stamped under ~/.claude/cache/memory-flush/)
+skips back-to-back flushes of the same session.
+
+Usage:
+    _memory_flush.py [--session ID] [--kind flush] [--force] [--json] < candidates.txt
+    _memory_flush.py drain           # Flush anything left in flush-queue/
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import _memory_log  # noqa: E402
+from _cli import option  # noqa: E402
+
+CACHE_DIR = Path(os.environ.get("CLAUDE_CACHE_DIR", Path.home() / ".claude" / "cache"))
+COOLDOWN_SECONDS = 60
+WAIT_SECONDS = 5.0
+
+TAG_RE = re.compile(r"^\[(DECISION|PREFERENCE|FACT|ENTITY)\]\s*", re.IGNORECASE)
+LIST_MARKER_RE = re.compile(r"^(?:[-*+]|\d+[.)])\s+")
+
+
+def _queue_dir() -> Path:
+    return _memory_log.MEMORY_DIR / "flush-queue"
+
+
+def parse_candidates(text: str) -> list[dict]:
+    """Candidate entries from flush output: one per non-empty, non-heading line."""
+    entries = []
+    for raw in text.splitlines():
+        line = LIST_MARKER_RE.sub("", raw.strip())
+        if not line or line.startswith("#"):
+            continue
+        tag_match = TAG_RE.match(line)
+        tag = tag_match.group(1).upper() if tag_match else "NOTE"
+        body = line[tag_match.end():] if tag_match else line
+        normalized = " ".join(body.lower().split())
+        subject, sep, _ = normalized.partition(": ")
+        entries.append({
+            "tag": tag,
+            "text": f"[{tag}] {body.strip()}" if tag_match else body.strip(),
+            "key": f"{tag}:{subject if sep else normalized}",
+            "hash": hashlib.sha256(normalized.encode()).hexdigest(),
+        })
+    return entries
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    conn = _memory_log.connect(db_path)
+    columns = {row[1]: row[5] for row in conn.execute("PRAGMA table_info(memory_entries)")}
+    with conn:
+        if columns.get("key"):
+            # First layout keyed rows by subject (one hash per key): re-key by hash
+            conn.execute("ALTER TABLE memory_entries RENAME TO memory_entries_by_key")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_entries "
+            "(hash TEXT PRIMARY KEY, key TEXT NOT NULL, seq INTEGER, session_id TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS memory_entries_key ON memory_entries(key, seq)")
+        if columns.get("key"):
+            conn.execute("INSERT OR IGNORE INTO memory_entries "
+                         "SELECT hash, key, seq, session_id FROM memory_entries_by_key")
+            conn.execute("DROP TABLE memory_entries_by_key")
+    return conn
+
+
+def _cooldown_file(session_id: str) -> Path:
+    # Hashed: session ids come from hook input and must not steer the path
+    digest = hashlib.sha256(str(session_id).encode()).hexdigest()[:32]
+    return CACHE_DIR / "memory-flush" / f"{digest}.json"
+
+
+def in_cooldown(session_id: str | None) -> bool:
+    """True if this session flushed less than COOLDOWN_SECONDS ago."""
+    if not session_id:
+        return False
+    try:
+        last = json.loads(_cooldown_file(session_id).read_text()).get("last_flush", 0)
+    except (OSError, ValueError):
+        return False
+    return time.time() - last < COOLDOWN_SECONDS
+
+
+def _mark_flushed(session_id: str | None):
+    if session_id:
+        try:
+            path = _cooldown_file(session_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({"last_flush": time.time()}))
+        except OSError:
+            pass
+
+
+@contextmanager
+def _flush_lock(wait: float):
+    """Yield True holding flush.lock, or False if another flusher kept it past `wait` seconds."""
+    memory_dir = _memory_log.MEMORY_DIR
+    memory_dir.mkdir(parents=True, exist_ok=True)
+    with open(memory_dir / "flush.lock", "a") as lock:
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    yield False
+                    return
+                time.sleep(0.05)
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _spool(entries: list[dict], session_id: str | None, kind: str):
+    queue = _queue_dir()
+    queue.mkdir(parents=True, exist_ok=True)
+    tmp = queue / f".{uuid.uuid4().hex}.tmp"
+    tmp.write_text(json.dumps({"session_id": session_id, "kind": kind, "entries": entries}))
+    tmp.rename(queue / f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json")
+
+
+def _take_spooled() -> tuple[list[tuple[dict, str | None, str]], list[Path]]:
+    queue = _queue_dir()
+    if not queue.is_dir():
+        return [], []
+    batch, files = [], []
+    for path in sorted(queue.glob("*.json")):
+        try:
+            item = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        files.append(path)
+        batch.extend((e, item.get("session_id"), item.get("kind", "flush")) for e in item.get("entries", []))
+    return batch, files
+
+
+def _write_batch(batch: list[tuple[dict, str | None, str]], db_path: Path) -> dict:
+    """Dedup (entry, session_id, kind) triples against memory_entries and write survivors."""
+    counts = {"new": 0, "changed": 0, "duplicate": 0}
+    if not batch:
+        return counts
+    conn = _connect(db_path)
+    try:
+        hashes = list({e["hash"] for e, _, _ in batch})
+        keys = list({e["key"] for e, _, _ in batch})
+        seen: set[str] = set()
+        latest: dict[str, int | None] = {}  # key -> seq of its newest stored entry
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            seen.update(row[0] for row in conn.execute(
+                f"SELECT hash FROM memory_entries WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            latest.update(conn.execute(
+                f"SELECT key, MAX(seq) FROM memory_entries WHERE key IN ({','.join('?' * len(chunk))}) GROUP BY key",
+                chunk,
+            ))
+
+        to_write = []
+        for entry, session_id, kind in batch:
+            if entry["hash"] in seen:
+                counts["duplicate"] += 1
+                continue
+            superseded = latest.get(entry["key"])
+            counts["changed" if entry["key"] in latest else "new"] += 1
+            # Later duplicates within the same batch dedup against this one
+            seen.add(entry["hash"])
+            latest.setdefault(entry["key"], None)
+            to_write.append((entry, session_id, kind, superseded))
+
+        if to_write:
+            records = []
+            for entry, session_id, kind, superseded in to_write:
+                meta = {"key": entry["key"]}
+                if superseded is not None:
+                    meta["supersedes"] = superseded
+                records.append(_memory_log.make_record(kind, entry["text"], session_id, meta))
+            seqs = _memory_log.append_many(records)
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO memory_entries(hash, key, seq, session_id) VALUES (?, ?, ?, ?)",
+                    [(e["hash"], e["key"], seq, sid) for (e, sid, _, _), seq in zip(to_write, seqs)],
+                )
+        return counts
+    finally:
+        conn.close()
+
+
+def flush(
+    entries: list[dict],
+    session_id: str | None = None,
+    kind: str = "flush",
+    force: bool = False,
+    wait: float = WAIT_SECONDS,
+    db_path: Path | None = None,
+) -> dict:
+    """Dedup and write candidate entries; returns counts and a status
+    ("flushed", "cooldown" or "queued")."""
+    db_path = db_path or _memory_log.DB_PATH
+    if not force and in_cooldown(session_id):
+        return {"status": "cooldown", "new": 0, "changed": 0, "duplicate": 0, "queued": 0}
+
+    with _flush_lock(wait) as held:
+        if not held:
+            _spool(entries, session_id, kind)
+            return {"status": "queued", "new": 0, "changed": 0, "duplicate": 0, "queued": len(entries)}
+        spooled, files = _take_spooled()
+        counts = _write_batch([(e, session_id, kind) for e in entries] + spooled, db_path)
+        for path in files:
+            path.unlink(missing_ok=True)
+
+    _mark_flushed(session_id)
+    return {"status": "flushed", **counts, "queued": 0, "drained": len(spooled)}
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    if args and args[0] == "drain":
+        result = flush([], force=True, wait=60)
+    else:
+        session_id = option(args, "--session")
+        kind = option(args, "--kind", "flush")
+        result = flush(parse_candidates(sys.stdin.read()), session_id, kind, force="--force" in args)
+
+    if as_json:
+        print(json.dumps(result))
+    elif result["status"] == "flushed":
+        print(f"Flushed {result['new']} new, {result['changed']} changed; "
+              f"skipped {result['duplicate']} duplicate(s)"
+              + (f"; drained {result['drained']} queued" if result.get("drained") else ""))
+    elif result["status"] == "queued":
+        print(f"Another flush in progress; queued {result['queued']} candidate(s)")
+    else:
+        print(f"Flushed less than {COOLDOWN_SECONDS}s ago for this session; skipped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Append-only segmented memory log shared by the SessionEnd memory hooks.
+
+memory-distill and session-summary append one record per session here
+instead of writing a new small file under the memory dir each time:
+
+  $CLAUDE_MEMORY_DIR/log/            (default ~/projects/claude-memory/log)
+    seg-000001.jsonl  ...            one JSON record per line, append-only;
+                                     a new segment starts past SEGMENT_BYTES
+    index.bin                        offset index: 16 bytes per record
+                                     (segment, offset, length), so record N
+                                     is one seek away
+    .lock                            flock held while appending/compacting
+
+Compaction folds records appended since the last checkpoint into the
+memory_fts table of memory.db (the table memory-search queries) in one
+transaction. It runs after every COMPACT_EVERY appends, on segment
+rollover, or via `compact`. If memory_fts was rebuilt without the log rows,
+the next compaction notices and re-adds everything.
+
+Usage:
+    _memory_log.py append --kind summary [--session ID] [--project P] [TEXT]   # TEXT or stdin
+    _memory_log.py tail [N]          # Last N records (default 10)
+    _memory_log.py get SEQ           # One record by sequence number
+    _memory_log.py compact           # Fold new records into memory_fts
+    _memory_log.py search QUERY      # FTS query over compacted records
+    _memory_log.py stats
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import struct
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from _cli import option  # noqa: E402
+
+MEMORY_DIR = Path(os.environ.get("CLAUDE_MEMORY_DIR", Path.home() / "projects" / "claude-memory"))
+LOG_DIR = MEMORY_DIR / "log"
+DB_PATH = MEMORY_DIR / "memory.db"
+
+SEGMENT_BYTES = int(os.environ.get("CLAUDE_MEMORY_SEGMENT_BYTES", 4 * 1024 * 1024))
+COMPACT_EVERY = 50
+
+# (segment number, byte offset, byte length) per record, little-endian
+INDEX_ENTRY = struct.Struct("<IQI")
+
+
+def _segment_path(segment: int, log_dir: Path) -> Path:
+    return log_dir / f"seg-{segment:06d}.jsonl"
+
+
+@contextmanager
+def _locked(log_dir: Path):
+    log_dir.mkdir(parents=True, exist_ok=True)
+    with open(log_dir / ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _index_entries(log_dir: Path) -> int:
+    try:
+        return (log_dir / "index.bin").stat().st_size // INDEX_ENTRY.size
+    except FileNotFoundError:
+        return 0
+
+
+def _read_entry(index, seq: int) -> tuple[int, int, int]:
+    index.seek(seq * INDEX_ENTRY.size)
+    return INDEX_ENTRY.unpack(index.read(INDEX_ENTRY.size))
+
+
+def _tail_position(log_dir: Path) -> tuple[int, int]:
+    """(segment, end offset) of the last indexed record; (1, 0) for an empty log."""
+    count = _index_entries(log_dir)
+    if not count:
+        return 1, 0
+    with open(log_dir / "index.bin", "rb") as index:
+        segment, offset, length = _read_entry(index, count - 1)
+    return segment, offset + length
+
+
+def _recover(log_dir: Path, segment: int, end: int) -> tuple[int, int]:
+    """Index complete lines written after `end` by an append that died before indexing.
+
+    That append may have rolled over, so segments after `segment` are
+    scanned from their start as well; returns the new (segment, end).
+    """
+    while True:
+        path = _segment_path(segment, log_dir)
+        if path.exists() and path.stat().st_size != end:
+            with open(path, "rb") as seg, open(log_dir / "index.bin", "ab") as index:
+                seg.seek(end)
+                for line in seg:
+                    if not line.endswith(b"\n"):
+                        # Torn write: drop it so the next append starts on a line boundary
+                        os.truncate(path, end)
+                        break
+                    index.write(INDEX_ENTRY.pack(segment, end, len(line)))
+                    end += len(line)
+        if not _segment_path(segment + 1, log_dir).exists():
+            return segment, end
+        segment, end = segment + 1, 0
+
+
+def make_record(kind: str, text: str, session_id: str | None, meta: dict) -> dict:
+    return {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "kind": kind,
+        "session_id": session_id,
+        "text": text,
+        **({"meta": meta} if meta else {}),
+    }
+
+
+def append_many(records: list[dict], log_dir: Path = LOG_DIR) -> list[int]:
+    """Append records (from make_record) under one lock, one write per segment; returns their seqs."""
+    lines = [(json.dumps(r, ensure_ascii=False) + "\n").encode() for r in records]
+    if not lines:
+        return []
+
+    rolled = False
+    with _locked(log_dir):
+        segment, end = _recover(log_dir, *_tail_position(log_dir))
+        first_seq = _index_entries(log_dir)
+        # Group lines into per-segment batches, rolling over as they fill
+        batches: list[tuple[int, list[bytes]]] = [(segment, [])]
+        entries = []
+        for line in lines:
+            if end > 0 and end + len(line) > SEGMENT_BYTES:
+                segment, end = segment + 1, 0
+                batches.append((segment, []))
+                rolled = True
+            batches[-1][1].append(line)
+            entries.append(INDEX_ENTRY.pack(segment, end, len(line)))
+            end += len(line)
+        for seg_no, batch in batches:
+            if not batch:
+                continue
+            fd = os.open(_segment_path(seg_no, log_dir), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, b"".join(batch))
+            finally:
+                os.close(fd)
+        with open(log_dir / "index.bin", "ab") as index:
+            index.write(b"".join(entries))
+    seqs = list(range(first_seq, first_seq + len(lines)))
+
+    if rolled or (seqs[0] // COMPACT_EVERY) != ((seqs[-1] + 1) // COMPACT_EVERY):
+        try:
+            compact(log_dir=log_dir)
+        except sqlite3.Error:
+            # The log is the source of truth; the next compaction catches up
+            pass
+    return seqs
+
+
+def append(kind: str, text: str, session_id: str | None = None, log_dir: Path = LOG_DIR, **meta) -> int:
+    """Append one record and return its sequence number."""
+    return append_many([make_record(kind, text, session_id, meta)], log_dir)[0]
+
+
+def count(log_dir: Path = LOG_DIR) -> int:
+    return _index_entries(log_dir)
+
+
+def read_records(start: int = 0, stop: int | None = None, log_dir: Path = LOG_DIR):
+    """Yield (seq, record) for start <= seq < stop, seeking via the offset index."""
+    total = _index_entries(log_dir)
+    stop = total if stop is None else min(stop, total)
+    if start >= stop:
+        return
+    segments = {}
+    try:
+        with open(log_dir / "index.bin", "rb") as index:
+            for seq in range(start, stop):
+                segment, offset, length = _read_entry(index, seq)
+                if segment not in segments:
+                    segments[segment] = open(_segment_path(segment, log_dir), "rb")
+                seg = segments[segment]
+                seg.seek(offset)
+                yield seq, json.loads(seg.read(length))
+    finally:
+        for seg in segments.values():
+            seg.close()
+
+
+def get(seq: int, log_dir: Path = LOG_DIR) -> dict | None:
+    for _, record in read_records(seq, seq + 1, log_dir):
+        return record
+    return None
+
+
+def _fts_path(seq: int, record: dict) -> str:
+    return f"log/{record.get('kind')}/{record.get('ts', '')[:10]}/{record.get('session_id') or '-'}#{seq}"
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=10)
+    # Same schema memory-search uses, so its queries see log records too
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(path, content)")
+    conn.execute("CREATE TABLE IF NOT EXISTS memory_log_state (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+
+def compact(db_path: Path = DB_PATH, log_dir: Path = LOG_DIR) -> int:
+    """Fold records appended since the last checkpoint into memory_fts; returns how many."""
+    with _locked(log_dir):
+        conn = connect(db_path)
+        try:
+            row = conn.execute("SELECT value FROM memory_log_state WHERE key = 'checkpoint'").fetchone()
+            checkpoint = json.loads(row[0]) if row else {"seq": 0, "path": None}
+            if checkpoint["path"] and not conn.execute(
+                "SELECT 1 FROM memory_fts WHERE path = ? LIMIT 1", (checkpoint["path"],)
+            ).fetchone():
+                # memory_fts was rebuilt from the markdown files alone
+                checkpoint = {"seq": 0, "path": None}
+
+            added = 0
+            with conn:
+                for seq, record in read_records(checkpoint["seq"], log_dir=log_dir):
+                    path = _fts_path(seq, record)
+                    conn.execute("INSERT INTO memory_fts(path, content) VALUES (?, ?)", (path, record.get("text", "")))
+                    checkpoint = {"seq": seq + 1, "path": path}
+                    added += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO memory_log_state(key, value) VALUES ('checkpoint', ?)",
+                    (json.dumps(checkpoint),),
+                )
+            return added
+        finally:
+            conn.close()
+
+
+def search(query: str, limit: int = 6, db_path: Path = DB_PATH) -> list[tuple[str, str]]:
+    conn = connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT path, snippet(memory_fts, 1, '>>>', '<<<', '...', 64) "
+            "FROM memory_fts WHERE memory_fts MATCH ? AND path LIKE 'log/%' ORDER BY rank LIMIT ?",
+            (query, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def stats(log_dir: Path = LOG_DIR) -> dict:
+    segments = sorted(log_dir.glob("seg-*.jsonl"))
+    return {
+        "records": _index_entries(log_dir),
+        "segments": len(segments),
+        "bytes": sum(p.stat().st_size for p in segments),
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "stats"
+
+    if command == "append":
+        kind = option(args, "--kind", "note")
+        session_id = option(args, "--session")
+        project = option(args, "--project")
+        text = " ".join(args) if args else sys.stdin.read()
+        if not text.strip():
+            print("Nothing to append", file=sys.stderr)
+            return 1
+        meta = {"project": project} if project else {}
+        print(append(kind, text, session_id, **meta))
+        return 0
+
+    if command == "tail":
+        n = int(args[0]) if args else 10
+        total = count()
+        for seq, record in read_records(max(0, total - n)):
+            first_line = record.get("text", "").strip().splitlines()[:1]
+            print(f"{seq:>6}  {record.get('ts')}  {record.get('kind'):<10} {first_line[0][:80] if first_line else ''}")
+        return 0
+
+    if command == "get":
+        record = get(int(args[0])) if args else None
+        if record is None:
+            print("No such record", file=sys.stderr)
+            return 1
+        print(json.dumps(record, indent=2, ensure_ascii=False))
+        return 0
+
+    if command == "compact":
+        print(f"Compacted {compact()} record(s) into {DB_PATH}")
+        return 0
+
+    if command == "search":
+        for path, snippet in search(" ".join(args)):
+            print(f"### {path}\n{snippet}\n")
+        return 0
+
+    if command == "stats":
+        s = stats()
+        print(f"Records:  {s['records']}")
+        print(f"Segments: {s['segments']} ({s['bytes']:,} bytes, rollover at {SEGMENT_BYTES:,})")
+        return 0
+
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
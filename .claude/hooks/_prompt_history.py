@@ -0,0 +1,144 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Bounded per-session prompt history for prompt-validator.
+
+One fixed-size file per session, ~/.claude/cache/prompt-history/<hash>.bin
+(CLAUDE_CACHE_DIR; the name is a SHA-256 of the session id):
+
+    header   magic, slot count, slot size, prompt count, first/last timestamp
+    slots    SLOTS ring slots of SLOT_BYTES each: timestamp, prompt length,
+             UTF-8 preview of the prompt
+
+Recording a prompt writes one slot (count % SLOTS) and the header in place
+under a flock; nothing is read back or rewritten, so the cost does not grow
+with the session. The file never exceeds HEADER + SLOTS * SLOT_BYTES bytes;
+older prompts are overwritten once the ring is full, while the header keeps
+the all-time count and session start.
+
+Usage:
+    _prompt_history.py SESSION            # Count, duration and recent prompts
+    _prompt_history.py SESSION --json
+"""
+
+import fcntl
+import json
+import os
+import hashlib
+import struct
+import sys
+import time
+from pathlib import Path
+
+SLOTS = 32
+SLOT_BYTES = 256
+HEADER = struct.Struct("<8sIIQdd")
+SLOT_HEAD = struct.Struct("<dIH")
+MAGIC = b"CPHIST01"
+CACHE_DIR = Path(os.environ.get("CLAUDE_CACHE_DIR", Path.home() / ".claude" / "cache"))
+STATE_DIR = CACHE_DIR / "prompt-history"
+
+
+def history_path(session_id: str) -> Path:
+    # Hashed: session ids come from hook input and must not steer the path
+    digest = hashlib.sha256(str(session_id).encode()).hexdigest()[:32]
+    return STATE_DIR / f"{digest}.bin"
+
+
+def _read_header(fd: int) -> dict | None:
+    raw = os.pread(fd, HEADER.size, 0)
+    if len(raw) < HEADER.size:
+        return None
+    magic, slots, slot_bytes, count, first_ts, last_ts = HEADER.unpack(raw)
+    if magic != MAGIC:
+        return None
+    return {"slots": slots, "slot_bytes": slot_bytes, "count": count, "first_ts": first_ts, "last_ts": last_ts}
+
+
+def record(session_id: str, prompt: str, now: float | None = None) -> dict:
+    """Append prompt to the session ring; returns the updated header (count, first_ts, last_ts)."""
+    now = time.time() if now is None else now
+    STATE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    # Previews may hold secrets: never follow a planted symlink
+    fd = os.open(history_path(session_id), os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        header = _read_header(fd) or {"slots": SLOTS, "slot_bytes": SLOT_BYTES, "count": 0,
+                                      "first_ts": now, "last_ts": now}
+        preview = prompt.encode("utf-8", errors="replace")[:header["slot_bytes"] - SLOT_HEAD.size]
+        # Don't leave half a multi-byte character at the cut
+        preview = preview.decode("utf-8", errors="ignore").encode()
+        slot = SLOT_HEAD.pack(now, len(prompt), len(preview)) + preview
+        offset = HEADER.size + (header["count"] % header["slots"]) * header["slot_bytes"]
+        os.pwrite(fd, slot.ljust(header["slot_bytes"], b"\0"), offset)
+        header["count"] += 1
+        header["last_ts"] = now
+        os.pwrite(fd, HEADER.pack(MAGIC, header["slots"], header["slot_bytes"], header["count"],
+                                  header["first_ts"], header["last_ts"]), 0)
+        return header
+    finally:
+        os.close(fd)
+
+
+def stats(session_id: str) -> dict | None:
+    """Header only (one read): count, first_ts, last_ts; None for an unknown session."""
+    try:
+        fd = os.open(history_path(session_id), os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return None
+    try:
+        return _read_header(fd)
+    finally:
+        os.close(fd)
+
+
+def recent(session_id: str, n: int = SLOTS) -> list[dict]:
+    """Up to n most recent prompts (preview, length, ts), newest first."""
+    try:
+        fd = os.open(history_path(session_id), os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return []
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        header = _read_header(fd)
+        if not header:
+            return []
+        out = []
+        for i in range(min(n, header["count"], header["slots"])):
+            index = (header["count"] - 1 - i) % header["slots"]
+            raw = os.pread(fd, header["slot_bytes"], HEADER.size + index * header["slot_bytes"])
+            ts, length, size = SLOT_HEAD.unpack_from(raw)
+            preview = raw[SLOT_HEAD.size:SLOT_HEAD.size + size].decode("utf-8", errors="replace")
+            out.append({"number": header["count"] - i, "ts": ts, "length": length, "preview": preview})
+        return out
+    finally:
+        os.close(fd)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    session_id = args[0]
+    header = stats(session_id)
+    if header is None:
+        print(f"No prompt history for session {session_id}", file=sys.stderr)
+        return 1
+    prompts = recent(session_id)
+    if "--json" in args:
+        print(json.dumps({**header, "recent": prompts}, indent=2))
+        return 0
+    minutes = (header["last_ts"] - header["first_ts"]) / 60
+    print(f"{header['count']} prompts over {minutes:.0f} min ({history_path(session_id)})")
+    for p in prompts:
+        stamp = time.strftime("%H:%M:%S", time.localtime(p["ts"]))
+        print(f"  #{p['number']:<4} {stamp}  {p['preview'][:100]!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Prompt rule engine for prompt-validator: block and allow patterns, each
+kind combined into one compiled matcher.
+
+Rule file (JSON), first found of $CLAUDE_PROMPT_RULES,
+$CLAUDE_PROJECT_DIR/.claude/prompt-rules.json, ~/.claude/prompt-rules.json;
+DEFAULT_RULES otherwise:
+
+    {
+      "max_length": 50000,
+      "rules": [
+        {"id": "ignore-previous", "action": "block",
+         "pattern": "\\\\bignore\\\\s+(?:all\\\\s+)?previous\\\\s+instructions\\\\b",
+         "message": "Prompt looks like an injection attempt"},
+        {"id": "quoted", "action": "allow", "within": "code", "pattern": "ignore"}
+      ]
+    }
+
+Patterns are case-insensitive. Block rules are joined into one alternation
+of named groups, allow rules into another, and each is one scan of the
+prompt, so the cost does not grow with the number of rules. An allow rule
+with "within": "code" is tried only inside inline code spans, found left
+to right (`a` ... `b` is two spans, never one from the first closing
+backtick to the second opening one), and allows the whole span it matches
+in. An allow match only excuses the text it covers: a block match lying
+inside an allowed span is dropped, any other block match still blocks
+(quoting `os.system` does not excuse an injection elsewhere in the
+prompt). Patterns must not use numbered backreferences (group numbers
+shift once combined).
+
+The combined pattern sources and their group maps are cached in
+~/.claude/cache/prompt-rules-<hash>.json, keyed by a hash of the rule file,
+so a hit skips parsing and validating the rules one by one.
+
+Usage:
+    _prompt_rules.py check "PROMPT"     # Print verdict as JSON; exit 2 if blocked
+    _prompt_rules.py show               # Rule source, hash and rules
+    _prompt_rules.py --bench [N]        # Load + check timings
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get("CLAUDE_CACHE_DIR", Path.home() / ".claude" / "cache"))
+# Bump when the cached layout changes
+CACHE_FORMAT = 1
+FLAGS = re.IGNORECASE
+
+# Inline code spans, consumed left to right; doubled backticks are not spans
+CODE_SPAN_RE = re.compile(r"(?<!`)`[^`\n]+`(?!`)")
+
+DEFAULT_RULES = {
+    "max_length": 50000,
+    "rules": [
+        # Quoting or discussing an injection phrase in a code span is fine
+        {"id": "code-span", "action": "allow", "within": "code", "pattern": r"ignore|disregard|system"},
+        {"id": "ignore-previous", "action": "block",
+         "pattern": r"\b(?:ignore|forget)\s+(?:all\s+)?(?:of\s+)?(?:the\s+|your\s+)?(?:previous|prior|above|earlier)"
+                    r"\s+(?:instructions|rules|prompts?|directions)\b",
+         "message": "Prompt looks like a prompt-injection attempt (ignore previous instructions)"},
+        {"id": "disregard-instructions", "action": "block",
+         "pattern": r"\bdisregard\s+(?:all\s+)?(?:the\s+|your\s+)?(?:previous\s+|prior\s+|system\s+)?"
+                    r"(?:instructions|rules|guidelines)\b",
+         "message": "Prompt looks like a prompt-injection attempt (disregard instructions)"},
+        {"id": "reveal-system-prompt", "action": "block",
+         "pattern": r"\b(?:reveal|print|repeat|show)\s+(?:me\s+)?(?:your\s+|the\s+)?(?:full\s+)?"
+                    r"(?:system\s+prompt|hidden\s+instructions)\b",
+         "message": "Prompt asks to reveal the system prompt"},
+        {"id": "fake-system-tag", "action": "block",
+         "pattern": r"<\s*/?\s*(?:system|system-reminder)\s*>",
+         "message": "Prompt contains a fake system tag"},
+    ],
+}
+
+
+@dataclass
+class Verdict:
+    action: str  # "allow" or "block"
+    rule: str | None = None
+    message: str = ""
+    matched: list[str] = field(default_factory=list)
+
+    @property
+    def blocked(self) -> bool:
+        return self.action == "block"
+
+
+def rules_source() -> tuple[str, bytes]:
+    """(origin, raw JSON bytes) of the rule file in effect."""
+    candidates = [os.environ.get("CLAUDE_PROMPT_RULES")]
+    project = os.environ.get("CLAUDE_PROJECT_DIR")
+    if project:
+        candidates.append(str(Path(project) / ".claude" / "prompt-rules.json"))
+    candidates.append(str(Path.home() / ".claude" / "prompt-rules.json"))
+    for candidate in filter(None, candidates):
+        try:
+            return candidate, Path(candidate).read_bytes()
+        except OSError:
+            continue
+    return "<default>", json.dumps(DEFAULT_RULES, sort_keys=True).encode()
+
+
+class Matcher:
+    """One combined alternation; group name -> rule."""
+
+    def __init__(self, source: str | None, groups: dict[str, dict]):
+        self.regex = re.compile(source, FLAGS) if source else None
+        self.groups = groups
+
+    def finditer(self, text: str):
+        """(span, rule) for every match."""
+        if self.regex is None:
+            return
+        for match in self.regex.finditer(text):
+            yield match.span(), self._rule_for(match)
+
+    def _rule_for(self, match: re.Match) -> dict:
+        if match.lastgroup in self.groups:
+            return self.groups[match.lastgroup]
+        # lastgroup was a named group inside a rule's own pattern
+        return next(rule for name, rule in self.groups.items() if match.start(name) != -1)
+
+
+class RuleSet:
+    """Compiled rules; check() is one scan per matcher."""
+
+    def __init__(self, block: Matcher, allow: Matcher, code: Matcher, max_length: int, digest: str):
+        self.block = block
+        self.allow = allow  # anywhere in the prompt
+        self.code = code  # inside code spans only
+        self.max_length = max_length
+        self.digest = digest
+
+    @property
+    def rules(self) -> list[dict]:
+        return [*self.code.groups.values(), *self.allow.groups.values(), *self.block.groups.values()]
+
+    def check(self, prompt) -> Verdict:
+        if not isinstance(prompt, str) or not prompt.strip():
+            return Verdict("block", "empty", "Empty prompt")
+        if len(prompt) > self.max_length:
+            return Verdict("block", "too-long",
+                           f"Prompt is {len(prompt):,} characters (limit {self.max_length:,}); likely an accidental paste")
+
+        matched, allowed = [], []
+        if self.code.regex is not None:
+            for span in CODE_SPAN_RE.finditer(prompt):
+                inner = next(self.code.finditer(span.group()), None)
+                if inner:
+                    allowed.append((span.span(), inner[1]))
+        allowed.extend(self.allow.finditer(prompt))
+        for _, rule in allowed:
+            if rule["id"] not in matched:
+                matched.append(rule["id"])
+
+        for (start, end), rule in self.block.finditer(prompt):
+            if rule["id"] not in matched:
+                matched.append(rule["id"])
+            if not any(a_start <= start and end <= a_end for (a_start, a_end), _ in allowed):
+                return Verdict("block", rule["id"], rule.get("message", "Prompt blocked"), matched)
+        if allowed:
+            return Verdict("allow", allowed[0][1]["id"], matched=matched)
+        return Verdict("allow")
+
+
+def _valid_rules(config: dict) -> list[dict]:
+    rules = []
+    for rule in config.get("rules", []):
+        if not isinstance(rule, dict) or rule.get("action") not in ("allow", "block") or not rule.get("pattern"):
+            continue
+        try:
+            re.compile(rule["pattern"], FLAGS)
+        except re.error as e:
+            print(f"prompt rules: skipping {rule.get('id')!r}: {e}", file=sys.stderr)
+            continue
+        rules.append(rule)
+    return rules
+
+
+def _combine(rules: list[dict], prefix: str) -> tuple[str | None, dict[str, dict]]:
+    """(alternation source, group -> rule); None when there are no rules."""
+    if not rules:
+        return None, {}
+    groups = {f"{prefix}{i}": rule for i, rule in enumerate(rules)}
+    return "|".join(f"(?P<{name}>{rule['pattern']})" for name, rule in groups.items()), groups
+
+
+def _compile(config: dict) -> dict:
+    """Pattern sources and group maps for the three matchers (what the cache holds)."""
+    rules = _valid_rules(config)
+    kinds = {
+        "block": [r for r in rules if r["action"] == "block"],
+        "allow": [r for r in rules if r["action"] == "allow" and r.get("within") != "code"],
+        "code": [r for r in rules if r["action"] == "allow" and r.get("within") == "code"],
+    }
+    compiled = {"max_length": int(config.get("max_length", 50000))}
+    for kind, members in kinds.items():
+        compiled[kind] = _combine(members, kind[0])
+    return compiled
+
+
+def _from_rules(raw: bytes) -> dict:
+    try:
+        config = json.loads(raw)
+    except ValueError as e:
+        print(f"prompt rules: invalid JSON ({e}); using defaults", file=sys.stderr)
+        config = DEFAULT_RULES
+    return _compile(config)
+
+
+def _matchers(compiled: dict) -> tuple[Matcher, Matcher, Matcher]:
+    return tuple(Matcher(*compiled[kind]) for kind in ("block", "allow", "code"))
+
+
+def load_rules() -> RuleSet:
+    """RuleSet for the rule file in effect, from the on-disk cache when it is current."""
+    _, raw = rules_source()
+    digest = hashlib.sha256(raw + f"|{CACHE_FORMAT}".encode()).hexdigest()
+    cache_file = CACHE_DIR / f"prompt-rules-{digest[:16]}.json"
+    try:
+        compiled = json.loads(cache_file.read_text())
+        matchers = _matchers(compiled)
+    except (OSError, ValueError, KeyError, TypeError, re.error):
+        compiled = _from_rules(raw)
+        matchers = _matchers(compiled)
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(compiled))
+            tmp.replace(cache_file)
+        except OSError:
+            pass
+    return RuleSet(*matchers, compiled["max_length"], digest)
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "show"
+
+    if command == "check":
+        verdict = load_rules().check(" ".join(args) if args else sys.stdin.read())
+        print(json.dumps(verdict.__dict__))
+        return 2 if verdict.blocked else 0
+
+    if command == "show":
+        origin, raw = rules_source()
+        ruleset = load_rules()
+        print(f"Rules:  {origin} (sha256 {ruleset.digest[:16]})")
+        print(f"Limit:  {ruleset.max_length:,} characters")
+        for rule in ruleset.rules:
+            within = " (in code spans)" if rule.get("within") == "code" else ""
+            print(f"  {rule['action']:<6} {rule['id']}{within}")
+        return 0
+
+    if command == "--bench":
+        rounds = int(args[0]) if args else 1000
+        start = time.perf_counter()
+        ruleset = load_rules()
+        loaded = time.perf_counter()
+        prompt = "Please refactor the session store so appends stay O(1). " * 40
+        for _ in range(rounds):
+            ruleset.check(prompt)
+        done = time.perf_counter()
+        print(f"load {(loaded - start) * 1000:.2f} ms; check {(done - loaded) / rounds * 1e6:.1f} us "
+              f"per {len(prompt)}-char prompt")
+        return 0
+
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Precomputed skill-routing index: match a prompt to candidate skills
+without putting the whole skill catalogue into context.
+
+Built from every */SKILL.md under the skill directories:
+
+  name          frontmatter name, also matched as a whole ("n8n-code-python")
+  description   frontmatter description
+  triggers      frontmatter `triggers:` list, plus the bullets of a
+                "## When to Use" section
+
+Each field is tokenized (lowercase words, plural "s" stripped, stopwords
+dropped) into an inverted index token -> [(skill, weight)], weighted by
+field (name > triggers/description > when-to-use) and idf, and normalized
+per skill. Trigger phrases also index their word bigrams, so "validation
+errors" scores above "errors" and "validation" seen apart. Matching a
+prompt is a dict lookup per prompt token.
+
+The index is stored as one JSON artifact under ~/.claude/cache/, keyed by
+the set of skill directories. It is rebuilt only when the fingerprint
+(path, mtime, size of every SKILL.md) changes; the check is one stat per
+skill.
+
+Skill directories: $CLAUDE_SKILL_DIRS (os.pathsep-separated) if set, else
+~/.claude/skills plus $CLAUDE_PROJECT_DIR/.claude/skills and
+$CLAUDE_PROJECT_DIR/templates/*/skills.
+
+Usage:
+    _skill_index.py match "PROMPT" [-k N] [--json]
+    _skill_index.py --hook            # UserPromptSubmit: stdin JSON, emit candidates as context
+    _skill_index.py build [--force]   # Rebuild now (normally automatic)
+    _skill_index.py list              # Indexed skills
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from _cli import option  # noqa: E402
+
+CACHE_DIR = Path(os.environ.get("CLAUDE_CACHE_DIR", Path.home() / ".claude" / "cache"))
+INDEX_FORMAT = 1
+
+FIELD_WEIGHTS = {"name": 3.0, "description": 2.0, "triggers": 2.0, "when": 1.0}
+NAME_MATCH_BONUS = 5.0
+MIN_SCORE = 0.2
+RELATIVE_CUTOFF = 0.35
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_$.]*[a-z0-9_]|[a-z0-9]")
+WHEN_HEADING_RE = re.compile(r"^##\s+when to use\s*$", re.IGNORECASE)
+STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in into is it its me my need needs "
+    "of on or our should so that the this to use used using want we what when with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for raw in TOKEN_RE.findall(text.lower()):
+        for token in [raw, *raw.split(".")] if "." in raw else [raw]:
+            if token in STOPWORDS or not token:
+                continue
+            if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+                token = token[:-1]
+            tokens.append(token)
+    return tokens
+
+
+def _bigrams(tokens: list[str]) -> list[str]:
+    return [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+# ============================================================
+# SKILL FILES
+# ============================================================
+
+
+def skill_dirs() -> list[Path]:
+    env = os.environ.get("CLAUDE_SKILL_DIRS")
+    if env:
+        return [Path(p).expanduser() for p in env.split(os.pathsep) if p]
+    dirs = [Path.home() / ".claude" / "skills"]
+    project = os.environ.get("CLAUDE_PROJECT_DIR")
+    if project:
+        dirs.append(Path(project) / ".claude" / "skills")
+        dirs.extend(sorted((Path(project) / "templates").glob("*/skills")))
+    return dirs
+
+
+def skill_files(dirs: list[Path]) -> list[Path]:
+    files = []
+    for d in dirs:
+        if d.is_dir():
+            files.extend(sorted(d.glob("*/SKILL.md")))
+    return files
+
+
+def _fingerprint(files: list[Path]) -> str:
+    h = hashlib.sha1()
+    for f in files:
+        try:
+            st = f.stat()
+        except OSError:
+            continue
+        h.update(f"{f}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+    return h.hexdigest()
+
+
+def _scalar(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+def parse_skill(text: str) -> dict:
+    """name, description and triggers from SKILL.md (frontmatter subset + When to Use bullets)."""
+    meta: dict = {}
+    body = text
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        if end != -1:
+            lines = text[3:end].splitlines()
+            body = text[end + 4:]
+            i = 0
+            while i < len(lines):
+                line = lines[i]
+                i += 1
+                if not line or line[0] in " \t#" or ":" not in line:
+                    continue
+                key, _, value = line.partition(":")
+                value = value.strip()
+                if value in (">", "|", ">-", "|-", ""):
+                    block = []
+                    while i < len(lines) and (not lines[i].strip() or lines[i][0] in " \t"):
+                        block.append(lines[i].strip())
+                        i += 1
+                    items = [_scalar(b[2:]) for b in block if b.startswith("- ")]
+                    meta[key] = items if items and value == "" else " ".join(b for b in block if b)
+                elif value.startswith("[") and value.endswith("]"):
+                    meta[key] = [_scalar(v) for v in value[1:-1].split(",") if v.strip()]
+                else:
+                    meta[key] = _scalar(value)
+
+    when, in_when = [], False
+    for line in body.splitlines():
+        if line.startswith("## "):
+            in_when = bool(WHEN_HEADING_RE.match(line))
+        elif in_when and line.lstrip().startswith(("- ", "* ")):
+            when.append(re.sub(r"[*`]", "", line.lstrip()[2:]).strip())
+
+    triggers = meta.get("triggers") or []
+    return {
+        "name": str(meta.get("name", "")),
+        "description": str(meta.get("description", "")),
+        "triggers": [triggers] if isinstance(triggers, str) else list(triggers),
+        "when": when,
+    }
+
+
+# ============================================================
+# INDEX
+# ============================================================
+
+
+def build_index(files: list[Path], fingerprint: str) -> dict:
+    skills, field_tokens = [], []
+    for f in files:
+        try:
+            info = parse_skill(f.read_text(errors="replace"))
+        except OSError:
+            continue
+        info["name"] = info["name"] or f.parent.name
+        info["path"] = str(f)
+        skills.append({k: info[k] for k in ("name", "description", "path")})
+
+        weights: dict[str, float] = {}
+        for field, texts in (("name", [info["name"].replace("-", " ")]), ("description", [info["description"]]),
+                             ("triggers", info["triggers"]), ("when", info["when"])):
+            for text in texts:
+                tokens = tokenize(text)
+                terms = tokens + (_bigrams(tokens) if field in ("triggers", "when", "description") else [])
+                for term in terms:
+                    weights[term] = weights.get(term, 0.0) + FIELD_WEIGHTS[field]
+        field_tokens.append(weights)
+
+    n = len(skills)
+    df: dict[str, int] = {}
+    for weights in field_tokens:
+        for term in weights:
+            df[term] = df.get(term, 0) + 1
+
+    postings: dict[str, list] = {}
+    for idx, weights in enumerate(field_tokens):
+        scored = {t: (1 + math.log(w)) * math.log(1 + n / df[t]) for t, w in weights.items()}
+        norm = math.sqrt(sum(v * v for v in scored.values())) or 1.0
+        for term, value in scored.items():
+            postings.setdefault(term, []).append([idx, round(value / norm, 4)])
+
+    return {"format": INDEX_FORMAT, "fingerprint": fingerprint, "built_at": time.time(),
+            "skills": skills, "names": {s["name"]: i for i, s in enumerate(skills)}, "postings": postings}
+
+
+def _index_path(dirs: list[Path]) -> Path:
+    key = hashlib.sha1("\n".join(str(d) for d in dirs).encode()).hexdigest()[:12]
+    return CACHE_DIR / f"skill-index-{key}.json"
+
+
+def load_index(dirs: list[Path] | None = None, force: bool = False) -> dict:
+    """The index for dirs, rebuilt only if any SKILL.md was added, removed or changed."""
+    dirs = dirs if dirs is not None else skill_dirs()
+    files = skill_files(dirs)
+    fingerprint = _fingerprint(files)
+    path = _index_path(dirs)
+    if not force:
+        try:
+            index = json.loads(path.read_text())
+            if index.get("format") == INDEX_FORMAT and index.get("fingerprint") == fingerprint:
+                return index
+        except (OSError, ValueError):
+            pass
+    index = build_index(files, fingerprint)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(index, separators=(",", ":")))
+        tmp.replace(path)
+    except OSError:
+        pass
+    return index
+
+
+def match(index: dict, prompt: str, k: int = 3) -> list[dict]:
+    """Top-k skills for prompt as [{name, description, path, score}], best first."""
+    tokens = tokenize(prompt)
+    scores: dict[int, float] = {}
+    for term in set(tokens + _bigrams(tokens)):
+        for idx, weight in index["postings"].get(term, ()):
+            scores[idx] = scores.get(idx, 0.0) + weight
+    lowered = prompt.lower()
+    for name, idx in index["names"].items():
+        if "-" in name and name.lower() in lowered:
+            scores[idx] = scores.get(idx, 0.0) + NAME_MATCH_BONUS
+    if not scores:
+        return []
+    best = max(scores.values())
+    ranked = sorted(scores.items(), key=lambda kv: -kv[1])
+    return [
+        {**index["skills"][idx], "score": round(score, 3)}
+        for idx, score in ranked[:k]
+        if score >= MIN_SCORE and score >= best * RELATIVE_CUTOFF
+    ]
+
+
+def hook_context(candidates: list[dict]) -> str:
+    lines = ["Skills matching this prompt (invoke with the Skill tool if relevant):"]
+    lines += [f"- {c['name']}: {c['description']}" for c in candidates]
+    return "\n".join(lines)
+
+
+def main():
+    args = sys.argv[1:]
+
+    if "--hook" in args:
+        # Fail open: a routing hint is never worth blocking a prompt over
+        try:
+            payload = json.loads(sys.stdin.read() or "{}")
+            candidates = match(load_index(), payload.get("prompt", ""))
+        except Exception:
+            return 0
+        if candidates:
+            print(json.dumps({"hookSpecificOutput": {"hookEventName": "UserPromptSubmit",
+                                                     "additionalContext": hook_context(candidates)}}))
+        return 0
+
+    command = args.pop(0) if args else "list"
+    if command == "build":
+        start = time.perf_counter()
+        index = load_index(force="--force" in args)
+        print(f"{len(index['skills'])} skills, {len(index['postings'])} terms "
+              f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return 0
+
+    if command == "list":
+        for skill in load_index()["skills"]:
+            print(f"{skill['name']:<32} {skill['description'][:90]}")
+        return 0
+
+    if command == "match":
+        as_json = "--json" in args
+        k = option(args, "-k", 3, int)
+        prompt = " ".join(a for a in args if a != "--json")
+        index = load_index()
+        start = time.perf_counter()
+        candidates = match(index, prompt, k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if as_json:
+            print(json.dumps(candidates, indent=2))
+        else:
+            for c in candidates:
+                print(f"{c['score']:6.3f}  {c['name']}")
+            print(f"{len(candidates)} candidates in {elapsed_ms:.3f} ms", file=sys.stderr)
+        return 0 if candidates else 1
+
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+"""
+Hook wrapper: per-event latency budgets, plus opt-in tracing with one span
+per hook invocation and a summary of where the time goes.
+
+Register a hook through the wrapper instead of directly:
+
+    "command": "uv run ~/.claude/hooks/_trace.py run lsp-reference-checker -- uv run ~/.claude/hooks/lsp-reference-checker.py"
+
+The wrapper runs the hook as a child, passes stdin/stdout/stderr through
+unchanged, and enforces the hook's latency budget for the event
+(_budget.py): past its timeout the hook's process group is killed and the
+fail-open/fail-closed policy decides the exit code. With
+CLAUDE_HOOK_BUDGETS=off and $CLAUDE_HOOK_TRACE unset it just exec's the hook.
+
+With CLAUDE_HOOK_TRACE=1 each invocation also appends a span:
+
+    ts, event, hook, tool, session_id   (event/tool/session from the payload)
+    duration_ms                         wall time of the child
+    exit, decision                      exit code; "block" (exit 2 or a
+                                        block/deny decision on stdout),
+                                        "allow" or "error"
+    payload_bytes, output_bytes         stdin and stdout size
+    child_user_ms, child_sys_ms,        CPU time and peak RSS of the hook
+    child_maxrss_kb                     and everything it spawned
+    timeout_ms, timed_out               budget applied, and whether it hit
+
+Spans go to $CLAUDE_HOOK_TRACE_FILE (default ~/.claude/cache/hook-trace.jsonl),
+one JSON line each, appended under a flock. Past MAX_BYTES the file is
+renamed to <file>.1 (replacing the previous one), so the trace is a
+two-segment ring that never exceeds about 2 * MAX_BYTES.
+
+Usage:
+    _trace.py run NAME -- COMMAND...     # run a hook within its budget, recording a span when enabled
+    _trace.py summary [--event E] [--hook H] [--since MINUTES] [--top N] [--json]
+    _trace.py tail [N]                   # last N spans (default 20)
+    _trace.py clear
+"""
+
+import fcntl
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import _budget  # noqa: E402
+from _cli import option  # noqa: E402
+
+CACHE_DIR = Path(os.environ.get("CLAUDE_CACHE_DIR", Path.home() / ".claude" / "cache"))
+TRACE_FILE = Path(os.environ.get("CLAUDE_HOOK_TRACE_FILE", CACHE_DIR / "hook-trace.jsonl"))
+MAX_BYTES = int(os.environ.get("CLAUDE_HOOK_TRACE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Histogram bucket upper bounds in ms; the last bucket is open-ended
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def enabled() -> bool:
+    return os.environ.get("CLAUDE_HOOK_TRACE", "") not in ("", "0", "false")
+
+
+# ============================================================
+# RECORDING
+# ============================================================
+
+
+def record(span: dict, path: Path = TRACE_FILE):
+    """Append one span; rotate to <path>.1 once the file passes MAX_BYTES."""
+    line = json.dumps(span, separators=(",", ":")).encode() + b"\n"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_size + len(line) > MAX_BYTES and path.exists():
+            os.replace(path, path.with_name(path.name + ".1"))
+            os.close(fd)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def decision_of(returncode: int, stdout: bytes) -> str:
+    """allow/block/error as Claude Code would read the hook's result."""
+    if returncode == 2:
+        return "block"
+    if returncode != 0:
+        return "error"
+    try:
+        output = json.loads(stdout)
+    except ValueError:
+        return "allow"
+    if not isinstance(output, dict):
+        return "allow"
+    specific = output.get("hookSpecificOutput") or {}
+    if output.get("decision") == "block" or specific.get("permissionDecision") == "deny" \
+            or output.get("continue") is False:
+        return "block"
+    return "allow"
+
+
+def _payload_fields(payload: bytes) -> dict:
+    try:
+        data = json.loads(payload or b"{}")
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {"event": data.get("hook_event_name"), "tool": data.get("tool_name"),
+            "session_id": data.get("session_id")}
+
+
+def _run_child(command: list[str], payload: bytes, timeout: float | None) -> tuple[int, bytes, bool]:
+    """(returncode, stdout, timed_out); a timed-out hook's whole process group is killed."""
+    proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, start_new_session=True)
+    try:
+        stdout, _ = proc.communicate(payload, timeout=timeout)
+        return proc.returncode, stdout, False
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        proc.communicate()
+        return proc.returncode, b"", True  # partial output is not a decision
+
+
+def run_supervised(name: str, command: list[str]) -> int:
+    """Run command as a hook child within its budget, passing stdio through; record its span when tracing."""
+    payload = sys.stdin.buffer.read()
+    fields = _payload_fields(payload)
+    event = fields.get("event") or os.environ.get("CLAUDE_HOOK_EVENT")
+    limit = _budget.limit_for(event, name) if _budget.enabled() else None
+
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    try:
+        returncode, stdout, timed_out = _run_child(command, payload, limit.timeout_ms / 1000 if limit else None)
+    except OSError as e:
+        print(f"trace: cannot run {command[0]}: {e}", file=sys.stderr)
+        returncode, stdout, timed_out = 1, b"", False
+    duration = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    if timed_out:
+        returncode = limit.exit_code
+        print(limit.message(duration * 1000), file=sys.stderr)
+        try:
+            _budget.count_violation(limit, duration * 1000)
+        except OSError:
+            pass
+    sys.stdout.buffer.write(stdout)
+    sys.stdout.flush()
+    if not enabled():
+        return returncode
+
+    span = {"ts": round(time.time(), 3), "hook": name, **fields, "event": event or "unknown",
+            "duration_ms": round(duration * 1000, 2), "exit": returncode,
+            "decision": decision_of(returncode, stdout),
+            "payload_bytes": len(payload), "output_bytes": len(stdout),
+            "child_user_ms": round((after.ru_utime - before.ru_utime) * 1000, 2),
+            "child_sys_ms": round((after.ru_stime - before.ru_stime) * 1000, 2),
+            # ru_maxrss of children is the largest single child, not a sum
+            "child_maxrss_kb": after.ru_maxrss,
+            "timeout_ms": limit.timeout_ms if limit else None, "timed_out": timed_out}
+    try:
+        record(span)
+    except OSError:
+        pass  # tracing must never change the hook's outcome
+    return returncode
+
+
+def run(name: str, command: list[str]) -> int:
+    if not command:
+        print("trace: no command given", file=sys.stderr)
+        return 1
+    if not enabled() and not _budget.enabled():
+        try:
+            os.execvp(command[0], command)
+        except OSError as e:
+            print(f"trace: cannot run {command[0]}: {e}", file=sys.stderr)
+            return 1
+    return run_supervised(name, command)
+
+
+# ============================================================
+# READING / SUMMARY
+# ============================================================
+
+
+def load_spans(path: Path = TRACE_FILE) -> list[dict]:
+    """Spans from the rotated segment then the current one, oldest first."""
+    spans = []
+    for segment in (path.with_name(path.name + ".1"), path):
+        try:
+            lines = segment.read_bytes().splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue  # a line torn by a crash mid-write
+    return spans
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def histogram(durations: list[float]) -> list[int]:
+    counts = [0] * (len(BUCKETS) + 1)
+    for d in durations:
+        counts[next((i for i, bound in enumerate(BUCKETS) if d < bound), len(BUCKETS))] += 1
+    return counts
+
+
+def summarize(spans: list[dict]) -> list[dict]:
+    """Per (event, hook) latency stats, most total time first."""
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for span in spans:
+        groups.setdefault((span.get("event") or "unknown", span.get("hook") or "?"), []).append(span)
+    rows = []
+    for (event, hook), group in groups.items():
+        durations = sorted(s.get("duration_ms", 0.0) for s in group)
+        decisions: dict[str, int] = {}
+        for s in group:
+            decisions[s.get("decision", "?")] = decisions.get(s.get("decision", "?"), 0) + 1
+        rows.append({
+            "event": event, "hook": hook, "count": len(group),
+            "total_ms": round(sum(durations), 1), "mean_ms": round(sum(durations) / len(durations), 1),
+            "p50_ms": _percentile(durations, 0.5), "p90_ms": _percentile(durations, 0.9),
+            "p99_ms": _percentile(durations, 0.99), "max_ms": durations[-1],
+            "child_cpu_ms": round(sum(s.get("child_user_ms", 0) + s.get("child_sys_ms", 0) for s in group), 1),
+            "mean_payload_bytes": round(sum(s.get("payload_bytes", 0) for s in group) / len(group)),
+            "decisions": decisions, "histogram": histogram(durations),
+        })
+    return sorted(rows, key=lambda r: -r["total_ms"])
+
+
+def _bucket_label(i: int) -> str:
+    if i == len(BUCKETS):
+        return f">={BUCKETS[-1]}"
+    return f"<{BUCKETS[i]}"
+
+
+def print_summary(spans: list[dict], top: int):
+    rows = summarize(spans)
+    total = sum(r["total_ms"] for r in rows)
+    first, last = spans[0].get("ts", 0), spans[-1].get("ts", 0)
+    print(f"{len(spans)} spans over {(last - first) / 60:.0f} min, {total / 1000:.1f} s in hooks ({TRACE_FILE})")
+    print()
+    print(f"{'event':<18} {'hook':<28} {'n':>5} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'total s':>8} {'share':>6}")
+    for r in rows:
+        share = r["total_ms"] / total if total else 0
+        print(f"{r['event'][:18]:<18} {r['hook'][:28]:<28} {r['count']:>5} {r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} {r['total_ms'] / 1000:>8.2f} {share:>6.0%}")
+
+    for r in rows[:top]:
+        print(f"\n{r['event']} / {r['hook']}  (decisions: "
+              + ", ".join(f"{k} {v}" for k, v in sorted(r["decisions"].items())) + ")")
+        peak = max(r["histogram"]) or 1
+        for i, n in enumerate(r["histogram"]):
+            if n:
+                print(f"  {_bucket_label(i):>7} ms {'#' * max(1, round(30 * n / peak)):<30} {n}")
+
+    slowest = sorted(spans, key=lambda s: -s.get("duration_ms", 0))[:top]
+    print(f"\nSlowest {len(slowest)} invocations:")
+    for s in slowest:
+        stamp = time.strftime("%m-%d %H:%M:%S", time.localtime(s.get("ts", 0)))
+        timed_out = " TIMED OUT" if s.get("timed_out") else ""
+        print(f"  {s.get('duration_ms', 0):>9.1f} ms{timed_out}  {stamp}  {s.get('event')}/{s.get('hook')}"
+              f"  tool={s.get('tool') or '-'} exit={s.get('exit')} payload={s.get('payload_bytes', 0)}B"
+              f" child cpu={s.get('child_user_ms', 0) + s.get('child_sys_ms', 0):.0f} ms")
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "summary"
+
+    if command == "run":
+        if "--" not in args or args.index("--") != 1:
+            print(__doc__.strip(), file=sys.stderr)
+            return 2
+        return run(args[0], args[2:])
+
+    if command == "summary":
+        spans = load_spans()
+        since = option(args, "--since", None, float)
+        if since:
+            cutoff = time.time() - since * 60
+            spans = [s for s in spans if s.get("ts", 0) >= cutoff]
+        for field in ("event", "hook"):
+            value = option(args, f"--{field}")
+            if value:
+                spans = [s for s in spans if s.get(field) == value]
+        if "--json" in args:
+            print(json.dumps(summarize(spans), indent=2))
+            return 0
+        if not spans:
+            print(f"No spans in {TRACE_FILE} (set CLAUDE_HOOK_TRACE=1 and run hooks through '_trace.py run')",
+                  file=sys.stderr)
+            return 1
+        print_summary(spans, option(args, "--top", 5, int))
+        return 0
+
+    if command == "tail":
+        for span in load_spans()[-int(args[0] if args else 20):]:
+            print(json.dumps(span))
+        return 0
+
+    if command == "clear":
+        for segment in (TRACE_FILE, TRACE_FILE.with_name(TRACE_FILE.name + ".1")):
+            segment.unlink(missing_ok=True)
+        return 0
+
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+# Adapted from: references/claude-code-hooks-mastery/.claude/hooks/user_prompt_submit.py on 2026-10-19
+"""
+UserPromptSubmit hook: block empty, oversized and injection-like prompts,
+and tell Claude where the prompt sits in the session.
+
+Rules come from _prompt_rules.py (combined block and allow matchers); the
+per-session history is _prompt_history.py's fixed-size ring under the
+per-user cache dir, so the cost stays constant however long the session
+runs.
+
+Input (stdin JSON):
+    {"session_id": "abc-123", "prompt": "the user's prompt text"}
+
+Output:
+    allowed: "Prompt #N in this session (started M min ago)" on stdout,
+             added to the prompt as context
+    blocked: reason on stderr
+
+Exit codes:
+    0 - allow (also when the payload carries no prompt string, and on any
+        internal error)
+    2 - block (including a present but blank prompt)
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def validate() -> int:
+    try:
+        payload = json.loads(sys.stdin.read() or "{}")
+        prompt = payload.get("prompt") if isinstance(payload, dict) else None
+        if not isinstance(prompt, str):
+            return 0
+        session_id = payload.get("session_id") or "unknown"
+
+        import _prompt_rules
+
+        verdict = _prompt_rules.load_rules().check(prompt)
+        if verdict.blocked:
+            print(f"Prompt blocked ({verdict.rule}): {verdict.message}", file=sys.stderr)
+            return 2
+
+        import _prompt_history
+
+        header = _prompt_history.record(str(session_id), prompt)
+        minutes = int((time.time() - header["first_ts"]) // 60)
+        started = f"started {minutes} min ago" if minutes else "started this minute"
+        print(f"Prompt #{header['count']} in this session ({started})")
+    except Exception:
+        # Never stand between the user and their prompt because of a hook bug
+        return 0
+    return 0
+
+
+def main():
+    sys.exit(validate())
+
+
+if __name__ == "__main__":
+    main()
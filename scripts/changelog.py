@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Structured changelog store behind CHANGELOG.md.
+
+Entries live in changelog/YYYY-MM.jsonl, one JSON object per line
+({"date", "category", "message", "hash"}), oldest first. Adding an entry
+appends one line to the current month's segment and one rendered line to
+its readable twin, changelog/YYYY-MM.md. CHANGELOG.md shows the newest
+RECENT_ENTRIES entries (newest first, read from the tail of the store) and
+links every month's file, so the full history stays readable in the repo
+while no step reads or rewrites all of it.
+
+A line without its trailing newline (a writer that died mid-append) is
+not an entry yet: readers skip it and the index picks it up once complete.
+
+"Is commit X logged" goes through a hash index in
+.cache/changelog-index.sqlite. The index remembers how far into each
+segment it has read and catches up on appended lines only; a segment that
+was rewritten (rebase, merge) is re-read in full.
+
+Usage:
+    python3 scripts/changelog.py add-head             # Log HEAD (post-commit hook)
+    python3 scripts/changelog.py add [--hash H] [--date D] MESSAGE
+    python3 scripts/changelog.py logged HASH          # Exit 0 if logged, 1 if not
+    python3 scripts/changelog.py render [--months]    # Regenerate CHANGELOG.md (--months: every YYYY-MM.md too)
+    python3 scripts/changelog.py show [--all | -n N]  # Print entries as markdown lines
+    python3 scripts/changelog.py import               # One-off: build the store from CHANGELOG.md
+"""
+
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+from cli_options import option
+
+REPO_ROOT = Path(__file__).parent.parent
+STORE_DIR = REPO_ROOT / "changelog"
+CHANGELOG_MD = REPO_ROOT / "CHANGELOG.md"
+INDEX_PATH = REPO_ROOT / ".cache" / "changelog-index.sqlite"
+
+RECENT_ENTRIES = 200
+
+HEADER = """# Changelog
+
+All notable changes to claude-code-templates are documented in this file.
+
+Format: `[YYYY-MM-DD] Category: Description (commit)`
+
+Entries are stored in `changelog/YYYY-MM.jsonl` and appended by the post-commit
+hook; this file shows the latest {recent}, and every month is rendered in full
+in `changelog/YYYY-MM.md` (see Archive below).
+
+## Log
+"""
+
+MONTH_HEADER = """# Changelog {month}
+
+Entries for {month}, oldest first; appended by the post-commit hook. Back to
+[CHANGELOG.md](../CHANGELOG.md).
+
+"""
+
+LINE_RE = re.compile(r"^\[(\d{4}-\d{2}-\d{2})\] ([^:]+): (.*?)(?: \(([0-9a-f]{7,40})\))?$")
+CATEGORY_RE = re.compile(r"^([a-zA-Z]+)(\([^)]*\))?[:!]?\s")
+
+
+def category_for(message: str) -> str:
+    """Category from a commit subject: "Fix x" -> fix, "feat(ui): x" -> feat."""
+    match = CATEGORY_RE.match(message)
+    if match:
+        return match.group(1).lower()[:20]
+    words = message.split()
+    return words[0].lower() if words else "misc"
+
+
+def format_entry(entry: dict) -> str:
+    line = f"[{entry['date']}] {entry['category']}: {entry['message']}"
+    return f"{line} ({entry['hash']})" if entry.get("hash") else line
+
+
+def _segments(store: Path = STORE_DIR) -> list[Path]:
+    return sorted(store.glob("*.jsonl"))
+
+
+def _parse(raw: bytes | str) -> dict | None:
+    """Entry from one complete store line; None for blank or damaged lines."""
+    if not raw.strip():
+        return None
+    try:
+        entry = json.loads(raw)
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+# ============================================================
+# WRITE
+# ============================================================
+
+
+def _append(path: Path, data: bytes):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def append_entry(entry: dict, store: Path = STORE_DIR) -> Path:
+    """Append one entry to its month's segment and rendered month file (one O_APPEND write each)."""
+    store.mkdir(parents=True, exist_ok=True)
+    segment = store / f"{entry['date'][:7]}.jsonl"
+    _append(segment, (json.dumps(entry, ensure_ascii=False) + "\n").encode())
+    month_md = segment.with_suffix(".md")
+    if month_md.exists():
+        _append(month_md, (format_entry(entry) + "\n").encode())
+    else:
+        render_month(segment)  # first entry of the month, or a store from before month files
+    return segment
+
+
+def entry_for_head() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True, cwd=REPO_ROOT).stdout.strip()
+
+    message = git("log", "-1", "--pretty=%s")
+    return {
+        "date": date.today().isoformat(),
+        "category": category_for(message),
+        "message": message,
+        "hash": git("rev-parse", "--short", "HEAD"),
+    }
+
+
+# ============================================================
+# READ
+# ============================================================
+
+
+def _tail_lines(path: Path, n: int, block: int = 65536) -> list[bytes]:
+    """Last n lines of a file, reading backwards in blocks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines()
+    return lines[-n:] if n else []
+
+
+def recent_entries(n: int, store: Path = STORE_DIR) -> list[dict]:
+    """The newest n entries, newest first, touching only the tail of the store."""
+    out: list[dict] = []
+    for segment in reversed(_segments(store)):
+        for raw in reversed(_tail_lines(segment, n - len(out))):
+            entry = _parse(raw)
+            if entry:
+                out.append(entry)
+        if len(out) >= n:
+            break
+    return out[:n]
+
+
+def segment_entries(segment: Path):
+    with open(segment, encoding="utf-8") as f:
+        for line in f:
+            entry = _parse(line) if line.endswith("\n") else None
+            if entry:
+                yield entry
+
+
+def all_entries(store: Path = STORE_DIR):
+    for segment in _segments(store):
+        yield from segment_entries(segment)
+
+
+# ============================================================
+# HASH INDEX
+# ============================================================
+
+
+def _connect(index_path: Path) -> sqlite3.Connection:
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(index_path))
+    conn.execute("CREATE TABLE IF NOT EXISTS entries (hash TEXT NOT NULL, segment TEXT NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS entries_hash ON entries(hash)")
+    conn.execute("CREATE TABLE IF NOT EXISTS segments (name TEXT PRIMARY KEY, size INTEGER, tail BLOB)")
+    return conn
+
+
+def _catch_up(conn: sqlite3.Connection, store: Path):
+    """Index lines appended since the last call; re-read segments that changed otherwise."""
+    known = {name: (size, tail) for name, size, tail in conn.execute("SELECT name, size, tail FROM segments")}
+    present = {p.name: p for p in _segments(store)}
+    with conn:
+        for name in set(known) - set(present):
+            conn.execute("DELETE FROM entries WHERE segment = ?", (name,))
+            conn.execute("DELETE FROM segments WHERE name = ?", (name,))
+        for name, path in present.items():
+            size = path.stat().st_size
+            start = 0
+            if name in known:
+                old_size, old_tail = known[name]
+                if size == old_size:
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(max(0, old_size - len(old_tail)))
+                    appended = size > old_size and f.read(len(old_tail)) == old_tail
+                if appended:
+                    start = old_size
+                else:
+                    conn.execute("DELETE FROM entries WHERE segment = ?", (name,))
+            with open(path, "rb") as f:
+                f.seek(start)
+                data = f.read(size - start)
+                # Stop at the last complete line; a partial one is read again once finished
+                complete = data[:data.rfind(b"\n") + 1]
+                indexed = start + len(complete)
+                f.seek(max(0, indexed - 64))
+                tail = f.read(indexed - max(0, indexed - 64))
+            rows = []
+            for raw in complete.splitlines():
+                entry = _parse(raw)
+                if entry and entry.get("hash"):
+                    rows.append((entry["hash"], name))
+            conn.executemany("INSERT INTO entries(hash, segment) VALUES (?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO segments(name, size, tail) VALUES (?, ?, ?)", (name, indexed, tail))
+
+
+def is_logged(commit: str, store: Path = STORE_DIR, index_path: Path = INDEX_PATH) -> bool:
+    """True if commit (full or abbreviated id) has an entry. Cost is independent of history length."""
+    commit = commit.strip().lower()
+    if len(commit) < 7:
+        return False
+    prefixes = [commit[:n] for n in range(7, len(commit) + 1)]
+    conn = _connect(index_path)
+    try:
+        _catch_up(conn, store)
+        query = f"SELECT 1 FROM entries WHERE hash IN ({','.join('?' * len(prefixes))}) LIMIT 1"
+        return conn.execute(query, prefixes).fetchone() is not None
+    finally:
+        conn.close()
+
+
+# ============================================================
+# RENDER / IMPORT
+# ============================================================
+
+
+def _write(path: Path, text: str):
+    tmp = path.with_suffix(".md.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+def render(path: Path = CHANGELOG_MD, recent: int = RECENT_ENTRIES, store: Path = STORE_DIR):
+    lines = [format_entry(e) for e in recent_entries(recent, store)]
+    months = [f"- [{s.stem}]({store.name}/{s.stem}.md)" for s in reversed(_segments(store))]
+    text = (HEADER.format(recent=recent) + "\n" + "\n".join(lines) + "\n\n## Archive\n\n"
+            + "\n".join(months) + "\n")
+    _write(path, text)
+
+
+def render_month(segment: Path):
+    """Rewrite segment's YYYY-MM.md in full (new months and `render --months` only)."""
+    lines = [format_entry(e) for e in segment_entries(segment)]
+    _write(segment.with_suffix(".md"), MONTH_HEADER.format(month=segment.stem) + "\n".join(lines) + "\n")
+
+
+def import_markdown(path: Path = CHANGELOG_MD, store: Path = STORE_DIR) -> int:
+    """Build the store from an existing CHANGELOG.md log (newest-first lines)."""
+    text = path.read_text()
+    _, _, log = text.partition("## Log")
+    entries = []
+    for line in log.splitlines():
+        match = LINE_RE.match(line.strip())
+        if match:
+            day, category, message, entry_hash = match.groups()
+            entries.append({"date": day, "category": category, "message": message, "hash": entry_hash})
+    if _segments(store):
+        raise FileExistsError(f"{store} already has entries")
+    for entry in reversed(entries):
+        append_entry(entry, store)
+    return len(entries)
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "show"
+
+    if command == "add-head":
+        append_entry(entry_for_head())
+        render()
+        return 0
+
+    if command == "add":
+        entry_hash = option(args, "--hash")
+        day = option(args, "--date", date.today().isoformat())
+        message = " ".join(args)
+        if not message:
+            print("add: missing MESSAGE", file=sys.stderr)
+            return 2
+        append_entry({"date": day, "category": category_for(message), "message": message, "hash": entry_hash})
+        render()
+        return 0
+
+    if command == "logged":
+        if not args:
+            print("logged: missing HASH", file=sys.stderr)
+            return 2
+        return 0 if is_logged(args[0]) else 1
+
+    if command == "render":
+        if "--months" in args:
+            for segment in _segments():
+                render_month(segment)
+        render(recent=option(args, "--recent", RECENT_ENTRIES, int))
+        return 0
+
+    if command == "show":
+        if "--all" in args:
+            entries = reversed(list(all_entries()))
+        else:
+            entries = recent_entries(option(args, "-n", 20, int))
+        for entry in entries:
+            print(format_entry(entry))
+        return 0
+
+    if command == "import":
+        count = import_markdown()
+        render()
+        print(f"Imported {count} entries into {STORE_DIR.relative_to(REPO_ROOT)}/")
+        return 0
+
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Directed component graph built from `related:` frontmatter.
+
+Nodes are every MANIFEST component; an edge A -> B means A's frontmatter
+lists B under related.{agents,skills,commands,workflows}. Adjacency is kept
+in compressed sparse row form (two array('i') per direction) indexed by
+integer node id, so traversals never touch per-node dicts or lists.
+
+Queries:
+  - dependents / impact: everything that (transitively) references X,
+    i.e. what needs re-checking when X changes
+  - dependencies: everything X (transitively) references
+  - cycles: strongly connected components with more than one node
+  - orphans: components with no related links in either direction
+  - unresolved: related references to names not in MANIFEST
+
+Usage:
+    python3 scripts/component_graph.py                    # Graph stats
+    python3 scripts/component_graph.py impact NAME...     # Components affected by NAME
+    python3 scripts/component_graph.py cycles             # Reference cycles
+    python3 scripts/component_graph.py orphans            # Unlinked components
+    python3 scripts/component_graph.py --changed [FILE...] [--format names|types|report]
+        # Impacted components for FILEs (default: staged files)
+"""
+
+import subprocess
+import sys
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cli_options import option
+from frontmatter import FrontmatterError, parse_frontmatter
+from manifest_index import DOC_TYPES, ManifestIndex, load_index
+
+REPO_ROOT = Path(__file__).parent.parent
+
+_loaded: dict[str, "ComponentGraph"] = {}
+
+
+def markdown_file(comp_type: str, comp: dict, repo_root: Path = REPO_ROOT) -> Path | None:
+    """The markdown file holding a doc component's frontmatter, or None."""
+    path = repo_root / comp["path"]
+    if path.is_dir():
+        if comp_type == "agents":
+            return path / "AGENT.md"
+        if comp_type == "skills":
+            return path / "SKILL.md"
+        return None
+    if path.is_file() and path.suffix == ".md":
+        return path
+    return None
+
+
+def related_refs(fm: dict | None) -> list[tuple[str, str]]:
+    """(ref_type, name) pairs from a frontmatter `related` mapping."""
+    related = (fm or {}).get("related")
+    if not isinstance(related, dict):
+        return []
+    refs = []
+    for ref_type in DOC_TYPES:
+        values = related.get(ref_type) or []
+        if isinstance(values, str):
+            values = values.split(",")
+        for ref in values:
+            if isinstance(ref, str) and ref.strip():
+                # Strip leading / from command references
+                refs.append((ref_type, ref.strip().lstrip("/")))
+    return refs
+
+
+def _csr(n: int, edges: list[tuple[int, int]]) -> tuple[array, array]:
+    """Compressed sparse rows: targets of node i are targets[offsets[i]:offsets[i+1]]."""
+    offsets = array("i", [0]) * (n + 1)
+    for src, _ in edges:
+        offsets[src + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    targets = array("i", [0]) * len(edges)
+    fill = array("i", offsets[:n])
+    for src, dst in edges:
+        targets[fill[src]] = dst
+        fill[src] += 1
+    return offsets, targets
+
+
+@dataclass
+class ComponentGraph:
+    """Integer-indexed component graph with forward and reverse CSR adjacency."""
+
+    names: list[str]
+    types: list[str]
+    ids: dict[str, int]
+    offsets: array
+    targets: array
+    rev_offsets: array
+    rev_targets: array
+    unresolved: list[tuple[str, str, str, str]] = field(default_factory=list)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def successors(self, node: int) -> array:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def predecessors(self, node: int) -> array:
+        return self.rev_targets[self.rev_offsets[node]:self.rev_offsets[node + 1]]
+
+    def _reach(self, starts, offsets: array, targets: array) -> list[int]:
+        seen = bytearray(len(self.names))
+        stack = []
+        for node in starts:
+            if not seen[node]:
+                seen[node] = 1
+                stack.append(node)
+        order = []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            for k in range(offsets[node], offsets[node + 1]):
+                nxt = targets[k]
+                if not seen[nxt]:
+                    seen[nxt] = 1
+                    stack.append(nxt)
+        return order
+
+    def _ids_for(self, names) -> list[int]:
+        return [self.ids[n] for n in names if n in self.ids]
+
+    def impact(self, names) -> set[str]:
+        """The named components plus everything that transitively references them."""
+        order = self._reach(self._ids_for(names), self.rev_offsets, self.rev_targets)
+        return {self.names[i] for i in order}
+
+    def dependencies(self, names) -> set[str]:
+        """The named components plus everything they transitively reference."""
+        order = self._reach(self._ids_for(names), self.offsets, self.targets)
+        return {self.names[i] for i in order}
+
+    def cycles(self) -> list[list[str]]:
+        """Strongly connected components of size > 1, or with a self-loop (iterative Tarjan)."""
+        n = len(self.names)
+        index = array("i", [-1]) * n
+        low = array("i", [0]) * n
+        on_stack = bytearray(n)
+        stack: list[int] = []
+        sccs = []
+        counter = 0
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            work = [(root, self.offsets[root])]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            while work:
+                node, k = work[-1]
+                if k < self.offsets[node + 1]:
+                    work[-1] = (node, k + 1)
+                    nxt = self.targets[k]
+                    if index[nxt] == -1:
+                        index[nxt] = low[nxt] = counter
+                        counter += 1
+                        stack.append(nxt)
+                        on_stack[nxt] = 1
+                        work.append((nxt, self.offsets[nxt]))
+                    elif on_stack[nxt]:
+                        low[node] = min(low[node], index[nxt])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.successors(node):
+                        sccs.append(sorted(self.names[i] for i in component))
+        return sccs
+
+    def orphans(self, types=DOC_TYPES) -> list[str]:
+        """Components of the given types with no related links in or out."""
+        return [
+            name
+            for i, name in enumerate(self.names)
+            if self.types[i] in types
+            and self.offsets[i] == self.offsets[i + 1]
+            and self.rev_offsets[i] == self.rev_offsets[i + 1]
+        ]
+
+    def components_for_paths(self, paths, index: ManifestIndex) -> set[str]:
+        """Map repo-relative file paths to the components that own them."""
+        owned = set()
+        for rel in paths:
+            candidate = Path(rel)
+            while candidate.parts:
+                comp = index.by_path.get(candidate.as_posix())
+                if comp:
+                    owned.add(comp["name"])
+                    break
+                candidate = candidate.parent
+        return owned
+
+
+def build_graph(index: ManifestIndex, repo_root: Path = REPO_ROOT) -> ComponentGraph:
+    """Build the graph from MANIFEST components and their `related:` frontmatter."""
+    names, types, ids = [], [], {}
+    for comp_type, comps in index.by_type.items():
+        for comp in comps:
+            ids[comp["name"]] = len(names)
+            names.append(comp["name"])
+            types.append(comp_type)
+
+    edges: list[tuple[int, int]] = []
+    unresolved = []
+    for comp_type in DOC_TYPES:
+        for comp in index.of_type(comp_type):
+            md_file = markdown_file(comp_type, comp, repo_root)
+            if md_file is None:
+                continue
+            try:
+                fm = parse_frontmatter(md_file)
+            except FrontmatterError:
+                continue
+            src = ids[comp["name"]]
+            for ref_type, ref in related_refs(fm):
+                # Resolve short command names via lookup
+                target = index.resolve_command(ref) if ref_type == "commands" else ref
+                if target in index.names_by_type.get(ref_type, ()):
+                    edges.append((src, ids[target]))
+                else:
+                    unresolved.append((comp_type, comp["name"], ref_type, target))
+
+    edges = sorted(set(edges))
+    offsets, targets = _csr(len(names), edges)
+    rev_offsets, rev_targets = _csr(len(names), sorted((dst, src) for src, dst in edges))
+    return ComponentGraph(names, types, ids, offsets, targets, rev_offsets, rev_targets, unresolved)
+
+
+def load_graph(manifest_path: Path | None = None) -> ComponentGraph:
+    """Return the component graph, built at most once per process."""
+    index = load_index(manifest_path)
+    if index.digest not in _loaded:
+        _loaded[index.digest] = build_graph(index)
+    return _loaded[index.digest]
+
+
+def staged_files() -> list[str]:
+    try:
+        result = subprocess.run(
+            ["git", "diff", "--cached", "--name-only"],
+            capture_output=True, text=True, cwd=REPO_ROOT, timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def main():
+    args = sys.argv[1:]
+    fmt = option(args, "--format", "report")
+    graph = load_graph()
+
+    if args and args[0] == "--changed":
+        index = load_index()
+        paths = args[1:] or staged_files()
+        changed = graph.components_for_paths(paths, index)
+        impacted = graph.impact(changed)
+        if fmt == "names":
+            print("\n".join(sorted(impacted)))
+        elif fmt == "types":
+            print(",".join(sorted({graph.types[graph.ids[n]] for n in impacted})))
+        else:
+            print(f"Changed components: {len(changed)}")
+            for name in sorted(changed):
+                print(f"  {name}")
+            print(f"Impacted (changed + dependents): {len(impacted)}")
+            for name in sorted(impacted - changed):
+                print(f"  {name}")
+        return 0
+
+    if args and args[0] == "impact":
+        unknown = [n for n in args[1:] if n not in graph.ids]
+        for name in unknown:
+            print(f"Unknown component: {name}", file=sys.stderr)
+        for name in sorted(graph.impact(args[1:]) - set(args[1:])):
+            print(f"  {graph.types[graph.ids[name]][:-1]}: {name}")
+        return 1 if unknown else 0
+
+    if args and args[0] == "cycles":
+        cycles = graph.cycles()
+        for members in cycles:
+            print(f"  {' <-> '.join(members)}")
+        print(f"{len(cycles)} cycle(s)")
+        return 0
+
+    if args and args[0] == "orphans":
+        orphans = graph.orphans()
+        for name in orphans:
+            print(f"  {graph.types[graph.ids[name]][:-1]}: {name}")
+        print(f"{len(orphans)} orphan(s)")
+        return 0
+
+    print(f"Nodes:      {len(graph.names)}")
+    print(f"Edges:      {graph.edge_count}")
+    print(f"Unresolved: {len(graph.unresolved)}")
+    print(f"Cycles:     {len(graph.cycles())}")
+    print(f"Orphans:    {len(graph.orphans())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
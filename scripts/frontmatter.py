@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Shared YAML frontmatter parser for validators and the sandbox test runner.
+
+Parses the leading "---" block of a markdown file into real YAML structures
+(nested dicts, block and flow lists, typed scalars) so every consumer sees
+the same values. Backends, fastest first:
+
+  1. PyYAML with the libyaml C loader (yaml.CSafeLoader)
+  2. PyYAML's pure-Python SafeLoader
+  3. A built-in pure-Python parser for the YAML subset frontmatter uses
+     (mappings, sequences, flow collections, quoted/plain scalars, block
+     scalars), so validate-docs.py still runs without PyYAML installed
+
+parse_frontmatter() caches results per file keyed by (mtime_ns, size);
+callers must treat the returned dict as read-only.
+
+Usage:
+    python3 scripts/frontmatter.py FILE...        # Print parsed frontmatter as JSON
+    python3 scripts/frontmatter.py --bench [N]    # Throughput over the component tree, N rounds
+"""
+
+import datetime
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - exercised when PyYAML is absent
+    yaml = None
+
+REPO_ROOT = Path(__file__).parent.parent
+
+FRONTMATTER_RE = re.compile(r"\A---[ \t]*\r?\n(.*?)(?:\r?\n)?^---[ \t]*(?:\r?\n|\Z)", re.DOTALL | re.MULTILINE)
+
+_cache: dict[Path, tuple[tuple[int, int], dict | None]] = {}
+
+
+class FrontmatterError(ValueError):
+    """Raised when a frontmatter block exists but is not a valid YAML mapping."""
+
+
+def split_frontmatter(text: str) -> tuple[str | None, str]:
+    """Return (yaml_text, body). yaml_text is None when there is no frontmatter."""
+    match = FRONTMATTER_RE.match(text)
+    if not match:
+        return None, text
+    return match.group(1), text[match.end():]
+
+
+# ============================================================
+# Pure-Python fallback parser
+# ============================================================
+
+_BOOL_VALUES = {
+    "true": True, "True": True, "TRUE": True, "yes": True, "Yes": True, "YES": True,
+    "on": True, "On": True, "ON": True,
+    "false": False, "False": False, "FALSE": False, "no": False, "No": False, "NO": False,
+    "off": False, "Off": False, "OFF": False,
+}
+_NULL_VALUES = {"", "~", "null", "Null", "NULL"}
+_INT_RE = re.compile(r"^[-+]?(?:0|[1-9][0-9_]*)$")
+_BASE_INT_RE = re.compile(r"^([-+]?)(?:0x([0-9a-fA-F_]+)|0([0-7_]+))$")
+_FLOAT_RE = re.compile(r"^[-+]?(?:[0-9][0-9_]*)?\.[0-9_]*(?:[eE][-+][0-9]+)?$")
+_DATE_RE = re.compile(r"^(\d{4})-(\d\d)-(\d\d)$")
+_KEY_RE = re.compile(
+    r"""^("(?:[^"\\]|\\.)*"|'(?:[^']|'')*'|[^\s'"#\[\]{}\-?:][^:#]*?|-[^\s:#][^:#]*?)\s*:(?:[ \t]+|$)(.*)$"""
+)
+
+
+def _strip_comment(value: str) -> str:
+    """Drop a trailing " # comment" that is not inside quotes."""
+    quote = None
+    for i, ch in enumerate(value):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "#" and (i == 0 or value[i - 1] in " \t"):
+            return value[:i].rstrip()
+    return value.rstrip()
+
+
+def _plain_scalar(value: str):
+    if value in _NULL_VALUES:
+        return None
+    if value in _BOOL_VALUES:
+        return _BOOL_VALUES[value]
+    if _INT_RE.match(value):
+        return int(value.replace("_", ""))
+    based = _BASE_INT_RE.match(value)
+    if based:
+        sign, hex_digits, oct_digits = based.groups()
+        number = int((hex_digits or oct_digits).replace("_", ""), 16 if hex_digits else 8)
+        return -number if sign == "-" else number
+    if _FLOAT_RE.match(value) and any(c.isdigit() for c in value):
+        return float(value.replace("_", ""))
+    date = _DATE_RE.match(value)
+    if date:
+        return datetime.date(*map(int, date.groups()))
+    return value
+
+
+def _quoted_scalar(value: str) -> str:
+    if value[0] == '"':
+        try:
+            return json.loads(value)
+        except ValueError as e:
+            raise FrontmatterError(f"invalid double-quoted string: {value}") from e
+    return value[1:-1].replace("''", "'")
+
+
+class _FlowParser:
+    """Parses flow collections: [a, b], {k: v}, nested."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def parse(self):
+        value = self.value()
+        self.skip()
+        if self.pos != len(self.text):
+            raise FrontmatterError(f"unexpected trailing text in flow value: {self.text}")
+        return value
+
+    def skip(self):
+        while self.pos < len(self.text) and self.text[self.pos] in " \t\r\n":
+            self.pos += 1
+
+    def value(self):
+        self.skip()
+        if self.pos >= len(self.text):
+            raise FrontmatterError(f"unterminated flow value: {self.text}")
+        ch = self.text[self.pos]
+        if ch == "[":
+            return self.sequence()
+        if ch == "{":
+            return self.mapping()
+        if ch in "'\"":
+            return self.quoted()
+        start = self.pos
+        while self.pos < len(self.text) and self.text[self.pos] not in ",]}":
+            if self.text[self.pos] == ":" and self.text[self.pos + 1:self.pos + 2] in (" ", ""):
+                break
+            self.pos += 1
+        return _plain_scalar(self.text[start:self.pos].strip())
+
+    def quoted(self):
+        quote = self.text[self.pos]
+        end = self.pos + 1
+        while end < len(self.text):
+            if self.text[end] == "\\" and quote == '"':
+                end += 2
+                continue
+            if self.text[end] == quote:
+                if quote == "'" and self.text[end + 1:end + 2] == "'":
+                    end += 2
+                    continue
+                break
+            end += 1
+        raw = self.text[self.pos:end + 1]
+        self.pos = end + 1
+        return _quoted_scalar(raw)
+
+    def sequence(self):
+        self.pos += 1
+        items = []
+        while True:
+            self.skip()
+            if self.text[self.pos:self.pos + 1] == "]":
+                self.pos += 1
+                return items
+            items.append(self.value())
+            self.skip()
+            if self.text[self.pos:self.pos + 1] == ",":
+                self.pos += 1
+            elif self.text[self.pos:self.pos + 1] != "]":
+                raise FrontmatterError(f"expected ',' or ']' in flow sequence: {self.text}")
+
+    def mapping(self):
+        self.pos += 1
+        result = {}
+        while True:
+            self.skip()
+            if self.text[self.pos:self.pos + 1] == "}":
+                self.pos += 1
+                return result
+            key = self.value()
+            self.skip()
+            value = None
+            if self.text[self.pos:self.pos + 1] == ":":
+                self.pos += 1
+                self.skip()
+                if self.text[self.pos:self.pos + 1] not in (",", "}"):
+                    value = self.value()
+            result[key] = value
+            self.skip()
+            if self.text[self.pos:self.pos + 1] == ",":
+                self.pos += 1
+            elif self.text[self.pos:self.pos + 1] != "}":
+                raise FrontmatterError(f"expected ',' or '}}' in flow mapping: {self.text}")
+
+
+def _indent_of(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _significant(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith("#")
+
+
+class _BlockParser:
+    """Indentation-driven parser for block mappings and sequences."""
+
+    def __init__(self, text: str):
+        if re.search(r"^ *\t", text, re.MULTILINE):
+            raise FrontmatterError("tabs are not allowed for YAML indentation")
+        self.lines = text.split("\n")
+        self.i = 0
+
+    def peek(self) -> int | None:
+        """Index of the next significant line, or None."""
+        j = self.i
+        while j < len(self.lines) and not _significant(self.lines[j]):
+            j += 1
+        return j if j < len(self.lines) else None
+
+    def parse(self):
+        j = self.peek()
+        if j is None:
+            return None
+        value = self.block(_indent_of(self.lines[j]))
+        if self.peek() is not None:
+            raise FrontmatterError(f"unexpected indentation at line {self.peek() + 1}")
+        return value
+
+    def block(self, indent: int):
+        j = self.peek()
+        content = self.lines[j][indent:]
+        if content == "-" or content.startswith("- "):
+            return self.sequence(indent)
+        if _KEY_RE.match(content):
+            return self.mapping(indent)
+        self.i = j + 1
+        return self.inline(content.strip(), indent - 1)
+
+    def mapping(self, indent: int) -> dict:
+        result = {}
+        while True:
+            j = self.peek()
+            if j is None or _indent_of(self.lines[j]) != indent:
+                return result
+            content = self.lines[j][indent:]
+            match = _KEY_RE.match(content)
+            if not match:
+                if content == "-" or content.startswith("- "):
+                    return result
+                raise FrontmatterError(f"expected 'key: value' at line {j + 1}: {content}")
+            raw_key, rest = match.group(1), _strip_comment(match.group(2))
+            key = _quoted_scalar(raw_key) if raw_key[0] in "'\"" else _plain_scalar(raw_key)
+            self.i = j + 1
+            result[key] = self.value_after(rest, indent)
+
+    def sequence(self, indent: int) -> list:
+        items = []
+        while True:
+            j = self.peek()
+            if j is None or _indent_of(self.lines[j]) != indent:
+                return items
+            content = self.lines[j][indent:]
+            if not (content == "-" or content.startswith("- ")):
+                return items
+            rest = content[1:].lstrip(" ")
+            if not rest or rest.startswith("#"):
+                self.i = j + 1
+                items.append(self.value_after("", indent))
+                continue
+            # "- key: value" / "- - x": re-read the item as a nested block
+            # starting at the column of its content
+            column = indent + (len(content) - len(rest))
+            if _KEY_RE.match(rest) or rest == "-" or rest.startswith("- "):
+                self.lines[j] = " " * column + rest
+                items.append(self.block(column))
+            else:
+                self.i = j + 1
+                items.append(self.inline(_strip_comment(rest), indent))
+
+    def value_after(self, rest: str, indent: int):
+        """Value for a key/item whose inline remainder is `rest`."""
+        if rest and rest[0] in "|>":
+            return self.block_scalar(rest, indent)
+        if rest:
+            return self.inline(rest, indent)
+        j = self.peek()
+        if j is None:
+            return None
+        child = _indent_of(self.lines[j])
+        content = self.lines[j][child:]
+        if child > indent:
+            return self.block(child)
+        if child == indent and (content == "-" or content.startswith("- ")):
+            # YAML allows a sequence at the same indent as its parent key
+            return self.sequence(child)
+        return None
+
+    def inline(self, value: str, indent: int):
+        """Flow collection or scalar, folding continuation lines deeper than indent."""
+        parts = [value]
+        while True:
+            j = self.peek()
+            if j is None or _indent_of(self.lines[j]) <= indent:
+                break
+            if value[:1] not in "[{\"'" and _KEY_RE.match(self.lines[j].strip()):
+                break
+            parts.append(_strip_comment(self.lines[j].strip()))
+            self.i = j + 1
+        text = " ".join(parts)
+        if text[:1] in "[{":
+            return _FlowParser(text).parse()
+        if text[:1] in "'\"":
+            return _quoted_scalar(text)
+        return _plain_scalar(text)
+
+    def block_scalar(self, header: str, indent: int) -> str:
+        style, chomp = header[0], ""
+        for ch in header[1:].strip():
+            if ch in "+-":
+                chomp = ch
+        lines = []
+        block_indent = None
+        while self.i < len(self.lines):
+            line = self.lines[self.i]
+            if line.strip():
+                current = _indent_of(line)
+                if current <= indent:
+                    break
+                if block_indent is None:
+                    block_indent = current
+                lines.append(line[block_indent:] if current >= block_indent else line.lstrip(" "))
+            else:
+                lines.append("")
+            self.i += 1
+
+        trailing = 0
+        while lines and lines[-1] == "":
+            lines.pop()
+            trailing += 1
+
+        if style == "|":
+            text = "\n".join(lines)
+        else:
+            text = ""
+            for k, line in enumerate(lines):
+                if k == 0:
+                    text = line
+                elif line == "" or line.startswith(" ") or lines[k - 1].startswith(" "):
+                    text += "\n" + line
+                elif lines[k - 1] == "":
+                    text += line
+                else:
+                    text += " " + line
+
+        if not lines:
+            return ""
+        if chomp == "-":
+            return text
+        if chomp == "+":
+            return text + "\n" * (trailing + 1)
+        return text + "\n"
+
+
+def _fallback_load(yaml_text: str):
+    return _BlockParser(yaml_text).parse()
+
+
+# ============================================================
+# Public API
+# ============================================================
+
+
+def _backend_loader(backend: str):
+    if backend == "c" and yaml is not None and getattr(yaml, "CSafeLoader", None):
+        return lambda text: yaml.load(text, Loader=yaml.CSafeLoader)
+    if backend in ("c", "pyyaml") and yaml is not None:
+        return lambda text: yaml.load(text, Loader=yaml.SafeLoader)
+    return _fallback_load
+
+
+def available_backends() -> list[str]:
+    backends = []
+    if yaml is not None and getattr(yaml, "CSafeLoader", None):
+        backends.append("c")
+    if yaml is not None:
+        backends.append("pyyaml")
+    backends.append("fallback")
+    return backends
+
+
+BACKEND = available_backends()[0]
+_load = _backend_loader(BACKEND)
+
+
+def parse_frontmatter_text(text: str, loader=None) -> dict | None:
+    """Parse frontmatter from markdown text. None if absent; FrontmatterError if invalid."""
+    yaml_text, _ = split_frontmatter(text)
+    if yaml_text is None:
+        return None
+    try:
+        data = (loader or _load)(yaml_text)
+    except FrontmatterError:
+        raise
+    except Exception as e:
+        raise FrontmatterError(str(e)) from e
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise FrontmatterError(f"frontmatter is a {type(data).__name__}, expected a mapping")
+    return data
+
+
+def parse_frontmatter(filepath: Path) -> dict | None:
+    """Parse (and cache) a file's frontmatter. None if unreadable or absent."""
+    filepath = Path(filepath)
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _cache.get(filepath)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    try:
+        text = filepath.read_text()
+    except (OSError, UnicodeDecodeError):
+        return None
+    result = parse_frontmatter_text(text)
+    _cache[filepath] = (key, result)
+    return result
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+
+def _component_markdown() -> list[Path]:
+    files = []
+    for base in (REPO_ROOT / ".claude", REPO_ROOT / "templates"):
+        if base.exists():
+            files.extend(p for p in base.rglob("*.md") if "node_modules" not in p.parts)
+    return sorted(files)
+
+
+def _bench(rounds: int):
+    files = _component_markdown()
+    texts = [f.read_text(errors="replace") for f in files]
+    with_fm = sum(1 for t in texts if split_frontmatter(t)[0] is not None)
+    print(f"Files: {len(files)} markdown, {with_fm} with frontmatter, {rounds} round(s)")
+    print(f"Default backend: {BACKEND}")
+    print()
+    print(f"  {'backend':<16} {'files/s':>12} {'us/file':>10} {'errors':>7}")
+
+    for backend in available_backends():
+        loader = _backend_loader(backend)
+        errors = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in texts:
+                try:
+                    parse_frontmatter_text(text, loader)
+                except FrontmatterError:
+                    errors += 1
+        elapsed = time.perf_counter() - start
+        n = len(texts) * rounds
+        print(f"  {backend:<16} {n / elapsed if elapsed else 0:>12,.0f} {elapsed / max(n, 1) * 1e6:>10.1f} {errors // rounds:>7}")
+
+    _cache.clear()
+    start = time.perf_counter()
+    for f in files:
+        try:
+            parse_frontmatter(f)
+        except FrontmatterError:
+            pass
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for f in files:
+            try:
+                parse_frontmatter(f)
+            except FrontmatterError:
+                pass
+    warm = (time.perf_counter() - start) / rounds
+    n = max(len(files), 1)
+    print(f"  {'cached (cold)':<16} {n / cold if cold else 0:>12,.0f} {cold / n * 1e6:>10.1f}")
+    print(f"  {'cached (warm)':<16} {n / warm if warm else 0:>12,.0f} {warm / n * 1e6:>10.1f}")
+
+
+def main():
+    args = sys.argv[1:]
+    if "--bench" in args:
+        idx = args.index("--bench")
+        rounds = int(args[idx + 1]) if idx + 1 < len(args) else 20
+        _bench(rounds)
+        return 0
+
+    exit_code = 0
+    for arg in args:
+        try:
+            data = parse_frontmatter(Path(arg))
+        except FrontmatterError as e:
+            print(f"{arg}: invalid frontmatter: {e}")
+            exit_code = 1
+            continue
+        print(f"{arg}: {json.dumps(data, indent=2, default=str)}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,10 +10,11 @@ Usage:
     python3 scripts/install-global.py --dry-run   # Preview only
 """
 
-import json
 import sys
 from pathlib import Path
 
+from manifest_index import ManifestIndex, load_index
+
 REPO_ROOT = Path(__file__).parent.parent
 TEMPLATES = REPO_ROOT / ".claude"
 TARGET = Path.home() / ".claude"
@@ -26,31 +27,33 @@ CATEGORY_DIR = {
     "workflows": "workflows",
 }
 
+# MANIFEST component types the installer reads (templates/examples are never
+# installed globally, so their shards are not loaded)
+MANIFEST_TYPES = ["commands", "agents", "skills", "workflows", "hooks"]
+
 # Directories to always create
 INSTALL_DIRS = ["commands", "agents", "skills", "workflows", "hooks", "rules"]
 
 
-def load_manifest() -> dict:
-    manifest_path = REPO_ROOT / "MANIFEST.json"
-    with open(manifest_path) as f:
-        return json.load(f)
+def load_manifest() -> ManifestIndex:
+    return load_index(REPO_ROOT / "MANIFEST.json", types=MANIFEST_TYPES)
 
 
-def get_global_components(manifest: dict) -> list[dict]:
+def get_global_components(index: ManifestIndex) -> list[dict]:
     """Return all components with deployment: global, tagged with their type."""
     result = []
     for comp_type in ["commands", "agents", "skills", "workflows"]:
-        for comp in manifest.get("components", {}).get(comp_type, []):
+        for comp in index.of_type(comp_type):
             if comp.get("deployment") == "global":
-                result.append({**comp, "_type": comp_type})
+                result.append(comp)
     return result
 
 
-def get_global_hooks(manifest: dict) -> list[dict]:
+def get_global_hooks(index: ManifestIndex) -> list[dict]:
     """Return hooks that have a path field (command-type hooks with scripts)."""
     hooks = []
-    for hook in manifest.get("components", {}).get("hooks", []):
-        if hook.get("deployment") == "global" and hook.get("path"):
+    for hook in index.by_deployment.get("global", []):
+        if hook["_type"] == "hooks" and hook.get("path"):
             hooks.append(hook)
     return hooks
 
@@ -143,7 +146,7 @@ def install_component(comp: dict, dry_run: bool) -> bool:
     return True
 
 
-def install_hooks(manifest: dict, dry_run: bool) -> int:
+def install_hooks(index: ManifestIndex, dry_run: bool) -> int:
     """Install hooks.json and hook scripts."""
     count = 0
 
@@ -161,7 +164,7 @@ def install_hooks(manifest: dict, dry_run: bool) -> int:
         count += 1
 
     # Install hook scripts referenced in MANIFEST
-    for hook in get_global_hooks(manifest):
+    for hook in get_global_hooks(index):
         src = REPO_ROOT / hook["path"]
         if not src.exists():
             print(f"  SKIP (missing): {hook['path']}")
@@ -176,6 +179,20 @@ def install_hooks(manifest: dict, dry_run: bool) -> int:
             print(f"  {src.name}")
         count += 1
 
+    # Shared helper modules (_*.py) the hook scripts import or shell hooks call
+    hooks_src = TEMPLATES / "hooks"
+    if hooks_src.exists():
+        for src in sorted(hooks_src.glob("_*.py")):
+            dest = TARGET / "hooks" / src.name
+            if dry_run:
+                print(f"  Would link: {src.name} -> {src}")
+            else:
+                if dest.is_symlink() or dest.exists():
+                    dest.unlink()
+                dest.symlink_to(src)
+                print(f"  {src.name}")
+            count += 1
+
     return count
 
 
@@ -235,8 +252,8 @@ def verify_installation() -> tuple[dict, int]:
 def main():
     dry_run = "--dry-run" in sys.argv
 
-    manifest = load_manifest()
-    components = get_global_components(manifest)
+    index = load_manifest()
+    components = get_global_components(index)
 
     mode = "DRY RUN" if dry_run else "Installing"
     print(f"=== Claude Code Global Installation ({mode}) ===")
@@ -285,7 +302,7 @@ def main():
 
     # Phase 7: Hooks and rules
     print("Phase 7: Symlinking hooks and rules...")
-    hook_count = install_hooks(manifest, dry_run)
+    hook_count = install_hooks(index, dry_run)
     rule_count = install_rules(dry_run)
     print()
 
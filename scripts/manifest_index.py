@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Compiled MANIFEST.json snapshot with prebuilt lookup indexes.
+
+Every tool used to json.load MANIFEST.json and rebuild the same name/path/type
+sets on its own. This module compiles the manifest once into a pickle snapshot
+stored under .cache/, invalidated by the SHA-256 of MANIFEST.json (and of any
+shard files it loaded), holding:
+
+  - by_name:         component name -> component
+  - by_path:         component path -> component
+  - by_type:         component type -> [components]
+  - by_deployment:   deployment level -> [components]
+  - cmd_short_names: short command name -> full command name
+
+Components in the indexes are copies tagged with "_type" (same convention as
+install-global.py). Within one process the index is loaded at most once.
+
+MANIFEST.json may optionally be sharded: the root keeps metadata plus a
+"shards" map (shard file -> component types), and loaders that only need some
+types read only the matching shards. load_manifest() returns the same merged
+dict a monolithic MANIFEST.json would.
+
+Usage:
+    python3 scripts/manifest_index.py                 # Build/refresh snapshot, print stats
+    python3 scripts/manifest_index.py --rebuild       # Force a rebuild
+    python3 scripts/manifest_index.py split [DIR]     # Shard per type into DIR (default: manifest/)
+    python3 scripts/manifest_index.py split --by-template  # ...template entries per template
+    python3 scripts/manifest_index.py join            # Fold shards back into MANIFEST.json
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+CACHE_DIR = REPO_ROOT / ".cache"
+
+# Bump when the snapshot layout changes so stale pickles are ignored
+SNAPSHOT_FORMAT = 2
+
+# Types whose entries are markdown-backed components (have frontmatter, "related")
+DOC_TYPES = ["agents", "skills", "commands", "workflows"]
+
+_loaded: dict[tuple, "ManifestIndex"] = {}
+
+
+@dataclass
+class ManifestIndex:
+    """Prebuilt lookup tables over MANIFEST.json."""
+
+    digest: str
+    manifest: dict
+    by_name: dict[str, dict] = field(default_factory=dict)
+    by_path: dict[str, dict] = field(default_factory=dict)
+    by_type: dict[str, list[dict]] = field(default_factory=dict)
+    by_deployment: dict[str, list[dict]] = field(default_factory=dict)
+    cmd_short_names: dict[str, str] = field(default_factory=dict)
+    names_by_type: dict[str, set[str]] = field(default_factory=dict)
+    paths_by_type: dict[str, set[str]] = field(default_factory=dict)
+
+    @property
+    def components(self) -> dict:
+        return self.manifest.get("components", {})
+
+    def of_type(self, comp_type: str) -> list[dict]:
+        return self.by_type.get(comp_type, [])
+
+    def resolve_command(self, ref: str) -> str:
+        """Resolve a (possibly short, possibly /-prefixed) command reference."""
+        ref = ref.lstrip("/")
+        if ref in self.names_by_type.get("commands", ()):
+            return ref
+        return self.cmd_short_names.get(ref, ref)
+
+
+def compile_index(manifest: dict, digest: str) -> ManifestIndex:
+    """Build all indexes from a parsed manifest."""
+    index = ManifestIndex(digest=digest, manifest=manifest)
+
+    for comp_type, comps in manifest.get("components", {}).items():
+        tagged_list = []
+        for comp in comps:
+            tagged = {**comp, "_type": comp_type}
+            tagged_list.append(tagged)
+            index.by_name[comp["name"]] = tagged
+            if comp.get("path"):
+                index.by_path[comp["path"]] = tagged
+            if comp.get("deployment"):
+                index.by_deployment.setdefault(comp["deployment"], []).append(tagged)
+            if comp_type == "commands":
+                short = comp["name"].rsplit("/", 1)[-1]
+                index.cmd_short_names[short] = comp["name"]
+        index.by_type[comp_type] = tagged_list
+        index.names_by_type[comp_type] = {c["name"] for c in comps}
+        index.paths_by_type[comp_type] = {c["path"] for c in comps if c.get("path")}
+
+    return index
+
+
+def _hash_file(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _wanted(types: tuple[str, ...] | None, shard_types) -> bool:
+    return types is None or bool(set(types) & set(shard_types))
+
+
+def load_manifest(
+    manifest_path: Path | None = None, types=None
+) -> tuple[dict, dict[str, str]]:
+    """Return (merged manifest, shard digests) reading only the shards needed.
+
+    A root MANIFEST.json may carry a "shards" map of shard file -> component
+    types it contains; each shard file is {"components": {type: [...]}}.
+    The merged view has the same shape as a monolithic MANIFEST.json: shard
+    lists are appended after the root's own entries, and "shards" is dropped.
+    With types=None everything is loaded; otherwise only those component
+    types (and only the shard files containing them) are read.
+    """
+    manifest_path = Path(manifest_path or REPO_ROOT / "MANIFEST.json")
+    manifest = json.loads(manifest_path.read_bytes())
+    shards = manifest.pop("shards", None) or {}
+    components = manifest.setdefault("components", {})
+
+    if types is not None:
+        for comp_type in list(components):
+            if comp_type not in types:
+                del components[comp_type]
+
+    deps = {}
+    for rel, shard_types in shards.items():
+        if not _wanted(types, shard_types):
+            continue
+        raw = (manifest_path.parent / rel).read_bytes()
+        deps[rel] = hashlib.sha256(raw).hexdigest()
+        for comp_type, comps in json.loads(raw).get("components", {}).items():
+            if types is None or comp_type in types:
+                components.setdefault(comp_type, []).extend(comps)
+
+    return manifest, deps
+
+
+def _snapshot_path(manifest_path: Path, types=None) -> Path:
+    suffix = "" if types is None else "-" + "+".join(types)
+    return CACHE_DIR / f"{manifest_path.stem.lower()}-index{suffix}.pickle"
+
+
+def _read_snapshot(snapshot: Path, root_digest: str, manifest_dir: Path) -> ManifestIndex | None:
+    try:
+        with open(snapshot, "rb") as f:
+            payload = pickle.load(f)
+    except Exception:
+        return None
+    if payload.get("format") != SNAPSHOT_FORMAT or payload.get("root_digest") != root_digest:
+        return None
+    # The root is unchanged, so its shard list is too; only re-hash those shards
+    for rel, digest in payload.get("deps", {}).items():
+        try:
+            if _hash_file(manifest_dir / rel) != digest:
+                return None
+        except OSError:
+            return None
+    return ManifestIndex(**payload["index"])
+
+
+def _write_snapshot(snapshot: Path, index: ManifestIndex, root_digest: str, deps: dict):
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "root_digest": root_digest,
+        "deps": deps,
+        "index": vars(index),
+    }
+    try:
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        tmp = snapshot.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snapshot)
+    except OSError:
+        # Read-only checkout: the in-memory index is still usable
+        pass
+
+
+def load_index(
+    manifest_path: Path | None = None, types=None, rebuild: bool = False
+) -> ManifestIndex:
+    """Return the compiled index for MANIFEST.json, rebuilding the snapshot if stale.
+
+    Pass types (e.g. ["skills", "agents"]) to load only those component types;
+    on a sharded manifest, shards holding other types are never read.
+    """
+    manifest_path = Path(manifest_path or REPO_ROOT / "MANIFEST.json").resolve()
+    types = None if types is None else tuple(sorted(set(types)))
+    key = (manifest_path, types)
+    if not rebuild and key in _loaded:
+        return _loaded[key]
+
+    root_digest = _hash_file(manifest_path)
+    snapshot = _snapshot_path(manifest_path, types)
+
+    index = None if rebuild else _read_snapshot(snapshot, root_digest, manifest_path.parent)
+    if index is None:
+        manifest, deps = load_manifest(manifest_path, types)
+        digest = hashlib.sha256(
+            "".join([root_digest, *deps.values()]).encode()
+        ).hexdigest()
+        index = compile_index(manifest, digest)
+        _write_snapshot(snapshot, index, root_digest, deps)
+
+    _loaded[key] = index
+    return index
+
+
+def split_manifest(manifest_path: Path, shard_dir: str, by_template: bool = False) -> list[Path]:
+    """Move component lists out of the root manifest into shard files.
+
+    One shard per component type; with by_template, entries carrying a
+    "template" field go to <shard_dir>/templates/<template>.json instead.
+    """
+    manifest, _ = load_manifest(manifest_path)
+    shard_files: dict[str, dict[str, list]] = {}
+
+    for comp_type, comps in manifest.get("components", {}).items():
+        for comp in comps:
+            if by_template and comp.get("template"):
+                rel = f"{shard_dir}/templates/{comp['template']}.json"
+            else:
+                rel = f"{shard_dir}/{comp_type}.json"
+            shard_files.setdefault(rel, {}).setdefault(comp_type, []).append(comp)
+
+    written = []
+    for rel, components in shard_files.items():
+        path = manifest_path.parent / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"components": components}, indent=2, ensure_ascii=False) + "\n")
+        written.append(path)
+
+    manifest["components"] = {}
+    manifest["shards"] = {rel: list(components) for rel, components in shard_files.items()}
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+    return written
+
+
+def join_manifest(manifest_path: Path) -> list[Path]:
+    """Fold all shards back into a monolithic root manifest. Returns the shard files."""
+    root = json.loads(manifest_path.read_text())
+    shard_paths = [manifest_path.parent / rel for rel in root.get("shards", {})]
+    manifest, _ = load_manifest(manifest_path)
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+    return shard_paths
+
+
+def main():
+    manifest_path = REPO_ROOT / "MANIFEST.json"
+
+    if "split" in sys.argv[1:2]:
+        shard_dir = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else "manifest"
+        for path in split_manifest(manifest_path, shard_dir, by_template="--by-template" in sys.argv):
+            print(f"  wrote {path.relative_to(REPO_ROOT)}")
+        return 0
+
+    if "join" in sys.argv[1:2]:
+        for path in join_manifest(manifest_path):
+            print(f"  merged {path.relative_to(REPO_ROOT)} (safe to delete)")
+        return 0
+
+    rebuild = "--rebuild" in sys.argv
+    index = load_index(manifest_path, rebuild=rebuild)
+
+    print(f"Snapshot: {_snapshot_path(manifest_path).relative_to(REPO_ROOT)}")
+    print(f"Digest:   {index.digest[:16]}")
+    for comp_type, comps in index.by_type.items():
+        print(f"  {comp_type}: {len(comps)}")
+    for level, comps in index.by_deployment.items():
+        print(f"  deployment={level}: {len(comps)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
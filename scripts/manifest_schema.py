@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+MANIFEST.json schema validation with precompiled validators.
+
+Compiles the JSON Schema referenced by MANIFEST.json's "$schema" field into
+plain Python functions (one per subschema, $refs become direct calls), then
+caches the compiled code object (plus its enum constants and pattern
+strings, marshalled) under .cache/ keyed by the schema hash, so later runs
+skip both schema interpretation and code generation. Patterns are
+recompiled on load; compiled regexes are never serialized.
+
+On top of the schema, deployment/status values are checked against the
+manifest's own deploymentLevels/statusLevels maps (the schema cannot express
+"value must be a key of another object").
+
+Every violation is reported with a JSON pointer to the offending value.
+
+Supported keywords: type, enum, const, required, properties,
+additionalProperties, items, pattern, minLength, minProperties, minimum,
+$ref (local "#/definitions/..." only). Annotation keywords are ignored;
+anything else raises SchemaError so a schema never silently under-validates.
+
+Usage:
+    python3 scripts/manifest_schema.py               # Validate MANIFEST.json
+    python3 scripts/manifest_schema.py --bench 5000  # Time validation of N synthetic entries
+
+Exit codes:
+  0 - Valid
+  1 - Schema violations found
+"""
+
+import hashlib
+import json
+import marshal
+import re
+import sys
+import time
+from pathlib import Path
+
+from manifest_index import load_manifest
+
+REPO_ROOT = Path(__file__).parent.parent
+CACHE_DIR = REPO_ROOT / ".cache"
+DEFAULT_SCHEMA = REPO_ROOT / "schemas" / "manifest.schema.json"
+
+# Bump when generated code changes shape so cached code objects are discarded
+COMPILER_VERSION = 2
+
+ANNOTATIONS = {"$schema", "$id", "title", "description", "definitions", "default", "examples", "$comment"}
+SUPPORTED = {
+    "type", "enum", "const", "required", "properties", "additionalProperties",
+    "items", "pattern", "minLength", "minProperties", "minimum", "$ref",
+}
+
+TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "integer": "(isinstance({v}, int) and not isinstance({v}, bool))",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+}
+
+_validators: dict[Path, object] = {}
+
+
+class SchemaError(Exception):
+    """Raised when a schema uses a construct the compiler does not support."""
+
+
+def _esc(key: str) -> str:
+    """Escape a property name for use in a JSON pointer (RFC 6901)."""
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+class _Compiler:
+    """Generates Python source for a validator from a JSON Schema."""
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self.lines: list[str] = []
+        self.consts: list = []
+        self.patterns: list[str] = []
+        self.ref_funcs: dict[str, str] = {}
+        self.counter = 0
+
+    def const(self, value) -> str:
+        self.consts.append(value)
+        return f"_C[{len(self.consts) - 1}]"
+
+    def pattern(self, source: str) -> str:
+        self.patterns.append(source)
+        return f"_R[{len(self.patterns) - 1}]"
+
+    def compile(self) -> str:
+        root = self.subschema(self.schema, "root")
+        self.lines.append(f"validate = {root}")
+        return "\n".join(self.lines) + "\n"
+
+    def ref(self, ref: str) -> str:
+        if ref in self.ref_funcs:
+            return self.ref_funcs[ref]
+        if not ref.startswith("#/definitions/"):
+            raise SchemaError(f"unsupported $ref: {ref}")
+        target = self.schema.get("definitions", {}).get(ref[len("#/definitions/"):])
+        if target is None:
+            raise SchemaError(f"unresolved $ref: {ref}")
+        name = "_def_" + re.sub(r"\W", "_", ref[len("#/definitions/"):])
+        # Register before compiling so recursive definitions terminate
+        self.ref_funcs[ref] = name
+        self.subschema(target, name, fixed_name=True)
+        return name
+
+    def subschema(self, schema, hint: str, fixed_name: bool = False) -> str:
+        if schema is True or schema == {}:
+            return "_ok"
+        if schema is False:
+            return "_never"
+        unknown = set(schema) - SUPPORTED - ANNOTATIONS
+        if unknown:
+            raise SchemaError(f"unsupported keyword(s) {sorted(unknown)} in {hint}")
+
+        if fixed_name:
+            name = hint
+        else:
+            self.counter += 1
+            name = f"_v{self.counter}_" + re.sub(r"\W", "_", hint)
+
+        body: list[str] = []
+
+        if "$ref" in schema:
+            body.append(f"{self.ref(schema['$ref'])}(x, p, out)")
+
+        types = schema.get("type")
+        if types is not None:
+            types = [types] if isinstance(types, str) else types
+            cond = " or ".join(TYPE_CHECKS[t].format(v="x") for t in types)
+            body.append(f"if not ({cond}):")
+            body.append(f"    out.append((p, {('expected ' + ' or '.join(types))!r})); return")
+
+        if "enum" in schema:
+            allowed = schema["enum"]
+            hashable = all(not isinstance(a, (dict, list)) for a in allowed)
+            container = self.const(frozenset(allowed) if hashable else list(allowed))
+            shown = " not in [" + ", ".join(json.dumps(a) for a in allowed) + "]"
+            guard = "x.__hash__ is None or " if hashable else ""
+            body.append(f"if {guard}x not in {container}:")
+            body.append(f"    out.append((p, 'value ' + _j(x) + {shown!r}))")
+
+        if "const" in schema:
+            c = self.const(schema["const"])
+            body.append(f"if x != {c}:")
+            body.append(f"    out.append((p, 'expected %s' % _j({c})))")
+
+        if "minLength" in schema or "pattern" in schema:
+            body.append("if isinstance(x, str):")
+            if "minLength" in schema:
+                n = schema["minLength"]
+                body.append(f"    if len(x) < {n}:")
+                body.append(f"        out.append((p, 'shorter than {n} characters'))")
+            if "pattern" in schema:
+                rx = self.pattern(schema["pattern"])
+                message = f"does not match pattern {schema['pattern']!r}"
+                body.append(f"    if not {rx}.search(x):")
+                body.append(f"        out.append((p, {message!r}))")
+
+        if "minimum" in schema:
+            m = schema["minimum"]
+            body.append("if isinstance(x, (int, float)) and not isinstance(x, bool):")
+            body.append(f"    if x < {m!r}:")
+            body.append(f"        out.append((p, 'less than minimum {m!r}'))")
+
+        obj_keywords = {"required", "properties", "additionalProperties", "minProperties"}
+        if obj_keywords & set(schema):
+            body.append("if isinstance(x, dict):")
+            for key in schema.get("required", []):
+                body.append(f"    if {key!r} not in x:")
+                body.append(f"        out.append((p, {('missing required property ' + repr(key))!r}))")
+            if "minProperties" in schema:
+                n = schema["minProperties"]
+                body.append(f"    if len(x) < {n}:")
+                body.append(f"        out.append((p, 'fewer than {n} properties'))")
+            props = schema.get("properties", {})
+            for key, sub in props.items():
+                fn = self.subschema(sub, f"{hint}_{key}")
+                if fn == "_ok":
+                    continue
+                body.append(f"    if {key!r} in x:")
+                body.append(f"        {fn}(x[{key!r}], p + {('/' + _esc(key))!r}, out)")
+            extra = schema.get("additionalProperties", True)
+            if extra is not True:
+                known = self.const(frozenset(props))
+                body.append("    for k, v in x.items():")
+                body.append(f"        if k in {known}:")
+                body.append("            continue")
+                if extra is False:
+                    body.append("        out.append((p + '/' + _esc(k), 'unexpected property %s' % _j(k)))")
+                else:
+                    fn = self.subschema(extra, f"{hint}_extra")
+                    body.append(f"        {fn}(v, p + '/' + _esc(k), out)")
+
+        if "items" in schema:
+            fn = self.subschema(schema["items"], f"{hint}_item")
+            if fn != "_ok":
+                body.append("if isinstance(x, list):")
+                body.append("    for i, item in enumerate(x):")
+                body.append(f"        {fn}(item, p + '/' + str(i), out)")
+
+        self.lines.append(f"def {name}(x, p, out):")
+        self.lines.extend("    " + line for line in (body or ["pass"]))
+        self.lines.append("")
+        return name
+
+
+def _runtime_namespace(consts: list, patterns: list[str]) -> dict:
+    def _ok(x, p, out):
+        pass
+
+    def _never(x, p, out):
+        out.append((p, "no value allowed here"))
+
+    return {"_C": consts, "_R": [re.compile(p) for p in patterns],
+            "_esc": _esc, "_j": json.dumps, "_ok": _ok, "_never": _never}
+
+
+def load_validator(schema_path: Path = DEFAULT_SCHEMA):
+    """Return validate(instance, pointer, out) for a schema, using the on-disk code cache."""
+    schema_path = Path(schema_path).resolve()
+    if schema_path in _validators:
+        return _validators[schema_path]
+
+    raw = schema_path.read_bytes()
+    key = hashlib.sha256(
+        raw + f"|{COMPILER_VERSION}|{sys.implementation.cache_tag}".encode()
+    ).hexdigest()[:16]
+    cache_file = CACHE_DIR / f"{schema_path.stem}-{key}.marshal"
+
+    try:
+        code, consts, patterns = marshal.loads(cache_file.read_bytes())
+    except Exception:
+        compiler = _Compiler(json.loads(raw))
+        source = compiler.compile()
+        code = compile(source, f"<compiled {schema_path.name}>", "exec")
+        consts, patterns = compiler.consts, compiler.patterns
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Enum sets and JSON constants are plain data; patterns stay strings
+            cache_file.write_bytes(marshal.dumps((code, consts, patterns)))
+        except (OSError, ValueError):
+            pass
+
+    namespace = _runtime_namespace(consts, patterns)
+    exec(code, namespace)
+    _validators[schema_path] = namespace["validate"]
+    return namespace["validate"]
+
+
+def check_levels(manifest: dict) -> list[tuple[str, str]]:
+    """Check deployment/status values against the manifest's declared levels."""
+    violations = []
+    deployment_levels = manifest.get("deploymentLevels") or {}
+    status_levels = manifest.get("statusLevels") or {}
+
+    for comp_type, comps in (manifest.get("components") or {}).items():
+        if not isinstance(comps, list):
+            continue
+        for i, comp in enumerate(comps):
+            if not isinstance(comp, dict):
+                continue
+            pointer = f"/components/{_esc(comp_type)}/{i}"
+            if "deployment" in comp and comp["deployment"] not in deployment_levels:
+                violations.append((
+                    f"{pointer}/deployment",
+                    f"deployment {json.dumps(comp['deployment'])} not in deploymentLevels",
+                ))
+            if "status" in comp and comp["status"] not in status_levels:
+                violations.append((
+                    f"{pointer}/status",
+                    f"status {json.dumps(comp['status'])} not in statusLevels",
+                ))
+    return violations
+
+
+def schema_path_for(manifest_path: Path, manifest: dict) -> Path:
+    """Resolve the schema a manifest declares, falling back to the repo default."""
+    declared = manifest.get("$schema")
+    if isinstance(declared, str) and not re.match(r"^\w+://", declared):
+        candidate = (manifest_path.parent / declared).resolve()
+        if candidate.exists():
+            return candidate
+    return DEFAULT_SCHEMA
+
+
+def validate_manifest(manifest: dict, manifest_path: Path | None = None) -> list[tuple[str, str]]:
+    """Return (json_pointer, message) for every schema and level violation."""
+    manifest_path = Path(manifest_path or REPO_ROOT / "MANIFEST.json")
+    validate = load_validator(schema_path_for(manifest_path, manifest))
+    out: list[tuple[str, str]] = []
+    validate(manifest, "", out)
+    out.extend(check_levels(manifest))
+    return out
+
+
+def _bench(count: int):
+    manifest, _ = load_manifest()
+    skills = manifest["components"]["skills"]
+    manifest["components"]["skills"] = [
+        {**skills[i % len(skills)], "name": f"bench-skill-{i}"} for i in range(count)
+    ]
+
+    start = time.perf_counter()
+    load_validator()
+    loaded = time.perf_counter()
+    violations = validate_manifest(manifest)
+    done = time.perf_counter()
+
+    print(f"Entries:      {count}")
+    print(f"Load/compile: {(loaded - start) * 1000:.2f} ms")
+    print(f"Validate:     {(done - loaded) * 1000:.2f} ms")
+    print(f"Violations:   {len(violations)}")
+
+
+def main():
+    if "--bench" in sys.argv:
+        idx = sys.argv.index("--bench")
+        count = int(sys.argv[idx + 1]) if idx + 1 < len(sys.argv) else 5000
+        _bench(count)
+        return 0
+
+    manifest_path = REPO_ROOT / "MANIFEST.json"
+    # Shards merged in: the root file alone may only hold the "shards" map
+    manifest, _ = load_manifest(manifest_path)
+    violations = validate_manifest(manifest, manifest_path)
+
+    if not violations:
+        print("✓ MANIFEST.json matches schema")
+        return 0
+
+    for pointer, message in violations:
+        print(f"  {pointer or '/'}: {message}")
+    print(f"\n{len(violations)} schema violation(s) found.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
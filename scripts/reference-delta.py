@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Delta report for reference submodules that moved since the last commit.
+
+For each references/<name> whose checked-out commit differs from the one
+recorded in the superproject (i.e. after update-references.sh advanced it,
+before `git add references/`), this reports what changed between the two
+commits without re-scanning the reference tree:
+
+  - changed paths come from one `git diff-tree` between the two commits,
+    which compares tree hashes and skips every unchanged subtree
+  - files we distilled from (any `references/<name>/<path>` cited in a
+    tracked .md/.py/.sh/.json file, e.g. PRP "Source:" lines and
+    "Adapted from:" provenance comments) are checked by blob hash, and
+    only the cited files that changed get a line count diff
+
+Blob contents are only read for changed cited files, so this stays cheap
+on partial (blob-less) clones as well as on the full clones
+sync-references.py keeps by default. A recorded commit missing locally is
+fetched on its own, with the clone's existing depth and filter.
+
+Usage:
+    python3 scripts/reference-delta.py [NAME ...]          # Markdown report to stdout
+    python3 scripts/reference-delta.py NAME --from REV [--to REV]
+    python3 scripts/reference-delta.py --json
+    python3 scripts/reference-delta.py --output docs/exploration/delta.md
+    python3 scripts/reference-delta.py --repo-root DIR     # Another superproject
+
+Exit codes: 0 on success (also when nothing moved), 1 if a reference
+could not be diffed.
+"""
+
+import json
+import re
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+from cli_options import option
+
+REPO_ROOT = Path(__file__).parent.parent
+
+CITING_SUFFIXES = (".md", ".py", ".sh", ".json")
+CITATION_RE = re.compile(r"references/([A-Za-z0-9_.-]+)/([A-Za-z0-9_./@+-]*)")
+MAX_LISTED_PATHS = 50
+MAX_LISTED_COMMITS = 20
+
+
+def git(cwd: Path, *args: str, timeout: int = 120) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, timeout=timeout)
+
+
+# ============================================================
+# CITATIONS
+# ============================================================
+
+
+def find_citations(repo_root: Path) -> dict[str, dict[str, set[str]]]:
+    """{reference name: {cited path: {citing files}}}, paths without a trailing "/".
+
+    A bare `references/<name>/` mention names the reference, not a path in
+    it, and is not a citation.
+    """
+    listed = git(repo_root, "ls-files", "-z", *[f"*{s}" for s in CITING_SUFFIXES])
+    citations: dict[str, dict[str, set[str]]] = {}
+    for rel in filter(None, listed.stdout.split("\0")):
+        if rel.startswith("changelog/"):
+            continue
+        try:
+            text = (repo_root / rel).read_text(errors="replace")
+        except OSError:
+            continue
+        if "references/" not in text:
+            continue
+        for name, cited in CITATION_RE.findall(text):
+            cited = cited.rstrip(".").rstrip("/")
+            if cited:
+                citations.setdefault(name, {}).setdefault(cited, set()).add(rel)
+    return citations
+
+
+def cited_kinds(sub: Path, revs: tuple[str, ...], cited: dict[str, set[str]]) -> dict[str, str]:
+    """{cited path: "blob" | "tree"} as the path exists in the first of revs that has it.
+
+    Whether a citation names a file or a directory comes from the tree, not
+    from how it was written; paths in neither commit are left out.
+    """
+    kinds: dict[str, str] = {}
+    for rev in revs:
+        missing = [c for c in sorted(cited) if c not in kinds]
+        if not missing:
+            break
+        listed = git(sub, "ls-tree", "-z", rev, "--", *missing)
+        for entry in filter(None, listed.stdout.split("\0")):
+            meta, _, path = entry.partition("\t")
+            kinds.setdefault(path, meta.split()[1])
+    return kinds
+
+
+def _is_cited(path: str, kinds: dict[str, str]) -> list[str]:
+    """Cited entries covering path: the file itself or a cited directory above it."""
+    return [c for c, kind in kinds.items() if c == path or (kind == "tree" and path.startswith(c + "/"))]
+
+
+# ============================================================
+# DIFF
+# ============================================================
+
+
+def recorded_commits(repo_root: Path, rev: str = "HEAD") -> dict[str, str]:
+    """{path: commit} for every references/* gitlink in the superproject at rev."""
+    result = git(repo_root, "ls-tree", "-z", rev, "references/")
+    commits = {}
+    for entry in filter(None, result.stdout.split("\0")):
+        meta, _, path = entry.partition("\t")
+        mode, kind, sha = meta.split()
+        if kind == "commit":
+            commits[path] = sha
+    return commits
+
+
+def _ensure_commit(sub: Path, sha: str) -> bool:
+    if git(sub, "cat-file", "-e", f"{sha}^{{commit}}").returncode == 0:
+        return True
+    # Clone that never saw the commit: fetch just it, keeping the clone's
+    # shape (a depth or filter on a full clone would stick to it for good)
+    fetch = ["fetch", "--quiet", "--no-tags", "origin", sha]
+    git_dir = git(sub, "rev-parse", "--absolute-git-dir").stdout.strip()
+    if git_dir and (Path(git_dir) / "shallow").exists():
+        fetch.insert(1, "--depth=1")
+    if git(sub, "config", "--bool", "--get", "remote.origin.promisor").stdout.strip() == "true":
+        fetch.insert(1, "--filter=blob:none")
+    git(sub, *fetch, timeout=600)
+    return git(sub, "cat-file", "-e", f"{sha}^{{commit}}").returncode == 0
+
+
+def reference_delta(name: str, sub: Path, old: str, new: str, cited: dict[str, set[str]]) -> dict:
+    delta = {"name": name, "from": old, "to": new, "commits": None, "log": [], "changed": [],
+             "areas": {}, "cited": [], "error": None}
+    for sha in (old, new):
+        if not _ensure_commit(sub, sha):
+            delta["error"] = f"commit {sha[:12]} not available in {sub.name}"
+            return delta
+
+    counted = git(sub, "rev-list", "--count", f"{old}..{new}")
+    delta["commits"] = int(counted.stdout) if counted.returncode == 0 else None
+    log = git(sub, "log", "--no-decorate", f"--max-count={MAX_LISTED_COMMITS}", "--format=%h%x09%s", f"{old}..{new}")
+    delta["log"] = [line.split("\t", 1) for line in log.stdout.splitlines() if "\t" in line]
+
+    # Tree-level diff: identical subtrees are skipped by hash. Without rename
+    # detection no blob has to be read (a rename shows as D + A).
+    tree = git(sub, "diff-tree", "-r", "-z", "--no-renames", "--no-commit-id", old, new)
+    if tree.returncode != 0:
+        delta["error"] = tree.stderr.strip() or "diff-tree failed"
+        return delta
+    fields = tree.stdout.split("\0")
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        if not meta:
+            continue
+        _, _, old_blob, new_blob, status = meta.lstrip(":").split()
+        delta["changed"].append({"path": path, "status": status, "old_blob": old_blob, "new_blob": new_blob})
+        area = path.split("/", 1)[0] if "/" in path else "."
+        delta["areas"][area] = delta["areas"].get(area, 0) + 1
+
+    kinds = cited_kinds(sub, (old, new), cited) if cited and delta["changed"] else {}
+    hits = {}
+    for change in delta["changed"]:
+        for c in _is_cited(change["path"], kinds):
+            hits.setdefault(change["path"], set()).update(cited[c])
+    if hits:
+        # Line counts for cited files only; this is the one step that reads blobs
+        numstat = git(sub, "diff", "--numstat", "--no-renames", "-z", old, new, "--", *sorted(hits))
+        lines = {}
+        for row in filter(None, numstat.stdout.split("\0")):
+            added, removed, path = row.split("\t", 2)
+            lines[path] = (added, removed)
+        for change in delta["changed"]:
+            if change["path"] in hits:
+                added, removed = lines.get(change["path"], ("?", "?"))
+                delta["cited"].append({**change, "added": added, "removed": removed,
+                                       "cited_by": sorted(hits[change["path"]])})
+    return delta
+
+
+def collect_deltas(repo_root: Path = REPO_ROOT, names: list[str] | None = None,
+                   old: str | None = None, new: str | None = None) -> list[dict]:
+    recorded = recorded_commits(repo_root)
+    citations = find_citations(repo_root)
+    deltas = []
+    for path, recorded_sha in sorted(recorded.items()):
+        name = Path(path).name
+        if names and name not in names:
+            continue
+        sub = repo_root / path
+        if not (sub / ".git").exists():
+            if names:
+                deltas.append({"name": name, "error": "not initialized"})
+            continue
+        head = git(sub, "rev-parse", "HEAD").stdout.strip()
+        from_sha = git(sub, "rev-parse", old).stdout.strip() if old else recorded_sha
+        to_sha = git(sub, "rev-parse", new).stdout.strip() if new else head
+        if not from_sha or not to_sha:
+            deltas.append({"name": name, "error": f"unknown revision {old if not from_sha else new}"})
+            continue
+        if from_sha == to_sha:
+            continue
+        deltas.append(reference_delta(name, sub, from_sha, to_sha, citations.get(name, {})))
+    known = {Path(p).name for p in recorded}
+    deltas += [{"name": n, "error": "no submodule commit recorded at HEAD"} for n in names or [] if n not in known]
+    return deltas
+
+
+# ============================================================
+# REPORT
+# ============================================================
+
+
+def render_markdown(deltas: list[dict], max_paths: int = MAX_LISTED_PATHS) -> str:
+    out = ["# Reference Delta Report", "", f"**Generated**: {date.today().isoformat()}", ""]
+    if not deltas:
+        out += ["No reference moved since the recorded submodule commits.", ""]
+        return "\n".join(out)
+
+    out += ["| Reference | Range | Commits | Changed paths | Cited files changed |",
+            "|-----------|-------|---------|---------------|---------------------|"]
+    for d in deltas:
+        if d.get("error"):
+            out.append(f"| {d['name']} | — | — | — | error: {d['error']} |")
+            continue
+        commits = "?" if d["commits"] is None else d["commits"]
+        out.append(f"| {d['name']} | `{d['from'][:7]}..{d['to'][:7]}` | {commits} "
+                   f"| {len(d['changed'])} | {len(d['cited'])} |")
+    out.append("")
+
+    for d in deltas:
+        if d.get("error"):
+            continue
+        out += ["---", "", f"## {d['name']}", ""]
+        if d["cited"]:
+            out += ["### Cited files changed", "",
+                    "| File | Status | Lines | Cited by |", "|------|--------|-------|----------|"]
+            for c in d["cited"]:
+                by = ", ".join(f"`{p}`" for p in c["cited_by"])
+                out.append(f"| `{c['path']}` | {c['status']} | +{c['added']} −{c['removed']} | {by} |")
+            out.append("")
+        else:
+            out += ["_No cited files changed._", ""]
+
+        if d["log"]:
+            out += ["### Commits", "", "| Commit | Message |", "|--------|---------|"]
+            out += [f"| `{h}` | {msg.replace('|', '/')} |" for h, msg in d["log"]]
+            if d["commits"] and d["commits"] > len(d["log"]):
+                out.append(f"| … | {d['commits'] - len(d['log'])} more |")
+            out.append("")
+
+        areas = ", ".join(f"`{a}` ({n})" for a, n in sorted(d["areas"].items(), key=lambda kv: -kv[1]))
+        out += ["### Changed paths", "", f"By top-level directory: {areas}", ""]
+        for c in d["changed"][:max_paths]:
+            out.append(f"- {c['status']} `{c['path']}`")
+        if len(d["changed"]) > max_paths:
+            out.append(f"- … {len(d['changed']) - max_paths} more")
+        out.append("")
+    return "\n".join(out)
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    args = [a for a in args if a != "--json"]
+    repo_root = Path(option(args, "--repo-root", str(REPO_ROOT))).resolve()
+    old = option(args, "--from")
+    new = option(args, "--to")
+    output = option(args, "--output")
+    max_paths = option(args, "--max-paths", MAX_LISTED_PATHS, int)
+    names = [a for a in args if not a.startswith("-")]
+    if (old or new) and len(names) != 1:
+        print("--from/--to need exactly one reference NAME", file=sys.stderr)
+        return 2
+
+    deltas = collect_deltas(repo_root, names or None, old, new)
+    text = json.dumps(deltas, indent=2) if as_json else render_markdown(deltas, max_paths)
+    if output:
+        Path(output).write_text(text + "\n")
+        print(f"Wrote {output} ({len(deltas)} references)")
+    else:
+        print(text)
+    return 1 if any(d.get("error") for d in deltas) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Local full-text search over references/, docs/ and PRPs/.
+
+The index (.cache/search-index.sqlite) is an SQLite FTS5 table with the
+trigram tokenizer, so any substring of 3+ characters is an index lookup
+rather than a scan. Rows are keyed by git blob id, not by path:
+
+  blobs     one row per distinct blob id, plus its FTS row
+  files     path -> blob id, for every indexed file
+  roots     one row per indexed root (docs, PRPs, each reference
+            submodule) with the key it was last indexed at
+
+A root whose key is unchanged is skipped entirely. For a submodule the
+key is its HEAD tree id; for docs/ and PRPs/ it is a hash of the file
+listing with blob ids (working-tree edits included). When a root did
+change, only blob ids not already in the index are read (one
+`git cat-file --batch` per submodule; docs/ and PRPs/ from the working
+tree), so files that did not change between two versions of a reference
+are never re-indexed, and identical files in different places are
+stored once. Binary blobs and blobs larger
+than --max-bytes are recorded but not indexed.
+
+Usage:
+    python3 scripts/search-index.py build [--max-bytes N] [--repo-root DIR]
+    python3 scripts/search-index.py query TERM [TERM ...] [--path PREFIX] [-n N] [--json] [--refresh]
+    python3 scripts/search-index.py stats
+
+Query terms are case-insensitive substrings (3+ characters) that must all
+occur in a file; hits are printed as path:line: text, best files first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from cli_options import option
+
+REPO_ROOT = Path(__file__).parent.parent
+
+SUPERPROJECT_ROOTS = ("docs", "PRPs")
+REFERENCES_DIR = "references"
+MAX_BLOB_BYTES = 1024 * 1024
+CANDIDATE_FILES = 200
+HITS_PER_FILE = 5
+
+
+def git(cwd: Path, *args: str, input: str | None = None) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, input=input)
+
+
+def index_path(repo_root: Path) -> Path:
+    return repo_root / ".cache" / "search-index.sqlite"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS roots (name TEXT PRIMARY KEY, key TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS blobs (
+            id INTEGER PRIMARY KEY, oid TEXT NOT NULL UNIQUE, size INTEGER NOT NULL, indexed INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, root TEXT NOT NULL, blob INTEGER NOT NULL);
+        CREATE INDEX IF NOT EXISTS files_blob ON files(blob);
+        CREATE INDEX IF NOT EXISTS files_root ON files(root);
+        CREATE VIRTUAL TABLE IF NOT EXISTS blob_fts USING fts5(content, tokenize='trigram');
+        """
+    )
+    return conn
+
+
+# ============================================================
+# ENUMERATE
+# ============================================================
+
+
+def _superproject_listing(repo_root: Path, root: str) -> dict[str, str]:
+    """{path: blob id} for tracked and untracked files under root, as in the working tree."""
+    staged = git(repo_root, "ls-files", "-s", "-z", "--", root)
+    listing = {}
+    for entry in filter(None, staged.stdout.split("\0")):
+        meta, _, path = entry.partition("\t")
+        mode, oid, _ = meta.split()
+        if mode != "160000":
+            listing[path] = oid
+    changed = git(repo_root, "ls-files", "-z", "-m", "-o", "--exclude-standard", "--", root)
+    paths = [p for p in dict.fromkeys(changed.stdout.split("\0")) if p and (repo_root / p).is_file()]
+    if paths:
+        hashed = git(repo_root, "hash-object", "--stdin-paths", input="\n".join(paths) + "\n")
+        listing.update(zip(paths, hashed.stdout.split()))
+    for p in [p for p in listing if not (repo_root / p).is_file()]:
+        del listing[p]  # deleted in the working tree
+    return listing
+
+
+def _submodule_listing(sub: Path, prefix: str) -> dict[str, str]:
+    result = git(sub, "ls-tree", "-r", "-z", "--full-tree", "HEAD")
+    listing = {}
+    for entry in filter(None, result.stdout.split("\0")):
+        meta, _, path = entry.partition("\t")
+        _, kind, oid = meta.split()
+        if kind == "blob":
+            listing[f"{prefix}/{path}"] = oid
+    return listing
+
+
+def discover_roots(repo_root: Path) -> list[dict]:
+    """Indexable roots: {name, key, listing(), read(oids)} with a cheap key computed up front."""
+    roots = []
+    for name in SUPERPROJECT_ROOTS:
+        if not (repo_root / name).is_dir():
+            continue
+        listing = _superproject_listing(repo_root, name)
+        key = hashlib.sha1("\n".join(f"{p} {o}" for p, o in sorted(listing.items())).encode()).hexdigest()
+        roots.append({"name": name, "key": key, "listing": lambda listing=listing: listing,
+                      "read": lambda oids, listing=listing: _read_files(repo_root, listing, oids)})
+
+    refs = repo_root / REFERENCES_DIR
+    for sub in sorted(refs.iterdir()) if refs.is_dir() else []:
+        if not (sub / ".git").exists():
+            continue
+        tree = git(sub, "rev-parse", "HEAD^{tree}")
+        if tree.returncode != 0:
+            continue
+        prefix = f"{REFERENCES_DIR}/{sub.name}"
+        roots.append({"name": prefix, "key": tree.stdout.strip(),
+                      "listing": lambda sub=sub, prefix=prefix: _submodule_listing(sub, prefix),
+                      "read": lambda oids, sub=sub: _read_blobs(sub, oids)})
+    return roots
+
+
+# ============================================================
+# BUILD
+# ============================================================
+
+
+def _read_blobs(repo: Path, oids: list[str]):
+    """Yield (oid, bytes) for each oid with one `git cat-file --batch`."""
+    proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        for oid in oids:
+            proc.stdin.write(oid.encode() + b"\n")
+            proc.stdin.flush()
+            header = proc.stdout.readline().split()
+            if len(header) < 3 or header[1] != b"blob":
+                continue
+            data = proc.stdout.read(int(header[2]))
+            proc.stdout.read(1)  # trailing LF
+            yield oid, data
+    finally:
+        proc.stdin.close()
+        proc.wait()
+
+
+def _read_files(repo_root: Path, listing: dict[str, str], oids: list[str]):
+    """Yield (oid, bytes) from the working tree; edited files have no object yet."""
+    paths = {}
+    for path, oid in listing.items():
+        paths.setdefault(oid, path)
+    for oid in oids:
+        try:
+            yield oid, (repo_root / paths[oid]).read_bytes()
+        except OSError:
+            continue
+
+
+def _decode(data: bytes, max_bytes: int) -> str | None:
+    if len(data) > max_bytes or b"\0" in data[:8000]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def build(repo_root: Path = REPO_ROOT, max_bytes: int = MAX_BLOB_BYTES, verbose: bool = False) -> dict:
+    conn = connect(index_path(repo_root))
+    known_roots = dict(conn.execute("SELECT name, key FROM roots"))
+    stats = {"roots": 0, "roots_changed": 0, "files": 0, "blobs_added": 0, "blobs_removed": 0}
+    roots = discover_roots(repo_root)
+
+    for root in roots:
+        stats["roots"] += 1
+        if known_roots.get(root["name"]) == root["key"]:
+            continue
+        stats["roots_changed"] += 1
+        start = time.monotonic()
+        listing = root["listing"]()
+        have = {oid for (oid,) in conn.execute("SELECT oid FROM blobs")}
+        missing = sorted({oid for oid in listing.values()} - have)
+        with conn:
+            for oid, data in root["read"](missing):
+                text = _decode(data, max_bytes)
+                cur = conn.execute("INSERT INTO blobs(oid, size, indexed) VALUES (?, ?, ?)",
+                                   (oid, len(data), text is not None))
+                if text is not None:
+                    conn.execute("INSERT INTO blob_fts(rowid, content) VALUES (?, ?)", (cur.lastrowid, text))
+            ids = dict(conn.execute(
+                f"SELECT oid, id FROM blobs WHERE oid IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(set(listing.values()))),),
+            ))
+            conn.execute("DELETE FROM files WHERE root = ?", (root["name"],))
+            conn.executemany("INSERT OR REPLACE INTO files(path, root, blob) VALUES (?, ?, ?)",
+                             [(p, root["name"], ids[o]) for p, o in listing.items() if o in ids])
+            conn.execute("INSERT OR REPLACE INTO roots(name, key) VALUES (?, ?)", (root["name"], root["key"]))
+        stats["blobs_added"] += len(missing)
+        if verbose:
+            print(f"  {root['name']}: {len(listing)} files, {len(missing)} new blobs "
+                  f"({time.monotonic() - start:.2f}s)", file=sys.stderr)
+
+    with conn:
+        # Roots that disappeared (submodule removed or deinitialized), then orphaned blobs
+        present = [r["name"] for r in roots]
+        gone = [n for n in known_roots if n not in present]
+        for name in gone:
+            conn.execute("DELETE FROM files WHERE root = ?", (name,))
+            conn.execute("DELETE FROM roots WHERE name = ?", (name,))
+        if stats["roots_changed"] or gone:
+            orphans = [i for (i,) in conn.execute(
+                "SELECT id FROM blobs WHERE NOT EXISTS (SELECT 1 FROM files WHERE files.blob = blobs.id)")]
+            conn.executemany("DELETE FROM blob_fts WHERE rowid = ?", [(i,) for i in orphans])
+            conn.executemany("DELETE FROM blobs WHERE id = ?", [(i,) for i in orphans])
+            stats["blobs_removed"] = len(orphans)
+    stats["files"] = conn.execute("SELECT count(*) FROM files").fetchone()[0]
+    conn.close()
+    return stats
+
+
+# ============================================================
+# QUERY
+# ============================================================
+
+
+def _match_expr(terms: list[str]) -> str:
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def query(terms: list[str], repo_root: Path = REPO_ROOT, path_prefix: str | None = None,
+          limit: int = 20) -> list[dict]:
+    """Ranked hits [{path, line, text, score}] for files containing every term."""
+    if not terms or any(len(t) < 3 for t in terms):
+        raise ValueError("query terms need at least 3 characters each")
+    conn = connect(index_path(repo_root))
+    try:
+        sql = ("SELECT f.path, fts.content, bm25(blob_fts) AS rank FROM blob_fts AS fts "
+               "JOIN files AS f ON f.blob = fts.rowid WHERE blob_fts MATCH ?")
+        params: list = [_match_expr(terms)]
+        if path_prefix:
+            sql += " AND f.path >= ? AND f.path < ?"
+            params += [path_prefix, path_prefix + "\U0010ffff"]
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(CANDIDATE_FILES)
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    folded = [t.casefold() for t in terms]
+    hits = []
+    for path, content, rank in rows:
+        per_file = []
+        for number, line in enumerate(content.splitlines(), 1):
+            low = line.casefold()
+            matched = sum(1 for t in folded if t in low)
+            if matched:
+                per_file.append({"path": path, "line": number, "text": line.strip()[:200],
+                                 "score": round(-rank, 4), "terms": matched})
+        per_file.sort(key=lambda h: (-h["terms"], h["line"]))
+        hits.extend(sorted(per_file[:HITS_PER_FILE], key=lambda h: h["line"]))
+        if len(hits) >= limit:
+            break
+    return hits[:limit]
+
+
+def index_stats(repo_root: Path = REPO_ROOT) -> dict:
+    path = index_path(repo_root)
+    if not path.exists():
+        return {"index": str(path), "exists": False}
+    conn = connect(path)
+    try:
+        files, blobs, indexed, size = conn.execute(
+            "SELECT (SELECT count(*) FROM files), count(*), coalesce(sum(indexed), 0), coalesce(sum(size), 0) FROM blobs"
+        ).fetchone()
+        roots = dict(conn.execute(
+            "SELECT r.name, count(f.path) FROM roots r LEFT JOIN files f ON f.root = r.name GROUP BY r.name"))
+    finally:
+        conn.close()
+    return {"index": str(path), "exists": True, "bytes": os.path.getsize(path), "files": files,
+            "blobs": blobs, "indexed_blobs": indexed, "blob_bytes": size, "roots": roots}
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "stats"
+    repo_root = Path(option(args, "--repo-root", str(REPO_ROOT))).resolve()
+
+    if command == "build":
+        start = time.monotonic()
+        stats = build(repo_root, option(args, "--max-bytes", MAX_BLOB_BYTES, int), verbose=True)
+        print(f"Indexed {stats['files']} files; {stats['roots_changed']}/{stats['roots']} roots changed, "
+              f"+{stats['blobs_added']} / -{stats['blobs_removed']} blobs in {time.monotonic() - start:.2f}s")
+        return 0
+
+    if command == "query":
+        as_json = "--json" in args
+        refresh = "--refresh" in args
+        path_prefix = option(args, "--path")
+        limit = option(args, "-n", 20, int)
+        terms = [a for a in args if a not in ("--json", "--refresh")]
+        if refresh or not index_path(repo_root).exists():
+            build(repo_root)
+        start = time.monotonic()
+        try:
+            hits = query(terms, repo_root, path_prefix, limit)
+        except ValueError as e:
+            print(f"query: {e}", file=sys.stderr)
+            return 2
+        elapsed_ms = (time.monotonic() - start) * 1000
+        if as_json:
+            print(json.dumps(hits, indent=2))
+        else:
+            for h in hits:
+                print(f"{h['path']}:{h['line']}: {h['text']}")
+            print(f"{len(hits)} hits in {elapsed_ms:.1f} ms", file=sys.stderr)
+        return 0 if hits else 1
+
+    if command == "stats":
+        print(json.dumps(index_stats(repo_root), indent=2))
+        return 0
+
+    print(__doc__.strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
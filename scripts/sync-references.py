@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Concurrent status and update for the references/* submodules.
+
+Each submodule is handled by its own worker (--jobs at a time):
+
+  1. fetch only the default branch from origin, without tags; shallow
+     submodules stay shallow and partial (blob-less) clones stay partial.
+     Full clones are never given a filter: fetching with one would turn
+     them into promisor remotes for good
+  2. one rev-parse for HEAD and origin/<branch>, one rev-list --count
+  3. unless --status-only, check out origin/<branch> detached (what
+     `git submodule update --remote` does, without fetching a second time)
+
+Usage:
+    python3 scripts/sync-references.py [--status-only] [--jobs N] [--json]
+                                       [--only NAME,...] [--timeout S]
+                                       [--repo-root DIR]
+
+--repo-root points at another superproject, e.g. a scratch repo whose
+submodules use local bare repositories as their remotes.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from cli_options import option
+
+REPO_ROOT = Path(__file__).parent.parent
+
+DEFAULT_JOBS = int(os.environ.get("REFERENCE_JOBS", "4"))
+DEFAULT_TIMEOUT = 600
+
+# Never block a worker on a credential prompt
+GIT_ENV = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+
+RED = "\033[0;31m"
+GREEN = "\033[0;32m"
+YELLOW = "\033[1;33m"
+BLUE = "\033[0;34m"
+NC = "\033[0m"
+
+
+def git(cwd: Path, *args: str, timeout: int = 60) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, capture_output=True, text=True, timeout=timeout, env=GIT_ENV,
+    )
+
+
+def reference_submodules(repo_root: Path) -> list[tuple[str, str, str | None]]:
+    """(name, path, configured branch) for every .gitmodules entry under references/."""
+    result = git(repo_root, "config", "--file", ".gitmodules", "--get-regexp", r"^submodule\..*\.(path|branch)$")
+    paths, branches = {}, {}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(" ")
+        section, _, field = key.rpartition(".")
+        (paths if field == "path" else branches)[section] = value
+    return [
+        (Path(path).name, path, branches.get(section))
+        for section, path in paths.items()
+        if path.startswith("references/")
+    ]
+
+
+def _is_initialized(path: Path) -> bool:
+    return (path / ".git").exists()
+
+
+def _is_partial(path: Path) -> bool:
+    """Whether the clone already fetches from origin with a filter (partial clone)."""
+    return git(path, "config", "--bool", "--get", "remote.origin.promisor").stdout.strip() == "true"
+
+
+def _default_branch(path: Path, timeout: int) -> str:
+    result = git(path, "symbolic-ref", "--short", "refs/remotes/origin/HEAD")
+    if result.returncode == 0:
+        return result.stdout.strip().removeprefix("origin/")
+    # origin/HEAD not recorded locally: ask the remote once and remember it
+    result = git(path, "ls-remote", "--symref", "origin", "HEAD", timeout=timeout)
+    for line in result.stdout.splitlines():
+        if line.startswith("ref: refs/heads/"):
+            branch = line.split()[1].removeprefix("refs/heads/")
+            git(path, "symbolic-ref", "refs/remotes/origin/HEAD", f"refs/remotes/origin/{branch}")
+            return branch
+    return "main"
+
+
+def sync_one(name: str, rel_path: str, branch: str | None, repo_root: Path, status_only: bool, timeout: int) -> dict:
+    """Fetch, compare and (optionally) update one submodule; never raises."""
+    path = repo_root / rel_path
+    info = {"name": name, "path": rel_path, "status": "not-initialized", "branch": None,
+            "current": None, "remote": None, "behind": None, "seconds": 0.0, "error": None}
+    if not _is_initialized(path):
+        return info
+
+    start = time.monotonic()
+    try:
+        # submodule.<name>.branch wins, as with `git submodule update --remote`
+        branch = branch or _default_branch(path, timeout)
+        info["branch"] = branch
+
+        fetch = ["fetch", "--quiet", "--no-tags", "origin",
+                 f"+refs/heads/{branch}:refs/remotes/origin/{branch}"]
+        git_dir = git(path, "rev-parse", "--absolute-git-dir").stdout.strip()
+        if git_dir and (Path(git_dir) / "shallow").exists():
+            fetch.insert(1, "--depth=1")
+        if _is_partial(path):
+            fetch.insert(1, "--filter=blob:none")
+        fetched = git(path, *fetch, timeout=timeout)
+        if fetched.returncode != 0:
+            lines = fetched.stderr.strip().splitlines()
+            info["error"] = next((l for l in lines if l.startswith("fatal:")), lines[0] if lines else "fetch failed")
+
+        revs = git(path, "rev-parse", "HEAD", f"refs/remotes/origin/{branch}")
+        current, _, remote = revs.stdout.strip().partition("\n")
+        info["current"] = current or None
+        info["remote"] = remote if revs.returncode == 0 else None
+
+        if info["current"] and info["remote"]:
+            counted = git(path, "rev-list", "--count", f"HEAD..refs/remotes/origin/{branch}")
+            info["behind"] = int(counted.stdout) if counted.returncode == 0 else None
+
+        if info["error"]:
+            # Keep current/remote/behind from the stale tracking ref for context
+            info["status"] = "error"
+        elif info["behind"] == 0:
+            info["status"] = "up-to-date"
+        elif status_only:
+            info["status"] = "behind"
+        else:
+            checkout = git(path, "checkout", "--quiet", "--detach", f"refs/remotes/origin/{branch}", timeout=timeout)
+            if checkout.returncode == 0:
+                info["status"] = "updated"
+            else:
+                info["status"] = "error"
+                info["error"] = checkout.stderr.strip() or "checkout failed"
+    except subprocess.TimeoutExpired as e:
+        info["status"] = "error"
+        info["error"] = f"timed out: git {' '.join(e.cmd[1:3])}"
+    info["seconds"] = round(time.monotonic() - start, 2)
+    return info
+
+
+def sync_references(
+    repo_root: Path = REPO_ROOT,
+    status_only: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    only: set[str] | None = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    on_result=None,
+) -> list[dict]:
+    subs = [s for s in reference_submodules(repo_root) if not only or s[0] in only]
+
+    # Initialize submodules if none are (same rule as the old shell script)
+    if subs and not any(_is_initialized(repo_root / p) for _, p, _ in subs):
+        git(repo_root, "submodule", "update", "--init", "--recursive", f"--jobs={jobs}",
+            "--", *[p for _, p, _ in subs], timeout=timeout)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(sync_one, n, p, b, repo_root, status_only, timeout) for n, p, b in subs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    order = {p: i for i, (_, p, _) in enumerate(subs)}
+    return sorted(results, key=lambda r: order[r["path"]])
+
+
+def _print_result(r: dict):
+    cur = (r["current"] or "unknown")[:7]
+    rem = (r["remote"] or "unknown")[:7]
+    if r["status"] == "not-initialized":
+        print(f"{YELLOW}{r['name']}{NC}: Not initialized")
+    elif r["status"] == "up-to-date":
+        print(f"{GREEN}{r['name']}{NC}: Up to date ({cur})")
+    elif r["status"] == "behind":
+        print(f"{YELLOW}{r['name']}{NC}: {r['behind'] if r['behind'] is not None else '?'} commits behind ({cur} → {rem})")
+    elif r["status"] == "updated":
+        print(f"{GREEN}{r['name']}{NC}: Updated, {r['behind']} commits ({cur} → {rem})")
+    else:
+        print(f"{RED}{r['name']}{NC}: {r['error']} ({cur})")
+
+
+def main():
+    args = sys.argv[1:]
+    status_only = "--status-only" in args
+    as_json = "--json" in args
+    jobs = option(args, "--jobs", DEFAULT_JOBS, int)
+    timeout = option(args, "--timeout", DEFAULT_TIMEOUT, int)
+    repo_root = Path(option(args, "--repo-root", str(REPO_ROOT))).resolve()
+    only_arg = option(args, "--only")
+    only = set(filter(None, only_arg.split(","))) if only_arg else None
+
+    if not as_json:
+        print(f"{BLUE}Reference Submodules{NC} ({jobs} parallel)")
+        print("====================")
+        print("")
+
+    start = time.monotonic()
+    results = sync_references(repo_root, status_only, jobs, only, timeout,
+                              on_result=None if as_json else _print_result)
+    elapsed = round(time.monotonic() - start, 2)
+    failed = [r for r in results if r["status"] == "error"]
+
+    if as_json:
+        print(json.dumps({"status_only": status_only, "jobs": jobs, "seconds": elapsed,
+                          "references": results}, indent=2))
+        return 1 if failed else 0
+
+    print("")
+    print(f"{len(results)} references in {elapsed}s")
+    if status_only:
+        print(f"{BLUE}Run without --status-only to update all submodules{NC}")
+    elif git(repo_root, "status", "--porcelain", "--", "references/").stdout.strip():
+        print(f"{YELLOW}Submodules updated. Run 'git add references/ && git commit' to save changes.{NC}")
+        print(f"{BLUE}Delta against the recorded commits: python3 scripts/reference-delta.py{NC}")
+    elif not failed:
+        print(f"{GREEN}All references up to date.{NC}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,14 @@
 """
 Validate documentation alignment across the repository.
 
-Runs 6 checks:
+Runs 7 checks:
   1. MANIFEST <-> Filesystem sync, including hooks/examples (critical)
   2. install-global.py dry-run validation (critical)
   3. Documentation counts & coverage (critical)
   4. CHANGELOG freshness (advisory)
   5. YAML frontmatter validation (advisory)
   6. Cross-reference validation (advisory)
+  7. MANIFEST schema validation (critical)
 
 Exit codes:
   0 - All clear
@@ -17,71 +18,22 @@ Exit codes:
   3 - Both critical and advisory
 """
 
-import json
 import re
 import subprocess
 import sys
 from pathlib import Path
 
-REPO_ROOT = Path(__file__).parent.parent
+from changelog import is_logged
+from component_graph import load_graph, markdown_file
+from frontmatter import FrontmatterError, parse_frontmatter
+from manifest_index import DOC_TYPES, load_index
+from manifest_schema import validate_manifest
 
+REPO_ROOT = Path(__file__).parent.parent
 
-def _parse_frontmatter(filepath: Path) -> dict | None:
-    """Parse YAML frontmatter from a markdown file. Returns None if no frontmatter."""
-    try:
-        text = filepath.read_text()
-    except Exception:
-        return None
-
-    if not text.startswith("---"):
-        return None
-
-    end = text.find("---", 3)
-    if end == -1:
-        return None
-
-    yaml_text = text[3:end].strip()
-
-    # Simple YAML parser for flat keys + basic structures
-    # Avoids requiring PyYAML as a dependency
-    result = {}
-    current_key = None
-    current_value_lines = []
-
-    for line in yaml_text.split("\n"):
-        # Skip comment lines
-        if line.strip().startswith("#"):
-            continue
-
-        # Check for key: value
-        match = re.match(r"^(\w[\w-]*)\s*:\s*(.*)", line)
-        if match:
-            # Save previous key
-            if current_key is not None:
-                val = "\n".join(current_value_lines).strip()
-                result[current_key] = val if val else True
-            current_key = match.group(1)
-            current_value_lines = [match.group(2).strip()]
-        elif current_key is not None and (line.startswith("  ") or line.startswith("\t")):
-            current_value_lines.append(line.strip())
-        elif line.strip() == "":
-            if current_key is not None:
-                current_value_lines.append("")
-
-    # Save last key
-    if current_key is not None:
-        val = "\n".join(current_value_lines).strip()
-        result[current_key] = val if val else True
-
-    # Clean up values
-    for k, v in result.items():
-        if isinstance(v, str):
-            # Remove leading | for multiline strings
-            if v.startswith("|"):
-                v = v[1:].strip()
-            result[k] = v
-
-    return result
+# Git state cache shared with the hooks (.claude/hooks/_git_state.py)
+sys.path.append(str(REPO_ROOT / ".claude" / "hooks"))
+from _git_state import get_state  # noqa: E402
 
 
 def check_manifest_sync() -> list[str]:
@@ -93,10 +45,8 @@ def check_manifest_sync() -> list[str]:
         errors.append("MANIFEST.json not found")
         return errors
 
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-
-    components = manifest.get("components", {})
+    index = load_index(manifest_path)
+    components = index.components
 
     # Check all MANIFEST paths exist on disk (skills, agents, commands, workflows)
     for comp_type in ["skills", "agents", "commands", "workflows"]:
@@ -120,10 +70,7 @@ def check_manifest_sync() -> list[str]:
                 errors.append(f"MANIFEST example missing on disk: {example['path']}")
 
     # Reverse checks: disk components have MANIFEST entries
-    manifest_paths = set()
-    for comp_type in ["skills", "agents", "commands", "workflows"]:
-        for comp in components.get(comp_type, []):
-            manifest_paths.add(comp["path"])
+    manifest_paths = set().union(*(index.paths_by_type.get(t, set()) for t in DOC_TYPES))
 
     # Skills on disk
     for skill_dir in _find_skill_dirs():
@@ -159,10 +106,7 @@ def check_manifest_sync() -> list[str]:
                     errors.append(f"Unregistered workflow on disk: {rel}")
 
     # Reverse check: hook scripts on disk are in MANIFEST
-    hook_manifest_paths = set()
-    for hook in components.get("hooks", []):
-        if hook.get("path"):
-            hook_manifest_paths.add(hook["path"])
+    hook_manifest_paths = index.paths_by_type.get("hooks", set())
 
     hooks_dir = REPO_ROOT / ".claude" / "hooks"
     if hooks_dir.exists():
@@ -218,10 +162,7 @@ def check_install_global_coverage() -> list[str]:
     dry_run_total = int(total_match.group(1))
 
     # Count expected globals from MANIFEST
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-
-    components = manifest.get("components", {})
+    components = load_index(manifest_path).components
 
     # Count unique global install units
     expected = 0
@@ -247,6 +188,8 @@ def check_install_global_coverage() -> list[str]:
     for hook in components.get("hooks", []):
         if hook.get("deployment") == "global" and hook.get("path"):
             expected += 1
+    # Shared hook helper modules (_*.py) are linked alongside the hooks
+    expected += len(list((REPO_ROOT / ".claude" / "hooks").glob("_*.py")))
 
     # Rules
     rules_dir = REPO_ROOT / ".claude" / "rules"
@@ -272,10 +215,7 @@ def check_doc_counts() -> list[str]:
     if not manifest_path.exists():
         return warnings
 
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-
-    components = manifest.get("components", {})
+    components = load_index(manifest_path).components
     actual_agents = len(components.get("agents", []))
     actual_commands = len(components.get("commands", []))
     actual_skills = len(components.get("skills", []))
@@ -320,8 +260,8 @@ def check_changelog_freshness() -> list[str]:
     """Check 4: CHANGELOG reflects recent work.
 
     Passes if ANY of these are true:
-    - HEAD commit hash appears in CHANGELOG.md
-    - CHANGELOG.md was modified in the HEAD commit (handles the circular
+    - HEAD commit hash is in the changelog store (indexed lookup)
+    - the changelog was modified in the HEAD commit (handles the circular
       hash problem: amending to add the hash changes the hash)
     """
     warnings = []
@@ -332,34 +272,27 @@ def check_changelog_freshness() -> list[str]:
             warnings.append("CHANGELOG.md not found")
             return warnings
 
-        # Check 1: HEAD hash in CHANGELOG
-        result = subprocess.run(
-            ["git", "rev-parse", "--short", "HEAD"],
-            capture_output=True, text=True, timeout=5,
-            cwd=REPO_ROOT
-        )
-        if result.returncode != 0:
+        try:
+            state = get_state(REPO_ROOT)
+        except FileNotFoundError:
+            return warnings  # Not a git checkout (archive, sandbox stage): nothing to compare
+        head = state.head()
+        if not head:
             return warnings
 
-        head_hash = result.stdout.strip()
-        content = changelog.read_text()
-        if head_hash in content:
+        # Check 1: HEAD hash in the changelog store (any abbreviation of it)
+        if is_logged(head):
             return warnings  # Pass: hash found
 
-        # Check 2: CHANGELOG modified in HEAD commit
-        result = subprocess.run(
-            ["git", "diff", "--name-only", "HEAD~1", "HEAD"],
-            capture_output=True, text=True, timeout=5,
-            cwd=REPO_ROOT
-        )
-        if result.returncode == 0 and "CHANGELOG.md" in result.stdout:
+        # Check 2: changelog modified in HEAD commit
+        if any(f == "CHANGELOG.md" or f.startswith("changelog/") for f in state.head_files()):
             return warnings  # Pass: CHANGELOG was updated in this commit
 
         warnings.append(
-            f"CHANGELOG.md missing entry for HEAD commit ({head_hash})"
+            f"CHANGELOG.md missing entry for HEAD commit ({head[:7]})"
         )
-    except Exception:
-        pass
+    except Exception as e:
+        warnings.append(f"Changelog freshness check failed: {type(e).__name__}: {e}")
 
     return warnings
 
@@ -372,10 +305,7 @@ def check_frontmatter() -> list[str]:
     if not manifest_path.exists():
         return warnings
 
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-
-    components = manifest.get("components", {})
+    components = load_index(manifest_path).components
 
     # Required fields per component type
     required_fields = {
@@ -387,27 +317,23 @@ def check_frontmatter() -> list[str]:
 
     for comp_type in ["agents", "skills", "commands", "workflows"]:
         for comp in components.get(comp_type, []):
-            path = REPO_ROOT / comp["path"]
-
-            # Find the markdown file to parse
-            if path.is_dir():
-                # Directory agents have AGENT.md, skills have SKILL.md
-                if comp_type == "agents":
-                    md_file = path / "AGENT.md"
-                elif comp_type == "skills":
-                    md_file = path / "SKILL.md"
-                else:
-                    continue
-            elif path.is_file() and path.suffix == ".md":
-                md_file = path
-            else:
+            # Directory agents have AGENT.md, skills have SKILL.md
+            md_file = markdown_file(comp_type, comp, REPO_ROOT)
+            if md_file is None:
                 continue
 
             if not md_file.exists():
                 warnings.append(f"No markdown file for {comp_type[:-1]} '{comp['name']}': {md_file}")
                 continue
 
-            fm = _parse_frontmatter(md_file)
+            try:
+                fm = parse_frontmatter(md_file)
+            except FrontmatterError as e:
+                warnings.append(
+                    f"Invalid frontmatter YAML in {comp_type[:-1]} '{comp['name']}': "
+                    f"{md_file.relative_to(REPO_ROOT)} ({str(e).splitlines()[0]})"
+                )
+                continue
             if fm is None:
                 warnings.append(f"No frontmatter in {comp_type[:-1]} '{comp['name']}': {md_file.relative_to(REPO_ROOT)}")
                 continue
@@ -430,18 +356,16 @@ def check_frontmatter() -> list[str]:
                     )
 
             # Validate tools is a JSON array if present
-            if "tools" in fm:
-                tools_val = fm["tools"]
-                if isinstance(tools_val, str):
-                    tools_str = tools_val.strip()
-                    if not (tools_str.startswith("[") and tools_str.endswith("]")):
-                        warnings.append(
-                            f"{comp_type[:-1]} '{comp['name']}' tools should be a JSON array, got: {tools_str[:50]}"
-                        )
+            if "tools" in fm and not isinstance(fm["tools"], list):
+                tools_str = str(fm["tools"]).strip()
+                warnings.append(
+                    f"{comp_type[:-1]} '{comp['name']}' tools should be a JSON array, got: {tools_str[:50]}"
+                )
 
             # Validate version follows semver if present
             if "version" in fm and comp_type == "skills":
-                version_val = fm["version"].strip() if isinstance(fm["version"], str) else ""
+                # Unquoted "1.0" loads as a float; report it as written
+                version_val = "" if fm["version"] is None else str(fm["version"]).strip()
                 if not re.match(r"^\d+\.\d+\.\d+$", version_val):
                     warnings.append(
                         f"skill '{comp['name']}' version should be semver (X.Y.Z), got: '{version_val}'"
@@ -458,95 +382,31 @@ def check_cross_references() -> list[str]:
     if not manifest_path.exists():
         return warnings
 
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-
-    components = manifest.get("components", {})
-
-    # Build set of known component names by type
-    # Also build a short-name lookup for commands (e.g., "remember" -> "workflow/remember")
-    known = {}
-    cmd_short_names = {}  # short_name -> full MANIFEST name
-    for comp_type in ["agents", "skills", "commands", "workflows"]:
-        known[comp_type] = set()
-        for comp in components.get(comp_type, []):
-            known[comp_type].add(comp["name"])
-            if comp_type == "commands":
-                # Map the last part of the name for short lookups
-                short = comp["name"].rsplit("/", 1)[-1]
-                cmd_short_names[short] = comp["name"]
-
-    # Check each component's related field
-    for comp_type in ["agents", "skills", "commands", "workflows"]:
-        for comp in components.get(comp_type, []):
-            path = REPO_ROOT / comp["path"]
+    # The component graph resolves related: references (inline or block lists,
+    # short command names) and keeps the ones it could not link
+    graph = load_graph(manifest_path)
+    for comp_type, name, ref_type, ref in graph.unresolved:
+        warnings.append(
+            f"{comp_type[:-1]} '{name}' references "
+            f"unknown {ref_type[:-1]}: '{ref}'"
+        )
 
-            # Find markdown file
-            if path.is_dir():
-                if comp_type == "agents":
-                    md_file = path / "AGENT.md"
-                elif comp_type == "skills":
-                    md_file = path / "SKILL.md"
-                else:
-                    continue
-            elif path.is_file() and path.suffix == ".md":
-                md_file = path
-            else:
-                continue
+    return warnings
 
-            if not md_file.exists():
-                continue
 
-            fm = _parse_frontmatter(md_file)
-            if fm is None or "related" not in fm:
-                continue
+def check_manifest_schema() -> list[str]:
+    """Check 7: MANIFEST matches its JSON schema and declared levels (critical)."""
+    errors = []
+    manifest_path = REPO_ROOT / "MANIFEST.json"
 
-            # Parse related references from the raw text
-            # The related field structure varies, so parse from the raw YAML block
-            try:
-                text = md_file.read_text()
-                end = text.find("---", 3)
-                yaml_block = text[3:end]
-            except Exception:
-                continue
+    if not manifest_path.exists():
+        return errors
 
-            # Find related section and extract references
-            in_related = False
-            for line in yaml_block.split("\n"):
-                stripped = line.strip()
-                if stripped.startswith("related:"):
-                    in_related = True
-                    continue
-                if in_related:
-                    # New top-level key ends related block
-                    if re.match(r"^\w[\w-]*\s*:", line) and not line.startswith(" "):
-                        break
-
-                    # Parse "agents: [a, b, c]" or "agents:" / "  - a"
-                    ref_match = re.match(r"\s+(agents|skills|commands|workflows)\s*:\s*(.*)", line)
-                    if ref_match:
-                        ref_type = ref_match.group(1)
-                        ref_val = ref_match.group(2).strip()
-                        if ref_val.startswith("[") and ref_val.endswith("]"):
-                            # Inline array
-                            refs = [r.strip().strip("'\"") for r in ref_val[1:-1].split(",")]
-                            for ref in refs:
-                                ref = ref.strip()
-                                if not ref:
-                                    continue
-                                # Strip leading / from command references
-                                if ref.startswith("/"):
-                                    ref = ref[1:]
-                                # Resolve short command names via lookup
-                                if ref_type == "commands" and ref not in known["commands"]:
-                                    ref = cmd_short_names.get(ref, ref)
-                                if ref not in known.get(ref_type, set()):
-                                    warnings.append(
-                                        f"{comp_type[:-1]} '{comp['name']}' references "
-                                        f"unknown {ref_type[:-1]}: '{ref}'"
-                                    )
+    manifest = load_index(manifest_path).manifest
+    for pointer, message in validate_manifest(manifest, manifest_path):
+        errors.append(f"MANIFEST.json{pointer}: {message}")
 
-    return warnings
+    return errors
 
 
 def _find_skill_dirs() -> list[Path]:
@@ -659,6 +519,16 @@ def main():
     else:
         print("  OK")
 
+    # Check 7: MANIFEST schema validation (critical)
+    print("Check 7: MANIFEST schema validation...")
+    errs = check_manifest_schema()
+    if errs:
+        critical_errors.extend(errs)
+        for e in errs:
+            print(f"  CRITICAL: {e}")
+    else:
+        print("  OK")
+
     # Summary
     print()
     if not critical_errors and not advisory_warnings:
@@ -2,20 +2,29 @@
 """
 Validate MANIFEST.json against actual filesystem contents.
 
-Ensures no components exist on disk without being registered in the manifest.
+Ensures no components exist on disk without being registered in the manifest,
+and that the manifest itself matches schemas/manifest.schema.json.
 This is the single source of truth enforcement.
 
-Exit codes:
+Usage:
+    python3 scripts/validate-manifest.py                        # All component types
+    python3 scripts/validate-manifest.py --types skills,agents  # Only these (pre-commit)
+
+With --types, only the MANIFEST shards holding those types are loaded.
+
+Exit codes (bit flags, may be combined):
   0 - All components registered
   1 - Unregistered components found
   2 - Missing components (in manifest but not on disk)
-  3 - Both unregistered and missing
+  4 - Schema violations (see scripts/manifest_schema.py)
 """
 
-import json
 import sys
 from pathlib import Path
 
+from manifest_index import ManifestIndex, load_index
+from manifest_schema import validate_manifest
+
 # Files/patterns to ignore
 IGNORE_NAMES = {
     "README.md",
@@ -149,20 +158,32 @@ def find_workflows_on_disk(repo_root: Path) -> set[str]:
     return workflows
 
 
-def get_manifest_paths(manifest: dict) -> dict[str, set[str]]:
-    """Extract all component paths from manifest."""
-    paths = {
-        "skills": set(),
-        "agents": set(),
-        "commands": set(),
-        "workflows": set(),
+COMPONENT_TYPES = ["skills", "agents", "commands", "workflows"]
+
+DISK_FINDERS = {
+    "skills": find_skills_on_disk,
+    "agents": find_agents_on_disk,
+    "commands": find_commands_on_disk,
+    "workflows": find_workflows_on_disk,
+}
+
+
+def get_manifest_paths(index: ManifestIndex, types: list[str]) -> dict[str, set[str]]:
+    """Extract all component paths from the compiled manifest index."""
+    return {
+        component_type: index.paths_by_type.get(component_type, set())
+        for component_type in types
     }
 
-    for component_type in paths.keys():
-        for component in manifest.get("components", {}).get(component_type, []):
-            paths[component_type].add(component["path"])
 
-    return paths
+def parse_types(argv: list[str]) -> list[str] | None:
+    """Return the component types requested with --types, or None for all."""
+    if "--types" not in argv:
+        return None
+    idx = argv.index("--types")
+    raw = argv[idx + 1] if idx + 1 < len(argv) else ""
+    types = list(dict.fromkeys(t for t in raw.split(",") if t in COMPONENT_TYPES))
+    return types or None
 
 
 def main():
@@ -173,18 +194,14 @@ def main():
         print("ERROR: MANIFEST.json not found at repo root")
         sys.exit(1)
 
-    with open(manifest_path) as f:
-        manifest = json.load(f)
+    types = parse_types(sys.argv[1:])
+    index = load_index(manifest_path, types=types)
+    types = types or COMPONENT_TYPES
 
     # Find components on disk
-    disk_components = {
-        "skills": find_skills_on_disk(repo_root),
-        "agents": find_agents_on_disk(repo_root),
-        "commands": find_commands_on_disk(repo_root),
-        "workflows": find_workflows_on_disk(repo_root),
-    }
+    disk_components = {t: DISK_FINDERS[t](repo_root) for t in types}
 
-    manifest_components = get_manifest_paths(manifest)
+    manifest_components = get_manifest_paths(index, types)
 
     unregistered = {}
     missing = {}
@@ -225,6 +242,16 @@ def main():
         print("\nRemove these from MANIFEST.json or restore the files.")
         exit_code |= 2
 
+    violations = validate_manifest(index.manifest, manifest_path)
+    if violations:
+        print("=" * 60)
+        print("SCHEMA VIOLATIONS (MANIFEST.json does not match its $schema)")
+        print("=" * 60)
+        for pointer, message in violations:
+            print(f"  {pointer or '/'}: {message}")
+        print("\nFix these entries in MANIFEST.json before committing.")
+        exit_code |= 4
+
     if exit_code == 0:
         print("✓ MANIFEST.json is in sync with filesystem")
 
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Minimal stdio language server standing in for pyright & co. in pool tests.
+
+Speaks just enough LSP for _lsp_pool.py:
+
+  initialize          incremental sync (change: 2), referencesProvider;
+                      sleeps $FAKE_LSP_STARTUP_DELAY seconds first to
+                      mimic workspace indexing
+  didOpen/didChange   keeps document text, applies ranged edits, then
+                      publishes one error diagnostic per line containing
+                      "TYPE_ERROR"
+  references          whole-word matches of the word under the cursor in
+                      open documents and in *.py files under the root
+  shutdown/exit
+
+If $FAKE_LSP_STATS is set, counters (initializations, opens, changes,
+incremental changes) are written there as JSON after every message.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+docs: dict[str, str] = {}
+root = Path.cwd()
+stats = {"pid": os.getpid(), "initializations": 0, "opens": 0, "changes": 0, "incremental_changes": 0}
+
+
+def read_message():
+    length = None
+    while True:
+        line = sys.stdin.buffer.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return json.loads(sys.stdin.buffer.read(length))
+
+
+def send(message: dict):
+    body = json.dumps(message).encode()
+    sys.stdout.buffer.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    sys.stdout.buffer.flush()
+
+
+def offset(text: str, position: dict) -> int:
+    lines = text.split("\n")
+    line = min(position["line"], len(lines) - 1)
+    prefix = sum(len(l) + 1 for l in lines[:line])
+    # ASCII fixtures: UTF-16 units == characters
+    return prefix + min(position["character"], len(lines[line]))
+
+
+def publish(uri: str, version: int):
+    diagnostics = [
+        {"range": {"start": {"line": i, "character": 0}, "end": {"line": i, "character": len(line)}},
+         "severity": 1, "source": "fake", "message": "TYPE_ERROR marker"}
+        for i, line in enumerate(docs[uri].split("\n")) if "TYPE_ERROR" in line
+    ]
+    send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+          "params": {"uri": uri, "version": version, "diagnostics": diagnostics}})
+
+
+def path_of(uri: str) -> Path:
+    return Path(unquote(urlparse(uri).path))
+
+
+def references(uri: str, position: dict) -> list[dict]:
+    text = docs.get(uri) or path_of(uri).read_text()
+    at = offset(text, position)
+    start, end = at, at
+    while start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"):
+        start -= 1
+    while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+        end += 1
+    word = text[start:end]
+    if not word:
+        return []
+    sources = {p.resolve().as_uri(): p.read_text(errors="replace") for p in root.rglob("*.py")}
+    sources.update(docs)
+    pattern = re.compile(rf"\b{re.escape(word)}\b")
+    found = []
+    for doc_uri, doc_text in sorted(sources.items()):
+        for number, line in enumerate(doc_text.split("\n")):
+            for m in pattern.finditer(line):
+                found.append({"uri": doc_uri, "range": {"start": {"line": number, "character": m.start()},
+                                                        "end": {"line": number, "character": m.end()}}})
+    return found
+
+
+def main():
+    global root
+    while True:
+        message = read_message()
+        if message is None:
+            return 0
+        method, params = message.get("method"), message.get("params") or {}
+        if method == "initialize":
+            time.sleep(float(os.environ.get("FAKE_LSP_STARTUP_DELAY", "0")))
+            if params.get("rootUri"):
+                root = path_of(params["rootUri"])
+            stats["initializations"] += 1
+            send({"jsonrpc": "2.0", "id": message["id"], "result": {"capabilities": {
+                "textDocumentSync": {"openClose": True, "change": 2}, "referencesProvider": True}}})
+        elif method == "textDocument/didOpen":
+            doc = params["textDocument"]
+            docs[doc["uri"]] = doc["text"]
+            stats["opens"] += 1
+            publish(doc["uri"], doc["version"])
+        elif method == "textDocument/didChange":
+            uri = params["textDocument"]["uri"]
+            for change in params["contentChanges"]:
+                if "range" in change:
+                    text = docs[uri]
+                    docs[uri] = (text[:offset(text, change["range"]["start"])] + change["text"]
+                                 + text[offset(text, change["range"]["end"]):])
+                    stats["incremental_changes"] += 1
+                else:
+                    docs[uri] = change["text"]
+            stats["changes"] += 1
+            publish(uri, params["textDocument"]["version"])
+        elif method == "textDocument/didClose":
+            docs.pop(params["textDocument"]["uri"], None)
+        elif method == "textDocument/references":
+            send({"jsonrpc": "2.0", "id": message["id"],
+                  "result": references(params["textDocument"]["uri"], params["position"])})
+        elif method == "shutdown":
+            send({"jsonrpc": "2.0", "id": message["id"], "result": None})
+        elif method == "exit":
+            return 0
+        elif "id" in message:
+            send({"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32601, "message": f"unknown {method}"}})
+        if os.environ.get("FAKE_LSP_STATS"):
+            Path(os.environ["FAKE_LSP_STATS"]).write_text(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Fuzz and latency harness for input-screening hooks.
+
+Generates seeded synthetic payloads -- valid tool calls, malformed JSON,
+wrong types, huge content fields and regex-hostile strings -- and feeds them
+to each hook, recording a latency distribution per hook. Flags:
+
+  - over budget: a payload took longer than the hook's time budget
+  - timeout:     a payload ran past --timeout (likely catastrophic backtracking)
+  - crash:       exit code other than 0 (allow) or 2 (block)
+  - property:    a generated input with a known verdict got the other one
+                 (e.g. `rm  -fr  /` must block, `.env.sample` must not)
+
+Offending payloads are written to results/fuzz/ for replay.
+
+Hooks (path from MANIFEST.json):
+  dangerous-command-blocker  PreToolUse: Bash commands, file tools on .env
+  security-check             PreToolUse: Write/Edit content
+  prompt-validator           UserPromptSubmit: prompts
+
+Usage:
+    python3 fuzz_hooks.py [--count N] [--seed S] [--hooks a,b] [--budget-ms MS]
+                          [--budget HOOK=MS ...] [--timeout S] [--max-size BYTES]
+                          [--subprocess] [--hooks-dir DIR]
+
+Defaults: 500 payloads per hook, seed 0, in-process invocation with a 50 ms
+budget (--subprocess: 1000 ms, includes interpreter startup), 5 s timeout.
+Exit code 1 if anything was flagged.
+"""
+
+import glob
+import json
+import os
+import random
+import signal
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+from test_runner import run_hook_inprocess, run_hook_subprocess
+from cli_options import option  # scripts/, on sys.path via test_runner
+from manifest_index import load_manifest  # scripts/, on sys.path via test_runner
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent.parent
+FUZZ_RESULTS_DIR = SCRIPT_DIR / "results" / "fuzz"
+
+FUZZ_HOOKS = ["dangerous-command-blocker", "security-check", "prompt-validator"]
+
+ALLOW, BLOCK = 0, 2
+
+
+class HookTimeout(BaseException):
+    """Raised by SIGALRM; BaseException so the hook's own handlers don't swallow it."""
+
+
+# ============================================================
+# PAYLOAD GENERATORS
+# ============================================================
+
+# Inputs shaped to trigger super-linear backtracking in naive patterns
+# like (\s*-\w+)*, (a+)+$, .*.*=.*, nested groups around optional spaces
+def _regex_hostile(rng: random.Random, size: int) -> str:
+    n = max(1, size)
+    return rng.choice([
+        "a" * n + "!",
+        " " * n + "x",
+        "-" * n,
+        "-r " * (n // 3) + "!",
+        "rm " + " -" * (n // 2),
+        "/" * n + "\x00",
+        "(" * (n // 2) + "x" + ")" * (n // 2 - 1),
+        "=" * n + "eval",
+        "ignore " * (n // 7) + "previous",
+        "\t\n " * (n // 3),
+        "é" * (n // 2) + "‮",
+        "\\" * n + '"',
+    ])
+
+
+def _noise(rng: random.Random, size: int) -> str:
+    alphabet = string.printable + "é中​\x00"
+    return "".join(rng.choice(alphabet) for _ in range(size))
+
+
+def _size(rng: random.Random, max_size: int) -> int:
+    # Mostly small, sometimes huge: log-uniform up to max_size
+    return int(2 ** rng.uniform(0, max(1.0, max_size.bit_length() - 1)))
+
+
+def _spaced(rng: random.Random, *parts: str) -> str:
+    return (" " * rng.randint(1, 3)).join(parts)
+
+
+def _dangerous_rm(rng: random.Random) -> str:
+    flags = rng.choice(["-rf", "-fr", "-Rf", "-r -f", "-f -r", "--recursive --force", "-rfv"])
+    target = rng.choice(["/", "/*", "~", "~/", "$HOME"])
+    prefix = rng.choice(["", "sudo ", "cd /tmp && ", "echo hi; "])
+    return prefix + _spaced(rng, "rm", flags, target)
+
+
+def gen_command_blocker(rng: random.Random, max_size: int) -> tuple[dict | str, int | None]:
+    """(payload, expected exit code or None) for dangerous-command-blocker."""
+    kind = rng.randrange(8)
+    session = {"session_id": "fuzz"}
+    if kind == 0:
+        return {**session, "tool_name": "Bash", "tool_input": {"command": _dangerous_rm(rng)}}, BLOCK
+    if kind == 1:
+        safe = rng.choice(["ls -la", "git status", "rm file.txt", "rm -f build/out.o", "echo rm -rf is bad"])
+        return {**session, "tool_name": "Bash", "tool_input": {"command": safe}}, None
+    if kind == 2:
+        path = rng.choice([".env", "./.env", "app/.env", ".env.local", "/srv/app/.env.production"])
+        tool = rng.choice(["Read", "Edit", "Write"])
+        return {**session, "tool_name": tool, "tool_input": {"file_path": path}}, BLOCK
+    if kind == 3:
+        path = rng.choice([".env.sample", ".env.example", "docs/env.md"])
+        return {**session, "tool_name": "Read", "tool_input": {"file_path": path}}, ALLOW
+    if kind == 4:
+        cmd = _regex_hostile(rng, _size(rng, max_size))
+        return {**session, "tool_name": "Bash", "tool_input": {"command": cmd}}, None
+    if kind == 5:
+        return {**session, "tool_name": "Bash", "tool_input": {"command": _noise(rng, _size(rng, max_size))}}, None
+    if kind == 6:
+        return _malformed(rng, "Bash"), None
+    return {**session, "tool_name": "Read", "tool_input": {"file_path": _regex_hostile(rng, _size(rng, 4096))}}, None
+
+
+def gen_security_check(rng: random.Random, max_size: int) -> tuple[dict | str, int | None]:
+    """(payload, expected exit code or None) for security-check."""
+    kind = rng.randrange(6)
+    path = rng.choice(["app.py", "src/index.ts", "page.html", "notes.md"])
+    tool = rng.choice(["Write", "Edit"])
+    size = _size(rng, max_size)
+    if kind == 0:
+        content = "\n".join(rng.choice(["x = 1", "def f():", "    return x", "# comment"]) for _ in range(size // 8 + 1))
+    elif kind == 1:
+        snippet = rng.choice(["eval(", "innerHTML = ", "os.system(", "pickle.loads(", "dangerouslySetInnerHTML"])
+        content = _noise(rng, size // 2) + snippet + _noise(rng, size // 2)
+    elif kind == 2:
+        content = _regex_hostile(rng, size)
+    elif kind == 3:
+        # One enormous line, no newlines
+        content = "x" * size
+    elif kind == 4:
+        return _malformed(rng, tool), None
+    else:
+        content = _noise(rng, size)
+    field = "content" if tool == "Write" else "new_string"
+    return {"session_id": "fuzz", "tool_name": tool, "tool_input": {"file_path": path, field: content}}, None
+
+
+def gen_prompt_validator(rng: random.Random, max_size: int) -> tuple[dict | str, int | None]:
+    """(payload, expected exit code or None) for prompt-validator."""
+    kind = rng.randrange(7)
+    if kind == 0:
+        return {"session_id": "fuzz", "prompt": rng.choice(["", " ", "\n\t  \n"])}, BLOCK
+    if kind == 1:
+        return {"session_id": "fuzz", "prompt": "x" * rng.randint(50_001, 80_000)}, BLOCK
+    if kind == 2:
+        prompt = rng.choice(["Hello, help me with this code", "Fix the failing test in app.py", "What does this do?"])
+        return {"session_id": "fuzz", "prompt": prompt}, ALLOW
+    if kind == 3:
+        return {"session_id": "fuzz", "prompt": _regex_hostile(rng, min(_size(rng, max_size), 50_000))}, None
+    if kind == 4:
+        words = ["ignore", "all", "previous", "instructions", "IGNORE", "Prior", "rules"]
+        prompt = " ".join(rng.choice(words) for _ in range(rng.randint(1, 2000)))
+        return {"session_id": "fuzz", "prompt": prompt}, None
+    if kind == 5:
+        return _malformed(rng, None), None
+    return {"session_id": "fuzz", "prompt": _noise(rng, min(_size(rng, max_size), 50_000))}, None
+
+
+def _malformed(rng: random.Random, tool_name: str | None) -> dict | str:
+    """Structurally wrong input: hooks must not crash on it."""
+    return rng.choice([
+        "",
+        "{",
+        "not json",
+        "null",
+        "[]",
+        json.dumps({"tool_name": tool_name, "tool_input": None}),
+        json.dumps({"tool_name": tool_name, "tool_input": "rm -rf /"}),
+        json.dumps({"tool_name": tool_name, "tool_input": {"command": ["rm", "-rf", "/"]}}),
+        json.dumps({"tool_name": 42, "prompt": {"text": "hi"}}),
+        json.dumps({"session_id": None}),
+    ])
+
+
+GENERATORS = {
+    "dangerous-command-blocker": gen_command_blocker,
+    "security-check": gen_security_check,
+    "prompt-validator": gen_prompt_validator,
+}
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+
+def _invoke(hook_path: Path, stdin: str, timeout: float, subprocess_mode: bool) -> tuple[int | None, float]:
+    """Run one payload; returns (exit code or None on timeout, seconds)."""
+    start = time.perf_counter()
+    if subprocess_mode:
+        try:
+            _, _, rc = run_hook_subprocess(hook_path, stdin, {}, timeout)
+        except Exception:
+            rc = None
+        return rc, time.perf_counter() - start
+
+    def on_alarm(signum, frame):
+        raise HookTimeout()
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        _, _, rc = run_hook_inprocess(hook_path, stdin, {}, None)
+    except HookTimeout:
+        rc = None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    return rc, time.perf_counter() - start
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def _summary(payload) -> str:
+    text = payload if isinstance(payload, str) else json.dumps(payload)
+    return repr(text[:70]) + (f"... ({len(text):,} chars)" if len(text) > 70 else "")
+
+
+def fuzz_hook(name: str, hook_path: Path, count: int, seed: int, budget_ms: float,
+              timeout: float, max_size: int, subprocess_mode: bool) -> dict:
+    """Fuzz one hook; returns its stats and flagged payloads."""
+    rng = random.Random(f"{seed}:{name}")
+    generate = GENERATORS[name]
+    latencies, flagged = [], []
+
+    for i in range(count):
+        payload, expected = generate(rng, max_size)
+        if isinstance(payload, dict) and "session_id" in payload:
+            # Fresh session per payload so once-per-session warnings don't mask verdicts
+            payload["session_id"] = f"fuzz-{seed}-{i}"
+        stdin = payload if isinstance(payload, str) else json.dumps(payload)
+
+        rc, seconds = _invoke(hook_path, stdin, timeout, subprocess_mode)
+        ms = seconds * 1000
+        latencies.append(ms)
+
+        reason = None
+        if rc is None:
+            reason = f"timeout (>{timeout:g}s)"
+        elif rc not in (ALLOW, BLOCK):
+            reason = f"crash (exit {rc})"
+        elif expected is not None and rc != expected:
+            reason = f"property: expected exit {expected}, got {rc}"
+        elif ms > budget_ms:
+            reason = f"over budget ({ms:.1f} ms > {budget_ms:g} ms)"
+        if reason:
+            flagged.append({"index": i, "reason": reason, "ms": round(ms, 2), "payload": payload})
+
+    ordered = sorted(latencies)
+    return {
+        "hook": name,
+        "count": count,
+        "budget_ms": budget_ms,
+        "p50": _percentile(ordered, 50),
+        "p90": _percentile(ordered, 90),
+        "p99": _percentile(ordered, 99),
+        "max": ordered[-1] if ordered else 0.0,
+        "mean": statistics.fmean(ordered) if ordered else 0.0,
+        "flagged": flagged,
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    subprocess_mode = "--subprocess" in args
+    count = option(args, "--count", 500, int)
+    seed = option(args, "--seed", 0, int)
+    timeout = option(args, "--timeout", 5.0, float)
+    max_size = option(args, "--max-size", 1_000_000, int)
+    default_budget = option(args, "--budget-ms", 1000.0 if subprocess_mode else 50.0, float)
+    hooks_dir = option(args, "--hooks-dir")
+    selected = [h for h in option(args, "--hooks", ",".join(FUZZ_HOOKS)).split(",") if h]
+
+    budgets = {}
+    for i, arg in enumerate(args):
+        if arg == "--budget" and i + 1 < len(args):
+            hook, _, ms = args[i + 1].partition("=")
+            try:
+                budgets[hook] = float(ms)
+            except ValueError:
+                print(f"Invalid --budget {args[i + 1]!r} (expected HOOK=MS)", file=sys.stderr)
+                return 2
+
+    manifest, _ = load_manifest(REPO_ROOT / "MANIFEST.json", types=["hooks"])
+    paths = {c["name"]: c.get("path") for c in manifest["components"].get("hooks", [])}
+
+    print(f"Fuzzing {len(selected)} hook(s): {count} payloads each, seed {seed}, "
+          f"{'subprocess' if subprocess_mode else 'in-process'}")
+    print(f"  {'hook':<28} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>9} {'budget':>8} {'flagged':>8}")
+
+    exit_code = 0
+    for name in selected:
+        if name not in GENERATORS:
+            print(f"  {name:<28} no payload generator (known: {', '.join(GENERATORS)})")
+            exit_code = 1
+            continue
+        rel = paths.get(name)
+        hook_path = Path(hooks_dir) / Path(rel).name if hooks_dir and rel else REPO_ROOT / (rel or "")
+        if not rel or not hook_path.is_file():
+            print(f"  {name:<28} missing: {hook_path}")
+            exit_code = 1
+            continue
+
+        stats = fuzz_hook(name, hook_path, count, seed, budgets.get(name, default_budget),
+                          timeout, max_size, subprocess_mode)
+        print(f"  {name:<28} {stats['p50']:>6.1f}ms {stats['p90']:>6.1f}ms {stats['p99']:>6.1f}ms "
+              f"{stats['max']:>7.1f}ms {stats['budget_ms']:>6g}ms {len(stats['flagged']):>8}")
+
+        if stats["flagged"]:
+            exit_code = 1
+            FUZZ_RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+            out = FUZZ_RESULTS_DIR / f"{name}-seed{seed}.json"
+            out.write_text(json.dumps(stats, indent=2, default=str))
+            worst = sorted(stats["flagged"], key=lambda f: -f["ms"])[:5]
+            for f in worst:
+                print(f"      #{f['index']} {f['reason']}: {_summary(f['payload'])}")
+            print(f"      all {len(stats['flagged'])} flagged payloads: {out}")
+
+    # Per-session state files the hooks left in /tmp for our synthetic sessions
+    for leftover in glob.glob(f"/tmp/*fuzz-{seed}-*"):
+        try:
+            os.remove(leftover)
+        except OSError:
+            pass
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
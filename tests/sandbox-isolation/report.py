@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Streaming results and report generation for the sandbox test runner.
+
+test_runner.py appends one JSON line per finished test to results.jsonl
+(flushed immediately), framed by a "run" header and an "end" trailer:
+
+  {"type": "run", "timestamp": ..., "environment": ..., "skipped": 0, ...}
+  {"type": "result", "name": ..., "component": ..., "status": "PASS", "detail": ..., "ms": 12.3}
+  {"type": "end", "timestamp": ...}
+
+report.json, report.md and junit.xml are all rebuilt from that stream, so a
+run killed by a sandbox timeout still yields a (partial) report. Results are
+read back one line at a time; only per-component counts and the truncated
+details for report.md are kept in memory.
+
+Usage:
+    python3 report.py [RESULTS_DIR | results.jsonl]   # Rebuild report.json, report.md, junit.xml
+"""
+
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+STREAM_NAME = "results.jsonl"
+STATUSES = ("PASS", "FAIL", "ERROR")
+
+
+class ResultStream:
+    """Append-only JSON-lines writer; every record is flushed as soon as it is written."""
+
+    def __init__(self, path: Path, **run_info):
+        self.path = path
+        self.counts = dict.fromkeys(STATUSES, 0)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({"type": "run", "timestamp": datetime.now(timezone.utc).isoformat(), **run_info})
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def add(self, name: str, component: str, status: str, detail: str, ms: float):
+        self.counts[status] += 1
+        self._write({
+            "type": "result",
+            "name": name,
+            "component": component,
+            "status": status,
+            "detail": detail,
+            "ms": round(ms, 1),
+        })
+
+    def close(self):
+        self._write({"type": "end", "timestamp": datetime.now(timezone.utc).isoformat()})
+        self._file.close()
+
+
+def iter_records(path: Path):
+    """Records from a results stream; a torn last line from a killed run is skipped."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def summarize(path: Path) -> dict:
+    """One pass over the stream: run header, totals and per-component counts."""
+    run: dict = {}
+    complete = False
+    totals = dict.fromkeys(STATUSES, 0)
+    by_component: dict[str, dict] = {}
+    for record in iter_records(path):
+        kind = record.get("type")
+        if kind == "run":
+            run = record
+        elif kind == "end":
+            complete = True
+        elif kind == "result":
+            status = record.get("status", "ERROR")
+            totals[status] = totals.get(status, 0) + 1
+            comp = by_component.setdefault(record.get("component", "?"), {**dict.fromkeys(STATUSES, 0), "ms": 0.0})
+            comp[status] = comp.get(status, 0) + 1
+            comp["ms"] += record.get("ms", 0.0)
+
+    total = sum(totals.values())
+    return {
+        "timestamp": run.get("timestamp"),
+        "environment": run.get("environment"),
+        "complete": complete,
+        "summary": {
+            "total": total,
+            "passed": totals["PASS"],
+            "failed": totals["FAIL"],
+            "errors": totals["ERROR"],
+            "skipped": run.get("skipped", 0),
+            "shard": run.get("shard"),
+            "hook_mode": run.get("hook_mode"),
+            "pass_rate": f"{totals['PASS'] / total * 100:.1f}%" if total else "N/A",
+        },
+        "components": by_component,
+    }
+
+
+def _results(path: Path):
+    return (r for r in iter_records(path) if r.get("type") == "result")
+
+
+def write_json(path: Path, summary: dict, out: Path):
+    """report.json: the summary, then results copied through one at a time."""
+    head = {k: v for k, v in summary.items() if k != "components"}
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(json.dumps(head, indent=2)[:-2] + ',\n  "results": [')
+        for i, record in enumerate(_results(path)):
+            record = {k: v for k, v in record.items() if k != "type"}
+            f.write(("," if i else "") + "\n    " + json.dumps(record))
+        f.write("\n  ]\n}\n")
+
+
+def write_markdown(path: Path, summary: dict, out: Path):
+    s = summary["summary"]
+    md = [
+        "# Sandbox Isolation Test Report",
+        "",
+        f"**Date:** {summary['timestamp']}",
+        f"**Environment:** {summary['environment']}",
+    ]
+    if not summary["complete"]:
+        md.append("**Status:** partial run (no end record; the runner was interrupted)")
+    md += [
+        "",
+        "## Summary",
+        "",
+        "| Metric | Value |",
+        "|--------|-------|",
+        f"| Total Tests | {s['total']} |",
+        f"| Passed | {s['passed']} |",
+        f"| Failed | {s['failed']} |",
+        f"| Errors | {s['errors']} |",
+        f"| Pass Rate | {s['pass_rate']} |",
+        "",
+        "## Results by Component",
+        "",
+    ]
+
+    rows: dict[str, list[str]] = {}
+    for r in _results(path):
+        detail = str(r.get("detail", ""))[:80].replace("|", "\\|")
+        rows.setdefault(r.get("component", "?"), []).append(f"| {r.get('name')} | {r.get('status')} | {detail} |")
+
+    for comp, lines in rows.items():
+        md += [f"### {comp}", "", "| Test | Status | Detail |", "|------|--------|--------|", *lines, ""]
+
+    out.write_text("\n".join(md))
+
+
+def write_junit(path: Path, summary: dict, out: Path):
+    """JUnit XML with one <testsuite> per component, streamed from the results."""
+    s = summary["summary"]
+    open_suite = None
+    with open(out, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(f'<testsuites name="sandbox-isolation" tests="{s["total"]}" '
+                f'failures="{s["failed"]}" errors="{s["errors"]}">\n')
+        for r in _results(path):
+            comp = r.get("component", "?")
+            if comp != open_suite:
+                if open_suite is not None:
+                    f.write("  </testsuite>\n")
+                counts = summary["components"][comp]
+                f.write(f'  <testsuite name={quoteattr(comp)} tests="{sum(counts[k] for k in STATUSES)}" '
+                        f'failures="{counts["FAIL"]}" errors="{counts["ERROR"]}" '
+                        f'time="{counts["ms"] / 1000:.3f}">\n')
+                open_suite = comp
+            f.write(f'    <testcase classname={quoteattr(comp)} name={quoteattr(str(r.get("name")))} '
+                    f'time="{r.get("ms", 0.0) / 1000:.3f}"')
+            status = r.get("status")
+            if status == "PASS":
+                f.write("/>\n")
+                continue
+            tag = "failure" if status == "FAIL" else "error"
+            detail = str(r.get("detail", ""))
+            f.write(f">\n      <{tag} message={quoteattr(detail[:200])}>{escape(detail)}</{tag}>\n    </testcase>\n")
+        if open_suite is not None:
+            f.write("  </testsuite>\n")
+        f.write("</testsuites>\n")
+
+
+def write_reports(results_dir: Path, stream: Path | None = None) -> dict:
+    """Rebuild report.json, report.md and junit.xml in results_dir from the stream."""
+    stream = stream or results_dir / STREAM_NAME
+    summary = summarize(stream)
+    write_json(stream, summary, results_dir / "report.json")
+    write_markdown(stream, summary, results_dir / "report.md")
+    write_junit(stream, summary, results_dir / "junit.xml")
+    return summary
+
+
+def main():
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / "results"
+    stream = target if target.is_file() else target / STREAM_NAME
+    if not stream.is_file():
+        print(f"No results stream at {stream}", file=sys.stderr)
+        return 1
+    summary = write_reports(stream.parent, stream)
+    s = summary["summary"]
+    state = "" if summary["complete"] else " (partial run)"
+    print(f"{s['passed']}/{s['total']} passed{state} -> {stream.parent}/report.json, report.md, junit.xml")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
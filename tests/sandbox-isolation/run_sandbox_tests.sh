@@ -2,95 +2,316 @@
 set -euo pipefail
 
 # Sandbox Isolation Test Orchestrator
-# Creates an E2B sandbox, uploads test subjects + fixtures, runs tests, downloads results
+# Materializes the TESTS_DIR layout (hooks/, agents/, scripts/, fixtures/,
+# results/, test_runner.py, report.py, expectations.json, MANIFEST.json) in an
+# isolated environment, runs tests, collects results.
+#
+# Usage: run_sandbox_tests.sh [--backend auto|local|bwrap|e2b] [--changed] [--shard I/N]
+#                             [--inprocess [--stub-tools]] [--no-budgets]
+#   --backend  Where to run (default: $SANDBOX_BACKEND or auto)
+#                local  temp directory, scrubbed environment (env -i)
+#                bwrap  bubblewrap namespace sandbox: read-only host, no
+#                       network, TESTS_DIR mounted at /home/user/tests
+#                e2b    remote E2B sandbox via the sbx CLI (needs network)
+#                auto   bwrap if installed, else local
+#   --changed  Only test components impacted by staged changes (per
+#              scripts/component_graph.py); exits early if none are
+#   --shard I/N
+#              Run one round-robin slice of the test matrix (default:
+#              $SANDBOX_SHARD), e.g. one per CI worker
+#   --inprocess, --stub-tools
+#              Passed to test_runner.py: call hooks in-process instead of
+#              spawning python3, optionally with external tools stubbed
+#   --no-budgets
+#              Passed to test_runner.py: do not fail hook cases that overrun
+#              their event's latency budget (.claude/hooks/_budget.py)
+#   --build-template
+#              Build a prewarmed E2B template for the current toolchain
+#              setup steps (needs the e2b CLI) and exit. Later e2b runs
+#              start from it; $E2B_TEMPLATE overrides the choice.
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 REPO_ROOT="$(cd "$SCRIPT_DIR/../.." && pwd)"
 SBX_CLI="$REPO_ROOT/references/agent-sandbox-skill/.claude/skills/agent-sandboxes/sandbox_cli"
 RESULTS_DIR="$SCRIPT_DIR/results"
+SANDBOX_TESTS_DIR="/home/user/tests"
 
-# Ensure sbx CLI deps are installed
-echo "=== Installing sbx CLI dependencies ==="
-(cd "$SBX_CLI" && uv sync --quiet)
-
-# Phase 1: Create sandbox
-echo "=== Phase 1: Creating sandbox (1hr timeout) ==="
-SBX_OUTPUT=$(cd "$SBX_CLI" && uv run sbx init --timeout 3600 2>&1)
-echo "$SBX_OUTPUT"
+BACKEND="${SANDBOX_BACKEND:-auto}"
+CHANGED=false
+SHARD="${SANDBOX_SHARD:-}"
+HOOK_ARGS=()
+BUILD_TEMPLATE=false
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --backend) BACKEND="$2"; shift 2 ;;
+        --backend=*) BACKEND="${1#*=}"; shift ;;
+        --changed) CHANGED=true; shift ;;
+        --shard) SHARD="$2"; shift 2 ;;
+        --inprocess|--stub-tools|--no-budgets) HOOK_ARGS+=("$1"); shift ;;
+        --build-template) BUILD_TEMPLATE=true; shift ;;
+        *) echo "Unknown argument: $1" >&2; exit 2 ;;
+    esac
+done
 
-# Extract sandbox ID (format varies — try common patterns)
-SBX_ID=$(echo "$SBX_OUTPUT" | grep -oP 'sbx_[a-zA-Z0-9]+' | head -1)
-if [ -z "$SBX_ID" ]; then
-    # Fallback: look for any sandbox ID-like string
-    SBX_ID=$(echo "$SBX_OUTPUT" | grep -oP '[a-z0-9]{20,}' | head -1)
+if [ "$BACKEND" = "auto" ]; then
+    if command -v bwrap >/dev/null 2>&1; then
+        BACKEND="bwrap"
+    else
+        BACKEND="local"
+    fi
 fi
 
-if [ -z "$SBX_ID" ]; then
-    echo "ERROR: Could not extract sandbox ID from output"
-    echo "Full output: $SBX_OUTPUT"
-    exit 1
+RUNNER_ARGS=("${HOOK_ARGS[@]}")
+if [ "$CHANGED" = true ]; then
+    IMPACTED=$(python3 "$REPO_ROOT/scripts/component_graph.py" --changed --format names | paste -sd, -)
+    TESTED=$(python3 "$SCRIPT_DIR/test_runner.py" --components)
+    if ! echo "$TESTED" | grep -qxF -f <(echo "$IMPACTED" | tr , '\n' | grep .); then
+        echo "No sandbox-tested components impacted by staged changes; nothing to run"
+        exit 0
+    fi
+    echo "Impacted components: $IMPACTED"
+    RUNNER_ARGS+=(--only "$IMPACTED")
+fi
+if [ -n "$SHARD" ]; then
+    RUNNER_ARGS+=(--shard "$SHARD")
 fi
-echo "Sandbox ID: $SBX_ID"
 
-# Helper function to run sbx commands
-sbx() {
-    (cd "$SBX_CLI" && uv run sbx "$@")
+# Copy test subjects, fixtures and the runner into DEST using the layout
+# test_runner.py expects. Shared by every backend.
+stage_tests_dir() {
+    local dest="$1"
+    mkdir -p "$dest/fixtures" "$dest/results"
+
+    # Hooks and agents under test, hooks.json, expectations and the MANIFEST
+    # entries they come from (the matrix decides what to copy)
+    python3 "$SCRIPT_DIR/test_runner.py" --stage "$dest"
+
+    # Fixtures
+    find "$SCRIPT_DIR/fixtures" -maxdepth 1 -type f -exec cp {} "$dest/fixtures/" \;
+
+    # Test runner, its report writer and the shared modules it imports
+    # (frontmatter parser, hook budgets)
+    cp "$SCRIPT_DIR/test_runner.py" "$SCRIPT_DIR/report.py" "$dest/"
+    cp "$REPO_ROOT/scripts/frontmatter.py" "$REPO_ROOT/.claude/hooks/_budget.py" "$dest/"
+}
+
+# Rebuild report.json, report.md and junit.xml from the streamed results.jsonl,
+# which holds every test that finished even if the run was cut short
+build_reports() {
+    if [ -f "$RESULTS_DIR/results.jsonl" ]; then
+        python3 "$SCRIPT_DIR/report.py" "$RESULTS_DIR"
+    else
+        echo "WARNING: No results.jsonl produced"
+    fi
+}
+
+# Copy the results stream out of a staged TESTS_DIR and show hook logs
+collect_results() {
+    local dest="$1"
+    echo "=== Collecting results ==="
+    mkdir -p "$RESULTS_DIR"
+    rm -f "$RESULTS_DIR/results.jsonl"
+    cp "$dest/results/results.jsonl" "$RESULTS_DIR/results.jsonl" 2>/dev/null || true
+    build_reports
+    cat "$dest/hooks/ruff_validator.log" 2>/dev/null || true
+    cat "$dest/hooks/ty_validator.log" 2>/dev/null || true
 }
 
-# Phase 2: Install dependencies in sandbox
-echo "=== Phase 2: Installing sandbox dependencies ==="
+# The only variables tests see: PATH (python3, uvx), a private HOME/TMPDIR,
+# and the host uv cache so warmed ruff/ty binaries are reused
+scrubbed_env() {
+    local home="$1"
+    printf '%s\n' "HOME=$home" "TMPDIR=$home/tmp" "PATH=$PATH" "LANG=C.UTF-8" \
+        "UV_CACHE_DIR=$UV_CACHE" "SANDBOX_TESTS_DIR=$2" "SANDBOX_ENVIRONMENT=$3"
+}
 
-# Ensure uvx is on PATH
-sbx exec "$SBX_ID" "which uvx || (which uv && ln -sf \$(which uv | sed 's/uv$/uvx/') /usr/local/bin/uvx 2>/dev/null || true)" --timeout 30 || true
+UV_CACHE="${UV_CACHE_DIR:-$HOME/.cache/uv}"
 
-# Install pyyaml for frontmatter parsing
-sbx exec "$SBX_ID" "pip install pyyaml 2>/dev/null || pip3 install pyyaml 2>/dev/null || uv pip install --system pyyaml 2>/dev/null || true" --timeout 60
+# Temp dirs for staging, removed on exit
+WORK_DIRS=()
+trap 'rm -rf "${WORK_DIRS[@]}"' EXIT
+make_work_dir() {
+    mktemp -d "${TMPDIR:-/tmp}/sandbox-tests.XXXXXX"
+}
 
-# Warm ruff and ty caches (first run downloads them)
-echo "Warming ruff cache..."
-sbx exec "$SBX_ID" "uvx ruff --version" --timeout 120 || echo "WARNING: ruff not available"
-echo "Warming ty cache..."
-sbx exec "$SBX_ID" "uvx ty --version" --timeout 120 || echo "WARNING: ty not available"
+run_local() {
+    local work
+    work="$(make_work_dir)"
+    WORK_DIRS+=("$work")
+    mkdir -p "$work/home/tmp"
 
-# Phase 3: Create directories and upload files
-echo "=== Phase 3: Uploading test files ==="
-sbx exec "$SBX_ID" "mkdir -p /home/user/tests/fixtures /home/user/tests/hooks /home/user/tests/agents /home/user/tests/results" --timeout 10
+    echo "=== Staging tests in $work/home/tests ==="
+    stage_tests_dir "$work/home/tests"
 
-# Upload hooks under test
-sbx files upload "$SBX_ID" "$REPO_ROOT/.claude/hooks/ruff-validator.py" /home/user/tests/hooks/ruff-validator.py
-sbx files upload "$SBX_ID" "$REPO_ROOT/.claude/hooks/ty-validator.py" /home/user/tests/hooks/ty-validator.py
-sbx files upload "$SBX_ID" "$REPO_ROOT/.claude/hooks/hooks.json" /home/user/tests/hooks/hooks.json
+    echo "=== Running tests (local, scrubbed environment) ==="
+    local env_vars
+    mapfile -t env_vars < <(scrubbed_env "$work/home" "$work/home/tests" "local (scrubbed env)")
+    (cd "$work/home/tests" && env -i "${env_vars[@]}" python3 test_runner.py "${RUNNER_ARGS[@]}") || true
 
-# Upload agents under test
-sbx files upload "$SBX_ID" "$REPO_ROOT/.claude/agents/meta-agent.md" /home/user/tests/agents/meta-agent.md
-sbx files upload "$SBX_ID" "$REPO_ROOT/.claude/agents/team-builder.md" /home/user/tests/agents/team-builder.md
-sbx files upload "$SBX_ID" "$REPO_ROOT/.claude/agents/team-validator.md" /home/user/tests/agents/team-validator.md
+    collect_results "$work/home/tests"
+}
 
-# Upload fixtures
-for f in "$SCRIPT_DIR/fixtures/"*; do
-    sbx files upload "$SBX_ID" "$f" "/home/user/tests/fixtures/$(basename "$f")"
-done
+run_bwrap() {
+    local work
+    work="$(make_work_dir)"
+    WORK_DIRS+=("$work")
+    mkdir -p "$work/home/tmp" "$UV_CACHE"
 
-# Upload test runner
-sbx files upload "$SBX_ID" "$SCRIPT_DIR/test_runner.py" /home/user/tests/test_runner.py
+    echo "=== Staging tests in $work/home/tests ==="
+    stage_tests_dir "$work/home/tests"
 
-# Phase 4: Run tests
-echo "=== Phase 4: Running tests ==="
-sbx exec "$SBX_ID" "cd /home/user/tests && python3 test_runner.py" --timeout 300 || true
+    echo "=== Running tests (bwrap) ==="
+    local kv setenv=()
+    while IFS= read -r kv; do
+        setenv+=(--setenv "${kv%%=*}" "${kv#*=}")
+    done < <(scrubbed_env /home/user "$SANDBOX_TESTS_DIR" "bwrap (no network, read-only host)")
 
-# Phase 5: Download results
-echo "=== Phase 5: Downloading results ==="
-mkdir -p "$RESULTS_DIR"
-sbx files download "$SBX_ID" /home/user/tests/results/report.json "$RESULTS_DIR/report.json" 2>/dev/null || echo "WARNING: Could not download report.json"
-sbx files download "$SBX_ID" /home/user/tests/results/report.md "$RESULTS_DIR/report.md" 2>/dev/null || echo "WARNING: Could not download report.md"
+    bwrap --ro-bind / / --dev /dev --proc /proc --tmpfs /tmp \
+        --tmpfs /home --bind "$work/home" /home/user --bind "$UV_CACHE" "$UV_CACHE" \
+        --unshare-all --die-with-parent --chdir "$SANDBOX_TESTS_DIR" \
+        --clearenv "${setenv[@]}" \
+        python3 test_runner.py "${RUNNER_ARGS[@]}" || true
 
-# Also grab log files for debugging
-sbx files read "$SBX_ID" /home/user/tests/hooks/ruff_validator.log 2>/dev/null || true
-sbx files read "$SBX_ID" /home/user/tests/hooks/ty_validator.log 2>/dev/null || true
+    collect_results "$work/home/tests"
+}
+
+# E2B toolchain setup. The hash of these steps keys the prewarmed template,
+# so editing them invalidates it automatically.
+SETUP_STEPS=(
+    # Ensure uvx is on PATH
+    "which uvx || (which uv && ln -sf \$(which uv | sed 's/uv\$/uvx/') /usr/local/bin/uvx 2>/dev/null || true)"
+    # pyyaml for frontmatter parsing (C loader; frontmatter.py falls back to pure Python)
+    "pip install pyyaml 2>/dev/null || pip3 install pyyaml 2>/dev/null || uv pip install --system pyyaml 2>/dev/null || true"
+    # Warm ruff and ty caches (first run downloads them)
+    "uvx ruff --version"
+    "uvx ty --version"
+)
+SETUP_HASH=$(printf '%s\n' "${SETUP_STEPS[@]}" | sha256sum | cut -c1-12)
+SETUP_STAMP="/home/user/.sandbox-setup-$SETUP_HASH"
+TEMPLATE_CACHE="$SCRIPT_DIR/.cache/e2b-templates"
+
+# Template ID previously built for the current setup hash, if any
+cached_template() {
+    [ -f "$TEMPLATE_CACHE" ] && awk -v h="$SETUP_HASH" '$1 == h { print $2 }' "$TEMPLATE_CACHE" | tail -1
+    return 0
+}
+
+# Build an E2B template whose image already ran SETUP_STEPS, and record it
+build_template() {
+    local dir name step
+    dir="$(make_work_dir)"
+    WORK_DIRS+=("$dir")
+    name="sandbox-tests-$SETUP_HASH"
+    {
+        echo "FROM ${E2B_BASE_IMAGE:-e2bdev/code-interpreter:latest}"
+        for step in "${SETUP_STEPS[@]}"; do
+            printf 'RUN %s || true\n' "$step"
+        done
+        echo "RUN touch $SETUP_STAMP"
+    } > "$dir/e2b.Dockerfile"
+
+    echo "=== Building E2B template $name ==="
+    cat "$dir/e2b.Dockerfile"
+    (cd "$dir" && e2b template build --name "$name" --dockerfile e2b.Dockerfile)
+    mkdir -p "$(dirname "$TEMPLATE_CACHE")"
+    echo "$SETUP_HASH $name" >> "$TEMPLATE_CACHE"
+    echo "Recorded template $name for setup $SETUP_HASH in $TEMPLATE_CACHE"
+}
+
+run_e2b() {
+    # Ensure sbx CLI deps are installed
+    echo "=== Installing sbx CLI dependencies ==="
+    (cd "$SBX_CLI" && uv sync --quiet)
+
+    # Phase 1: Create sandbox, from the prewarmed template when one exists
+    local template=""
+    template="${E2B_TEMPLATE:-$(cached_template)}"
+    if [ -n "$template" ]; then
+        echo "=== Phase 1: Creating sandbox from template $template (1hr timeout) ==="
+        SBX_OUTPUT=$(cd "$SBX_CLI" && uv run sbx init --template "$template" --timeout 3600 2>&1)
+    else
+        echo "=== Phase 1: Creating sandbox (1hr timeout) ==="
+        SBX_OUTPUT=$(cd "$SBX_CLI" && uv run sbx init --timeout 3600 2>&1)
+    fi
+    echo "$SBX_OUTPUT"
+
+    # Extract sandbox ID (format varies — try common patterns)
+    SBX_ID=$(echo "$SBX_OUTPUT" | grep -oP 'sbx_[a-zA-Z0-9]+' | head -1)
+    if [ -z "$SBX_ID" ]; then
+        # Fallback: look for any sandbox ID-like string
+        SBX_ID=$(echo "$SBX_OUTPUT" | grep -oP '[a-z0-9]{20,}' | head -1)
+    fi
+
+    if [ -z "$SBX_ID" ]; then
+        echo "ERROR: Could not extract sandbox ID from output"
+        echo "Full output: $SBX_OUTPUT"
+        exit 1
+    fi
+    echo "Sandbox ID: $SBX_ID"
+
+    # Helper function to run sbx commands
+    sbx() {
+        (cd "$SBX_CLI" && uv run sbx "$@")
+    }
+
+    # Phase 2: Install dependencies, unless the image already ran these exact steps
+    if sbx exec "$SBX_ID" "test -f $SETUP_STAMP" --timeout 10 >/dev/null 2>&1; then
+        echo "=== Phase 2: Sandbox prewarmed (setup $SETUP_HASH), skipping ==="
+    else
+        echo "=== Phase 2: Installing sandbox dependencies ==="
+        local step
+        for step in "${SETUP_STEPS[@]}"; do
+            echo "  $step"
+            sbx exec "$SBX_ID" "$step" --timeout 120 || echo "WARNING: setup step failed: $step"
+        done
+        sbx exec "$SBX_ID" "touch $SETUP_STAMP" --timeout 10 || true
+        if [ -z "$template" ]; then
+            echo "Tip: run with --build-template to prewarm an image for these setup steps"
+        fi
+    fi
+
+    # Phase 3: Stage locally, upload the layout as one tar stream
+    echo "=== Phase 3: Uploading test files ==="
+    local stage
+    stage="$(make_work_dir)"
+    WORK_DIRS+=("$stage")
+    stage_tests_dir "$stage/tests"
+    tar -czf "$stage/tests.tar.gz" -C "$stage/tests" .
+    sbx files upload "$SBX_ID" "$stage/tests.tar.gz" /tmp/tests.tar.gz
+    sbx exec "$SBX_ID" "mkdir -p $SANDBOX_TESTS_DIR && tar -xzf /tmp/tests.tar.gz -C $SANDBOX_TESTS_DIR && rm /tmp/tests.tar.gz" --timeout 30
+
+    # Phase 4: Run tests
+    echo "=== Phase 4: Running tests ==="
+    sbx exec "$SBX_ID" "cd $SANDBOX_TESTS_DIR && python3 test_runner.py ${RUNNER_ARGS[*]}" --timeout 300 || true
+
+    # Phase 5: Download results
+    echo "=== Phase 5: Downloading results ==="
+    mkdir -p "$RESULTS_DIR"
+    rm -f "$RESULTS_DIR/results.jsonl"
+    sbx files download "$SBX_ID" "$SANDBOX_TESTS_DIR/results/results.jsonl" "$RESULTS_DIR/results.jsonl" 2>/dev/null || true
+    build_reports
+
+    # Also grab log files for debugging
+    sbx files read "$SBX_ID" "$SANDBOX_TESTS_DIR/hooks/ruff_validator.log" 2>/dev/null || true
+    sbx files read "$SBX_ID" "$SANDBOX_TESTS_DIR/hooks/ty_validator.log" 2>/dev/null || true
+
+    # Phase 6: Cleanup
+    echo "=== Phase 6: Killing sandbox ==="
+    sbx sandbox kill "$SBX_ID"
+}
+
+if [ "$BUILD_TEMPLATE" = true ]; then
+    build_template
+    exit 0
+fi
 
-# Phase 6: Cleanup
-echo "=== Phase 6: Killing sandbox ==="
-sbx sandbox kill "$SBX_ID"
+echo "=== Backend: $BACKEND ==="
+case "$BACKEND" in
+    local) run_local ;;
+    bwrap) run_bwrap ;;
+    e2b) run_e2b ;;
+    *) echo "Unknown backend: $BACKEND (expected auto, local, bwrap or e2b)" >&2; exit 2 ;;
+esac
 
 # Show results
 echo ""
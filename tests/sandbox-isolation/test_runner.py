@@ -2,76 +2,101 @@
 """
 Sandbox Isolation Test Runner for claude-code-templates components.
 
-Tests 5 components (18 tests total):
-  1. ruff-validator hook — 5 functional tests
-  2. ty-validator hook — 5 functional tests
-  3. meta-agent config — 2 structural tests
-  4. team-builder config — 2 structural tests
-  5. team-validator config — 3 structural tests
-  6. hooks.json cross-validation — 1 test
-
-Runs INSIDE an E2B sandbox. Upload this + fixtures + subjects, then execute.
-
-Usage: python3 test_runner.py
-Output: /home/user/tests/results/report.json and report.md
+Tests are generated from expectations.json against MANIFEST.json entries:
+  - hooks: each hook runs a named suite of stdin cases (allow/block/exit),
+    each within the hook's latency budget for its MANIFEST event
+    (.claude/hooks/_budget.py)
+  - agents: frontmatter schema, body sections, forbidden tools
+  - hooks.json: tested hooks registered under their MANIFEST event
+  - lsp-pool: _lsp_pool.py against fixtures/fake_lsp.py (pooling, versioned
+    incremental sync, idle eviction, fail-open, reference cache freshness)
+  - gates: _gates.py on a scratch repo (unsatisfiable `after`, cache keys)
+  - sync-references: scripts/sync-references.py against a scratch
+    superproject whose submodules use local bare repositories as remotes
+
+Default matrix (38 tests): ruff-validator and ty-validator (5 each),
+prompt-validator (8), lsp-pool (6), gates (2), sync-references (4),
+meta-agent and team-builder (2 each), team-validator (3), hooks.json (1).
+
+Runs INSIDE a sandbox prepared by run_sandbox_tests.sh (local, bwrap or E2B
+backend). TESTS_DIR is /home/user/tests unless SANDBOX_TESTS_DIR is set.
+
+Usage: python3 test_runner.py [--only COMPONENT,...] [--shard I/N]
+  --only        Run only tests for these components (e.g. from
+                scripts/component_graph.py --changed --format names)
+  --shard I/N   Run the I-th of N round-robin slices of the matrix
+  --inprocess   Import each hook once and call its main() in-process with
+                patched stdin/stdout/env instead of spawning python3
+  --stub-tools  With --inprocess, answer external tools (uvx ...) from each
+                case's "stubs" instead of running them
+  --no-budgets  Do not fail hook cases that overrun their event budget
+  --components  List the components the matrix covers and exit
+  --stage DIR   (From a checkout) copy subjects, expectations and a MANIFEST
+                subset into DIR and exit
+Output: $TESTS_DIR/results/results.jsonl, streamed as each test finishes,
+and report.json, report.md and junit.xml built from it (see report.py)
 """
 
+import importlib.util
+import io
 import json
 import os
 import re
+import shutil
 import subprocess
 import sys
-from datetime import datetime, timezone
+import tempfile
+import time
+import traceback
 from pathlib import Path
 
-import yaml
+from report import STREAM_NAME, ResultStream, write_reports
 
-TESTS_DIR = Path("/home/user/tests")
+# Shared parser from scripts/frontmatter.py: uploaded next to this file in the
+# sandbox, found via the repo's scripts/ dir when run from a checkout
+sys.path.append(str(Path(__file__).resolve().parents[2] / "scripts"))
+from frontmatter import split_frontmatter, parse_frontmatter_text  # noqa: E402
+
+# Hook budgets from .claude/hooks/_budget.py: uploaded next to this file too
+sys.path.append(str(Path(__file__).resolve().parents[2] / ".claude" / "hooks"))
+from _budget import limit_for  # noqa: E402
+
+# Set by run_sandbox_tests.sh for backends that stage tests elsewhere
+TESTS_DIR = Path(os.environ.get("SANDBOX_TESTS_DIR", "/home/user/tests"))
 FIXTURES_DIR = TESTS_DIR / "fixtures"
 HOOKS_DIR = TESTS_DIR / "hooks"
+SCRIPTS_DIR = TESTS_DIR / "scripts"
 AGENTS_DIR = TESTS_DIR / "agents"
 RESULTS_DIR = TESTS_DIR / "results"
+EXPECTATIONS = Path(__file__).resolve().parent / "expectations.json"
+
+# Opened in main(); run_test appends one line per finished test
+stream: ResultStream | None = None
 
-results: list[dict] = []
+# --inprocess: run hooks via importlib instead of a python3 subprocess;
+# --stub-tools: apply each case's "stubs" to subprocess.run (in-process only)
+HOOK_MODE = "subprocess"
+STUB_TOOLS = False
+# --no-budgets turns off the per-case latency budget assertion
+CHECK_BUDGETS = True
 
 
 def run_test(name: str, component: str, func):
-    """Run a single test and capture result."""
+    """Run a single test and stream its result."""
+    start = time.perf_counter()
     try:
         passed, detail = func()
-        results.append({
-            "name": name,
-            "component": component,
-            "status": "PASS" if passed else "FAIL",
-            "detail": detail,
-        })
+        stream.add(name, component, "PASS" if passed else "FAIL", detail, (time.perf_counter() - start) * 1000)
         icon = "PASS" if passed else "FAIL"
         print(f"  [{icon}] {component}: {name}")
         if not passed:
             print(f"         -> {detail[:120]}")
     except Exception as e:
-        results.append({
-            "name": name,
-            "component": component,
-            "status": "ERROR",
-            "detail": str(e),
-        })
+        stream.add(name, component, "ERROR", str(e), (time.perf_counter() - start) * 1000)
         print(f"  [ERR ] {component}: {name}")
         print(f"         -> {e}")
 
 
-def run_hook(hook_path: Path, stdin_json: dict) -> tuple[str, str, int]:
-    """Run a hook script with JSON on stdin, return (stdout, stderr, returncode)."""
-    proc = subprocess.run(
-        ["python3", str(hook_path)],
-        input=json.dumps(stdin_json),
-        capture_output=True,
-        text=True,
-        timeout=60,
-    )
-    return proc.stdout.strip(), proc.stderr, proc.returncode
-
-
 def parse_hook_output(stdout: str) -> dict:
     """Parse hook JSON output, return dict."""
     if not stdout:
@@ -85,162 +110,556 @@ def parse_hook_output(stdout: str) -> dict:
 def parse_frontmatter(md_path: Path) -> tuple[dict, str]:
     """Parse YAML frontmatter from a markdown file. Returns (frontmatter_dict, full_content)."""
     content = md_path.read_text()
-    match = re.match(r"^---\s*\n(.*?)\n---\s*\n", content, re.DOTALL)
-    if not match:
+    if split_frontmatter(content)[0] is None:
         raise ValueError(f"No YAML frontmatter found in {md_path}")
-    return yaml.safe_load(match.group(1)), content
+    return parse_frontmatter_text(content), content
 
 
 # ============================================================
-# HOOK TESTS: ruff-validator
+# HOOK INVOCATION: subprocess (end-to-end) or in-process
 # ============================================================
 
+# hook path -> main() callable or code object
+_hook_modules: dict[Path, object] = {}
 
-def test_ruff_good_python():
-    """ruff-validator should ALLOW a clean Python file."""
-    stdin = {
-        "tool_name": "Write",
-        "tool_input": {"file_path": str(FIXTURES_DIR / "good_python.py")},
-    }
-    stdout, stderr, rc = run_hook(HOOKS_DIR / "ruff-validator.py", stdin)
-    output = parse_hook_output(stdout)
-    passed = "decision" not in output
-    return passed, f"rc={rc}, output={output}"
 
+def run_hook_subprocess(hook_path: Path, stdin: str, env_overrides: dict, timeout: int) -> tuple[str, str, int]:
+    """Run a hook as `python3 <hook>` and return (stdout, stderr, returncode)."""
+    env = None
+    if env_overrides:
+        env = os.environ.copy()
+        env.update(env_overrides)
+    proc = subprocess.run(
+        ["python3", str(hook_path)],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        env=env,
+    )
+    return proc.stdout, proc.stderr, proc.returncode
+
+
+def _load_hook(hook_path: Path):
+    """Return the hook's main() (module imported once), or its compiled code.
+
+    Only hooks with a __main__ guard and a main() are imported; anything else
+    would run at import time, so its code object is cached and exec'd as
+    __main__ per call instead.
+    """
+    if hook_path not in _hook_modules:
+        source = hook_path.read_text()
+        entry = None
+        if re.search(r"^if __name__ == ['\"]__main__['\"]", source, re.MULTILINE):
+            name = "hook_" + re.sub(r"\W", "_", hook_path.stem)
+            spec = importlib.util.spec_from_file_location(name, hook_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            entry = getattr(module, "main", None)
+        _hook_modules[hook_path] = entry if callable(entry) else compile(source, str(hook_path), "exec")
+    return _hook_modules[hook_path]
+
+
+def _stubbed_run(stubs: dict, real_run):
+    """subprocess.run replacement answering for stubbed executables.
+
+    stubs maps an executable name (argv[0] basename) to {"returncode",
+    "stdout", "stderr"}, or {"missing": true} to raise FileNotFoundError.
+    Anything else falls through to the real subprocess.run.
+    """
+    def run(args, *a, **kwargs):
+        argv = [args] if isinstance(args, (str, bytes)) else list(args)
+        stub = stubs.get(os.path.basename(str(argv[0]).split()[0]))
+        if stub is None:
+            return real_run(args, *a, **kwargs)
+        if stub.get("missing"):
+            raise FileNotFoundError(2, "No such file or directory", str(argv[0]))
+        text = kwargs.get("text") or kwargs.get("universal_newlines") or kwargs.get("encoding")
+        out, err = stub.get("stdout", ""), stub.get("stderr", "")
+        if not text:
+            out, err = out.encode(), err.encode()
+        rc = stub.get("returncode", 0)
+        if kwargs.get("check") and rc:
+            raise subprocess.CalledProcessError(rc, args, out, err)
+        return subprocess.CompletedProcess(args, rc, out, err)
+
+    return run
+
+
+def run_hook_inprocess(hook_path: Path, stdin: str, env_overrides: dict, stubs: dict | None) -> tuple[str, str, int]:
+    """Drive a hook's main() in this process and return (stdout, stderr, returncode).
+
+    stdin/stdout/stderr are swapped for in-memory streams, os.environ gets
+    the case's overrides (PATH lookups by subprocess/shutil.which follow it),
+    and SystemExit becomes the return code. Hooks without a main() are run
+    as __main__ from cached code. Timeouts are not enforced.
+    """
+    entry = _load_hook(hook_path)
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    saved_env = os.environ.copy()
+    saved_run = subprocess.run
+    stdout_buf, stderr_buf = io.BytesIO(), io.BytesIO()
+    sys.stdin = io.TextIOWrapper(io.BytesIO(stdin.encode()), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(stdout_buf, encoding="utf-8", write_through=True)
+    sys.stderr = io.TextIOWrapper(stderr_buf, encoding="utf-8", write_through=True)
+    os.environ.update(env_overrides)
+    if stubs:
+        subprocess.run = _stubbed_run(stubs, saved_run)
+
+    returncode = 0
+    try:
+        if callable(entry):
+            entry()
+        else:
+            exec(entry, {"__name__": "__main__", "__file__": str(hook_path)})
+    except SystemExit as e:
+        if e.code is None:
+            returncode = 0
+        elif isinstance(e.code, int):
+            returncode = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        stdout, stderr = stdout_buf.getvalue().decode(), stderr_buf.getvalue().decode()
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        os.environ.clear()
+        os.environ.update(saved_env)
+        subprocess.run = saved_run
+
+    return stdout, stderr, returncode
 
-def test_ruff_bad_lint():
-    """ruff-validator should BLOCK a file with lint errors."""
-    stdin = {
-        "tool_name": "Write",
-        "tool_input": {"file_path": str(FIXTURES_DIR / "bad_lint.py")},
-    }
-    stdout, stderr, rc = run_hook(HOOKS_DIR / "ruff-validator.py", stdin)
-    output = parse_hook_output(stdout)
-    passed = output.get("decision") == "block"
-    return passed, f"rc={rc}, output={output}"
 
+# ============================================================
+# HOOK TESTS: generated from expectations.json hook suites
+# ============================================================
 
-def test_ruff_non_python():
-    """ruff-validator should SKIP (allow) non-.py files."""
-    stdin = {
-        "tool_name": "Write",
-        "tool_input": {"file_path": str(FIXTURES_DIR / "not_python.txt")},
-    }
-    stdout, stderr, rc = run_hook(HOOKS_DIR / "ruff-validator.py", stdin)
-    output = parse_hook_output(stdout)
-    passed = "decision" not in output
-    return passed, f"rc={rc}, output={output}"
 
+def _fill(value, variables: dict):
+    """Substitute {fixtures} and hook vars into strings, recursively."""
+    if isinstance(value, str):
+        return value.format(**variables)
+    if isinstance(value, dict):
+        return {k: _fill(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, variables) for v in value]
+    return value
+
+
+def hook_case(hook_path: Path, case: dict, limit=None):
+    """Build a test that feeds one case's stdin to a hook and checks the outcome.
+
+    Case keys: stdin (dict, or raw string) or file (fixture name, sent as a
+    Write tool call), env (overrides), timeout, expect ("allow" = no decision,
+    "block" = decision block), exit (expected return code), stubs (fake
+    external tools for --inprocess --stub-tools).
+
+    With a limit (the hook's _budget.Limit for its MANIFEST event), the run
+    must also finish within it, as the _trace.py wrapper would enforce it,
+    unless --no-budgets.
+    """
+    def test():
+        if "stdin" in case:
+            stdin = case["stdin"] if isinstance(case["stdin"], str) else json.dumps(case["stdin"])
+        else:
+            stdin = json.dumps({
+                "tool_name": case.get("tool_name", "Write"),
+                "tool_input": {"file_path": str(FIXTURES_DIR / case["file"])},
+            })
+        start = time.perf_counter()
+        if HOOK_MODE == "inprocess":
+            stubs = case.get("stubs") if STUB_TOOLS else None
+            stdout, _, rc = run_hook_inprocess(hook_path, stdin, case.get("env", {}), stubs)
+        else:
+            stdout, _, rc = run_hook_subprocess(hook_path, stdin, case.get("env", {}), case.get("timeout", 60))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        output = parse_hook_output(stdout.strip())
+        if case.get("expect") == "block":
+            passed = output.get("decision") == "block"
+        else:
+            passed = "decision" not in output
+        if "exit" in case:
+            passed = passed and rc == case["exit"]
+        detail = f"rc={rc}, output={output}"
+        if limit and CHECK_BUDGETS and elapsed_ms > limit.timeout_ms:
+            return False, f"took {elapsed_ms:.0f} ms, over the {limit.timeout_ms} ms {limit.event} budget; {detail}"
+        return passed, detail
+
+    return test
 
-def test_ruff_empty_stdin():
-    """ruff-validator should handle empty stdin gracefully."""
-    proc = subprocess.run(
-        ["python3", str(HOOKS_DIR / "ruff-validator.py")],
-        input="",
-        capture_output=True,
-        text=True,
-        timeout=30,
-    )
-    output = parse_hook_output(proc.stdout.strip())
-    # Empty stdin -> no file_path -> no .py -> skip
-    passed = "decision" not in output
-    return passed, f"rc={proc.returncode}, output={output}"
+
+# ============================================================
+# LSP POOL TESTS: _lsp_pool.py driven against fixtures/fake_lsp.py
+# ============================================================
+
+POOL_WORKSPACE = {
+    "pyproject.toml": "",
+    "a.py": "def foo():\n    return 1\n",
+    "b.py": "from a import foo\n\nfoo()\n",
+    "d.py": "x = 2\n",
+}
 
 
-def test_ruff_missing_uvx():
-    """ruff-validator should gracefully skip if uvx is not on PATH."""
+def _pool_env(tmp: Path, **overrides) -> dict:
+    """Environment for one isolated pool: own socket dir, fake server, stats file."""
     env = os.environ.copy()
-    env["PATH"] = "/usr/bin:/bin"  # Exclude uvx location
-    proc = subprocess.run(
-        ["python3", str(HOOKS_DIR / "ruff-validator.py")],
-        input=json.dumps({
-            "tool_name": "Write",
-            "tool_input": {"file_path": str(FIXTURES_DIR / "good_python.py")},
-        }),
-        capture_output=True,
-        text=True,
-        timeout=30,
-        env=env,
+    env.update({
+        "CLAUDE_LSP_POOL_DIR": str(tmp / "pool"),
+        "CLAUDE_LSP_SERVERS": json.dumps({"python": [sys.executable, str(FIXTURES_DIR / "fake_lsp.py")]}),
+        "FAKE_LSP_STATS": str(tmp / "stats.json"),
+    })
+    env.update(overrides)
+    return env
+
+
+def _pool_cli(env: dict, *args: str, timeout: int = 30) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, str(HOOKS_DIR / "_lsp_pool.py"), *args], env=env,
+                          capture_output=True, text=True, timeout=timeout)
+
+
+def _fake_stats(tmp: Path) -> dict:
+    try:
+        return json.loads((tmp / "stats.json").read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _processes_with(marker: str) -> list[int]:
+    """PIDs whose command line contains marker."""
+    pids = []
+    for proc in Path("/proc").iterdir():
+        try:
+            if proc.name.isdigit() and marker in (proc / "cmdline").read_bytes().decode(errors="replace"):
+                pids.append(int(proc.name))
+        except OSError:
+            continue
+    return pids
+
+
+def pool_case(check):
+    """Build a test running check(tmp, workspace, env) in a fresh workspace and pool, stopping the daemon after."""
+    def test():
+        tmp = Path(tempfile.mkdtemp(prefix="lsp-pool-"))
+        workspace = tmp / "ws"
+        workspace.mkdir()
+        for name, text in POOL_WORKSPACE.items():
+            (workspace / name).write_text(text)
+        env = _pool_env(tmp)
+        try:
+            return check(tmp, workspace, env)
+        finally:
+            _pool_cli(env, "stop")
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    return test
+
+
+def pool_shared_server(tmp: Path, workspace: Path, env: dict):
+    """Five concurrent clients, one daemon, one initialize."""
+    procs = [subprocess.Popen([sys.executable, str(HOOKS_DIR / "_lsp_pool.py"), "symbol", str(workspace / "a.py"), "foo"],
+                              env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+             for _ in range(5)]
+    outputs = [p.communicate(timeout=30)[0] for p in procs]
+    counts = [len(out.splitlines()) for out in outputs]
+    inits = _fake_stats(tmp).get("initializations")
+    passed = all(p.returncode == 0 for p in procs) and counts == [3] * 5 and inits == 1
+    return passed, f"references per client={counts}, initializations={inits}"
+
+
+def pool_incremental_sync(tmp: Path, workspace: Path, env: dict):
+    """An edit reaches the server as one ranged, versioned didChange; diagnostics wait for it."""
+    before = _pool_cli(env, "diagnostics", str(workspace / "a.py"))
+    with open(workspace / "a.py", "a") as f:
+        f.write("x = 1  # TYPE_ERROR\n")
+    after = _pool_cli(env, "diagnostics", str(workspace / "a.py"))
+    stats = _fake_stats(tmp)
+    passed = (before.returncode == after.returncode == 0 and before.stdout.strip() == ""
+              and after.stdout.startswith(f"{workspace / 'a.py'}:3:1")
+              and stats.get("opens") == 1 and stats.get("changes") == 1 and stats.get("incremental_changes") == 1)
+    return passed, f"after={after.stdout.strip()!r}, stats={stats}"
+
+
+def pool_idle_eviction(tmp: Path, workspace: Path, env: dict):
+    """Idle servers are shut down and the daemon exits once it has none."""
+    env["CLAUDE_LSP_IDLE"] = "1"
+    first = _pool_cli(env, "symbol", str(workspace / "a.py"), "foo")
+    server_pid = _fake_stats(tmp).get("pid")
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and _pool_cli(env, "status").returncode == 0:
+        time.sleep(0.5)
+    daemon_gone = _pool_cli(env, "status").returncode != 0
+    server_gone = server_pid is not None and not Path(f"/proc/{server_pid}").exists()
+    return first.returncode == 0 and daemon_gone and server_gone, \
+        f"daemon exited={daemon_gone}, server {server_pid} exited={server_gone}"
+
+
+def pool_cold_start_isolated(tmp: Path, workspace: Path, env: dict):
+    """A server stuck in initialize does not hold up requests for another language."""
+    fake = [sys.executable, str(FIXTURES_DIR / "fake_lsp.py")]
+    env["CLAUDE_LSP_SERVERS"] = json.dumps({
+        "python": ["env", "FAKE_LSP_STARTUP_DELAY=4", *fake],
+        "typescript": fake,
+    })
+    (workspace / "c.ts").write_text("const foo = 1;\nfoo;\n")
+    cold = subprocess.Popen([sys.executable, str(HOOKS_DIR / "_lsp_pool.py"), "symbol", str(workspace / "a.py"), "foo"],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)  # cold python server is now inside its handshake
+    start = time.monotonic()
+    warm = _pool_cli(env, "symbol", str(workspace / "c.ts"), "foo")
+    elapsed = time.monotonic() - start
+    cold.wait(timeout=30)
+    return warm.returncode == 0 and elapsed < 2, f"typescript lookup took {elapsed:.1f} s during python start-up"
+
+
+def pool_fail_open(tmp: Path, workspace: Path, env: dict):
+    """A server that never answers initialize gives an error, not a hang, and leaves no process behind."""
+    marker = f"import time; time.sleep(777)  # {tmp.name}"
+    env.update({"CLAUDE_LSP_SERVERS": json.dumps({"python": [sys.executable, "-c", marker]}),
+                "CLAUDE_LSP_TIMEOUT": "1"})
+    codes = [_pool_cli(env, "symbol", str(workspace / "a.py"), "foo").returncode for _ in range(3)]
+    time.sleep(1.5)
+    _pool_cli(env, "stop")
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and _processes_with(marker):
+        time.sleep(0.2)
+    orphans = _processes_with(marker)
+    no_daemon = _pool_cli(_pool_env(tmp / "none"), "status").returncode
+    passed = codes == [1, 1, 1] and not orphans and no_daemon == 1
+    return passed, f"exit codes={codes}, orphaned servers={orphans}, status without daemon={no_daemon}"
+
+
+def pool_reference_cache(tmp: Path, workspace: Path, env: dict):
+    """Repeat lookups are cached; files written behind the pool's back still invalidate them."""
+    def lookup() -> tuple[int, bool]:
+        result = _pool_cli(env, "symbol", str(workspace / "a.py"), "foo")
+        return len(result.stdout.splitlines()), "cached" in result.stderr
+
+    steps = [lookup(), lookup()]
+    (workspace / "c.py").write_text("from a import foo\nfoo()\n")  # new referencing file, never synced
+    steps.append(lookup())
+    (workspace / "d.py").write_text("from a import foo\nx = foo()\n")  # existing file starts referencing
+    steps += [lookup(), lookup()]
+    expected = [(3, False), (3, True), (5, False), (7, False), (7, True)]
+    return steps == expected, f"(references, cached) per lookup={steps}, expected {expected}"
+
+
+POOL_CHECKS = {
+    "concurrent clients share one server": pool_shared_server,
+    "edits sync as versioned incremental didChange": pool_incremental_sync,
+    "idle servers and daemon exit": pool_idle_eviction,
+    "cold server does not block other workspaces": pool_cold_start_isolated,
+    "unresponsive server fails open without orphans": pool_fail_open,
+    "reference cache sees new referencing files": pool_reference_cache,
+}
+
+
+# ============================================================
+# REFERENCE SYNC TESTS: scripts/sync-references.py against local bare repos
+# ============================================================
+
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "sandbox", "GIT_AUTHOR_EMAIL": "sandbox@example.com",
+    "GIT_COMMITTER_NAME": "sandbox", "GIT_COMMITTER_EMAIL": "sandbox@example.com",
+}
+
+
+def _git(cwd: Path, *args: str, env: dict) -> str:
+    result = subprocess.run(["git", *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)}: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def _remote_commit(bare: Path, message: str, env: dict):
+    """Add one commit to the bare repo's main branch through a throwaway clone."""
+    work = bare.parent / f"{bare.stem}-work"
+    if not work.exists():
+        _git(bare.parent, "clone", "--quiet", bare.as_uri(), str(work), env=env)
+    (work / f"{message}.txt").write_text(message)
+    _git(work, "add", "-A", env=env)
+    _git(work, "commit", "--quiet", "-m", message, env=env)
+    _git(work, "push", "--quiet", "origin", "HEAD:main", env=env)
+
+
+def _sync_cli(env: dict, root: Path, *args: str) -> tuple[int, dict]:
+    result = subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / "sync-references.py"), "--repo-root", str(root), "--json", *args],
+        env=env, capture_output=True, text=True, timeout=120,
     )
-    output = parse_hook_output(proc.stdout.strip())
-    # FileNotFoundError -> print({}) -> allow
-    passed = "decision" not in output
-    return passed, f"rc={proc.returncode}, output={output}"
+    try:
+        report = json.loads(result.stdout)
+    except ValueError:
+        report = {"references": [], "stderr": result.stderr.strip()}
+    return result.returncode, {r["name"]: r for r in report.get("references", [])} or report
+
+
+def sync_case(check):
+    """Build a test running check(root, remotes, env) on a superproject whose
+    references/alpha submodule is one commit behind its local bare remote."""
+    def test():
+        tmp = Path(tempfile.mkdtemp(prefix="sync-references-"))
+        env = {**os.environ, **GIT_IDENTITY, "HOME": str(tmp), "GIT_CONFIG_NOSYSTEM": "1",
+               "GIT_CONFIG_COUNT": "1", "GIT_CONFIG_KEY_0": "protocol.file.allow",
+               "GIT_CONFIG_VALUE_0": "always"}
+        try:
+            remotes = tmp / "remotes"
+            remotes.mkdir()
+            bare = remotes / "alpha.git"
+            _git(remotes, "init", "--quiet", "--bare", "-b", "main", str(bare), env=env)
+            _git(bare, "config", "uploadpack.allowFilter", "true", env=env)
+            _remote_commit(bare, "first", env)
+
+            root = tmp / "super"
+            root.mkdir()
+            _git(root, "init", "--quiet", "-b", "main", env=env)
+            _git(root, "submodule", "--quiet", "add", bare.as_uri(), "references/alpha", env=env)
+            _git(root, "commit", "--quiet", "-m", "add alpha", env=env)
+            _remote_commit(bare, "second", env)
+            return check(root, bare, env)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    return test
+
+
+def sync_updates_full_clone(root: Path, bare: Path, env: dict):
+    """A behind full clone is checked out at the remote tip and gets no promisor filter."""
+    code, refs = _sync_cli(env, root)
+    alpha = refs.get("alpha", {})
+    sub = root / "references" / "alpha"
+    head = _git(sub, "rev-parse", "HEAD", env=env)
+    tip = _git(bare, "rev-parse", "main", env=env)
+    promisor = subprocess.run(["git", "config", "--get", "remote.origin.promisor"], cwd=sub, env=env,
+                              capture_output=True, text=True).stdout.strip()
+    ok = code == 0 and alpha.get("status") == "updated" and alpha.get("behind") == 1 and head == tip and not promisor
+    return ok, f"exit={code} status={alpha.get('status')} behind={alpha.get('behind')} " \
+               f"at_tip={head == tip} promisor={promisor or 'unset'}"
+
+
+def sync_keeps_partial_clone(root: Path, bare: Path, env: dict):
+    """A blob-less clone is fetched with its filter and stays partial."""
+    sub = root / "references" / "alpha"
+    shutil.rmtree(sub)
+    _git(root, "clone", "--quiet", "--filter=blob:none", bare.as_uri(), str(sub), env=env)
+    _git(sub, "checkout", "--quiet", "--detach", "HEAD~1", env=env)
+    _remote_commit(bare, "third", env)
+    code, refs = _sync_cli(env, root)
+    alpha = refs.get("alpha", {})
+    head = _git(sub, "rev-parse", "HEAD", env=env)
+    tip = _git(bare, "rev-parse", "main", env=env)
+    filter_spec = _git(sub, "config", "--get", "remote.origin.partialclonefilter", env=env)
+    ok = code == 0 and alpha.get("status") == "updated" and alpha.get("behind") == 2 \
+        and head == tip and filter_spec == "blob:none"
+    return ok, f"exit={code} status={alpha.get('status')} behind={alpha.get('behind')} " \
+               f"at_tip={head == tip} filter={filter_spec}"
+
+
+def sync_status_only(root: Path, bare: Path, env: dict):
+    """--status-only reports the submodule behind and leaves its checkout alone."""
+    sub = root / "references" / "alpha"
+    before = _git(sub, "rev-parse", "HEAD", env=env)
+    code, refs = _sync_cli(env, root, "--status-only")
+    first = refs.get("alpha", {})
+    after = _git(sub, "rev-parse", "HEAD", env=env)
+    _sync_cli(env, root)
+    code_again, refs_again = _sync_cli(env, root, "--status-only")
+    again = refs_again.get("alpha", {})
+    ok = code == 0 and first.get("status") == "behind" and first.get("behind") == 1 and before == after \
+        and code_again == 0 and again.get("status") == "up-to-date"
+    return ok, f"status={first.get('status')} behind={first.get('behind')} moved={before != after}, " \
+               f"after sync: {again.get('status')}"
+
+
+def sync_unreachable_remote(root: Path, bare: Path, env: dict):
+    """A remote that is gone reports an error and a non-zero exit, keeping the current commit."""
+    sub = root / "references" / "alpha"
+    _git(sub, "remote", "set-url", "origin", (bare.parent / "missing.git").as_uri(), env=env)
+    code, refs = _sync_cli(env, root)
+    alpha = refs.get("alpha", {})
+    ok = code == 1 and alpha.get("status") == "error" and bool(alpha.get("error")) and bool(alpha.get("current"))
+    return ok, f"exit={code} status={alpha.get('status')} error={alpha.get('error')!r}"
+
+
+SYNC_CHECKS = {
+    "behind full clone is updated without a filter": sync_updates_full_clone,
+    "partial clone stays partial": sync_keeps_partial_clone,
+    "status-only reports without checkout": sync_status_only,
+    "unreachable remote is an error": sync_unreachable_remote,
+}
 
 
 # ============================================================
-# HOOK TESTS: ty-validator
+# GATE TESTS: .claude/hooks/_gates.py on a scratch repo's .claude/gates.json
 # ============================================================
 
 
-def test_ty_good_python():
-    """ty-validator should ALLOW a type-correct Python file."""
-    stdin = {
-        "tool_name": "Write",
-        "tool_input": {"file_path": str(FIXTURES_DIR / "good_python.py")},
-    }
-    stdout, stderr, rc = run_hook(HOOKS_DIR / "ty-validator.py", stdin)
-    output = parse_hook_output(stdout)
-    passed = "decision" not in output
-    return passed, f"rc={rc}, output={output}"
+def _gates_repo(tmp: Path, checks: list[dict], env: dict) -> Path:
+    root = tmp / "repo"
+    (root / ".claude").mkdir(parents=True)
+    (root / ".claude" / "gates.json").write_text(json.dumps({"checks": checks}))
+    _git(root, "init", "--quiet", env=env)
+    _git(root, "add", "-A", env=env)
+    _git(root, "commit", "--quiet", "-m", "gates", env=env)
+    return root
 
 
-def test_ty_bad_types():
-    """ty-validator should BLOCK a file with type errors."""
-    stdin = {
-        "tool_name": "Write",
-        "tool_input": {"file_path": str(FIXTURES_DIR / "bad_types.py")},
-    }
-    stdout, stderr, rc = run_hook(HOOKS_DIR / "ty-validator.py", stdin)
-    output = parse_hook_output(stdout)
-    passed = output.get("decision") == "block"
-    return passed, f"rc={rc}, output={output}"
+def _gates_cli(root: Path, env: dict, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, str(HOOKS_DIR / "_gates.py"), "--root", str(root), *args],
+                          env=env, capture_output=True, text=True, timeout=60)
 
 
-def test_ty_non_python():
-    """ty-validator should SKIP non-.py files."""
-    stdin = {
-        "tool_name": "Write",
-        "tool_input": {"file_path": str(FIXTURES_DIR / "not_python.txt")},
-    }
-    stdout, stderr, rc = run_hook(HOOKS_DIR / "ty-validator.py", stdin)
-    output = parse_hook_output(stdout)
-    passed = "decision" not in output
-    return passed, f"rc={rc}, output={output}"
+def gates_case(check):
+    """Build a test running check(tmp, env) with git identity and a throwaway HOME."""
+    def test():
+        tmp = Path(tempfile.mkdtemp(prefix="gates-"))
+        env = {**os.environ, **GIT_IDENTITY, "HOME": str(tmp), "GIT_CONFIG_NOSYSTEM": "1"}
+        try:
+            return check(tmp, env)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
 
+    return test
 
-def test_ty_empty_stdin():
-    """ty-validator should handle empty stdin gracefully."""
-    proc = subprocess.run(
-        ["python3", str(HOOKS_DIR / "ty-validator.py")],
-        input="",
-        capture_output=True,
-        text=True,
-        timeout=30,
-    )
-    output = parse_hook_output(proc.stdout.strip())
-    passed = "decision" not in output
-    return passed, f"rc={proc.returncode}, output={output}"
 
+CYCLIC_CHECKS = [
+    {"name": "x", "run": "echo x", "after": ["y"]},
+    {"name": "y", "run": "echo y", "after": ["x"]},
+    {"name": "z", "run": "echo z"},
+]
 
-def test_ty_missing_uvx():
-    """ty-validator should gracefully skip if uvx is not on PATH."""
-    env = os.environ.copy()
-    env["PATH"] = "/usr/bin:/bin"
-    proc = subprocess.run(
-        ["python3", str(HOOKS_DIR / "ty-validator.py")],
-        input=json.dumps({
-            "tool_name": "Write",
-            "tool_input": {"file_path": str(FIXTURES_DIR / "good_python.py")},
-        }),
-        capture_output=True,
-        text=True,
-        timeout=30,
-        env=env,
-    )
-    output = parse_hook_output(proc.stdout.strip())
-    passed = "decision" not in output
-    return passed, f"rc={proc.returncode}, output={output}"
+
+def gates_cyclic_after(tmp: Path, env: dict):
+    """Checks whose `after` can never be satisfied block the gate as errors."""
+    root = _gates_repo(tmp, CYCLIC_CHECKS, env)
+    result = _gates_cli(root, env, "--no-cache")
+    reported = dict((name, status) for status, name in re.findall(r"^\s*\[(\w+)\s*\]\s+(\S+)", result.stdout, re.M))
+    statuses = {name: reported.get(name) for name in ("x", "y", "z")}
+    ok = result.returncode == 1 and statuses == {"x": "ERROR", "y": "ERROR", "z": "PASS"} \
+        and "unsatisfiable after" in result.stdout
+    return ok, f"exit={result.returncode} statuses={statuses}"
+
+
+def gates_cache_keys(tmp: Path, env: dict):
+    """Cached results land under their own check's key, also when some checks never ran."""
+    root = _gates_repo(tmp, CYCLIC_CHECKS, env)
+    _gates_cli(root, env)
+    cache_files = list((root / ".git" / "claude-gates").glob("*.json"))
+    cache = json.loads(cache_files[0].read_text()) if len(cache_files) == 1 else {}
+    keys = sorted(key.replace("\0", " | ") for key in cache)
+    again = _gates_cli(root, env)
+    ok = keys == ["z | echo z"] and again.returncode == 1 and "(cached)" in again.stdout
+    return ok, f"cached keys={keys} rerun exit={again.returncode}"
+
+
+GATE_CHECKS = {
+    "cyclic after is a blocking error": gates_cyclic_after,
+    "results are cached under their own check": gates_cache_keys,
+}
 
 
 # ============================================================
@@ -336,34 +755,157 @@ def validate_body_sections(
 # ============================================================
 
 
-def test_hooks_json_consistency():
-    """Verify ruff/ty validators registered in hooks.json with correct matchers."""
-    hooks_data = json.loads((HOOKS_DIR / "hooks.json").read_text())
-    issues: list[str] = []
+def hooks_json_registration(expected: dict[str, tuple[str, str]]):
+    """Build a test that each hook is registered under its MANIFEST event with the expected matcher."""
+    def test():
+        hooks_data = json.loads((HOOKS_DIR / "hooks.json").read_text())
+        issues: list[str] = []
+        found: set[str] = set()
+
+        for event, groups in hooks_data.get("hooks", {}).items():
+            for group in groups:
+                matcher = group.get("matcher", "")
+                for hook in group.get("hooks", []):
+                    cmd = hook.get("command", "")
+                    for name, (want_event, want_matcher) in expected.items():
+                        if name in cmd and event == want_event:
+                            found.add(name)
+                            if matcher != want_matcher:
+                                issues.append(f"{name} matcher='{matcher}', expected '{want_matcher}'")
+
+        for name, (event, _) in expected.items():
+            if name not in found:
+                issues.append(f"{name} not in {event}")
+
+        if issues:
+            return False, "; ".join(issues)
+        return True, f"{len(expected)} hooks registered with expected matchers"
+
+    return test
+
+
+# ============================================================
+# TEST MATRIX: MANIFEST.json entries x expectations.json
+# ============================================================
 
-    post_hooks = hooks_data.get("hooks", {}).get("PostToolUse", [])
 
-    ruff_found = False
-    ty_found = False
-    for group in post_hooks:
-        matcher = group.get("matcher", "")
-        for hook in group.get("hooks", []):
-            cmd = hook.get("command", "")
-            if "ruff-validator" in cmd:
-                ruff_found = True
-                if matcher != "Write|Edit":
-                    issues.append(f"ruff matcher='{matcher}', expected 'Write|Edit'")
-            if "ty-validator" in cmd:
-                ty_found = True
-                if matcher != "Write|Edit":
-                    issues.append(f"ty matcher='{matcher}', expected 'Write|Edit'")
+def load_components() -> dict[str, dict]:
+    """MANIFEST hooks and agents by name (staged copy in the sandbox, repo copy otherwise)."""
+    staged = TESTS_DIR / "MANIFEST.json"
+    if staged.exists():
+        manifest = json.loads(staged.read_text())
+    else:
+        # Running from a checkout: handles a sharded MANIFEST too
+        from manifest_index import load_manifest
+
+        manifest, _ = load_manifest(types=["hooks", "agents"])
+    return {
+        comp["name"]: comp
+        for comps in manifest.get("components", {}).values()
+        for comp in comps
+    }
 
-    if not ruff_found:
-        issues.append("ruff-validator not in PostToolUse")
-    if not ty_found:
-        issues.append("ty-validator not in PostToolUse")
 
-    return len(issues) == 0, "; ".join(issues) if issues else "both registered with Write|Edit matcher"
+def build_matrix(expectations: dict, components: dict[str, dict]) -> list[tuple[str, str, object]]:
+    """Expand expectations into (test name, component, test function) in a stable order."""
+    matrix = []
+
+    def missing(name: str):
+        return lambda: (False, f"'{name}' not found in MANIFEST.json")
+
+    registrations = {}
+    for name, spec in expectations.get("hooks", {}).items():
+        comp = components.get(name)
+        if comp is None:
+            matrix.append(("registered in MANIFEST", name, missing(name)))
+            continue
+        hook_path = HOOKS_DIR / Path(comp["path"]).name
+        variables = {"fixtures": str(FIXTURES_DIR), **spec.get("vars", {})}
+        limit = limit_for(comp.get("event"), name)
+        for case in expectations["hook_suites"][spec["suite"]] + spec.get("cases", []):
+            case = _fill(case, variables)
+            matrix.append((case["name"], name, hook_case(hook_path, case, limit)))
+        if "matcher" in spec:
+            registrations[name] = (comp.get("event"), spec["matcher"])
+
+    if "lsp_pool" in expectations:
+        for case in expectations["lsp_pool"]["cases"]:
+            matrix.append((case, "lsp-pool", pool_case(POOL_CHECKS[case])))
+
+    if "gates" in expectations:
+        for case in expectations["gates"]["cases"]:
+            matrix.append((case, "gates", gates_case(GATE_CHECKS[case])))
+
+    if "sync_references" in expectations:
+        for case in expectations["sync_references"]["cases"]:
+            matrix.append((case, "sync-references", sync_case(SYNC_CHECKS[case])))
+
+    for name, spec in expectations.get("agents", {}).items():
+        comp = components.get(name)
+        if comp is None:
+            matrix.append(("registered in MANIFEST", name, missing(name)))
+            continue
+        md_path = AGENTS_DIR / Path(comp["path"]).name
+        matrix.append(("frontmatter schema", name, lambda p=md_path, s=spec: validate_frontmatter(
+            p, expected_tools=s.get("tools"), expected_model=s.get("model"), expected_color=s.get("color"),
+        )))
+        if spec.get("sections"):
+            matrix.append(("body sections", name, lambda p=md_path, s=spec: validate_body_sections(p, s["sections"])))
+        if spec.get("forbidden_tools"):
+            label = "/".join(t.lower() for t in spec["forbidden_tools"])
+            matrix.append((f"no {label} tools (read-only)", name, lambda p=md_path, s=spec: validate_frontmatter(
+                p, forbidden_tools=s["forbidden_tools"],
+            )))
+
+    if registrations and "hooks_json" in expectations:
+        matrix.append((expectations["hooks_json"]["name"], "hooks.json", hooks_json_registration(registrations)))
+
+    return matrix
+
+
+def subjects(expectations: dict, components: dict[str, dict]) -> list[tuple[str, str]]:
+    """(repo path, TESTS_DIR path) for every file the matrix tests."""
+    files = []
+    for section, subdir in (("hooks", "hooks"), ("agents", "agents")):
+        for name, spec in expectations.get(section, {}).items():
+            if name in components:
+                path = components[name]["path"]
+                files.append((path, f"{subdir}/{Path(path).name}"))
+                for helper in spec.get("helpers", []):
+                    files.append((str(Path(path).parent / helper), f"{subdir}/{helper}"))
+    for section in ("lsp_pool", "gates"):
+        for helper in expectations.get(section, {}).get("helpers", []):
+            files.append((f".claude/hooks/{helper}", f"hooks/{helper}"))
+    # Staged at their repo paths, so scripts import their sibling helpers as in a checkout
+    for path in expectations.get("sync_references", {}).get("files", []):
+        files.append((path, path))
+    if "hooks_json" in expectations:
+        files.append((".claude/hooks/hooks.json", "hooks/hooks.json"))
+    return files
+
+
+def stage(dest: Path, expectations: dict, components: dict[str, dict]):
+    """Copy test subjects, expectations and a MANIFEST subset into dest (run from a checkout)."""
+    repo_root = Path(__file__).resolve().parents[2]
+    for src, rel in subjects(expectations, components):
+        (dest / rel).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(repo_root / src, dest / rel)
+    shutil.copyfile(EXPECTATIONS, dest / "expectations.json")
+
+    tested = set(expectations.get("hooks", {})) | set(expectations.get("agents", {}))
+    subset: dict[str, list] = {}
+    for name in tested & set(components):
+        comp_type = "hooks" if name in expectations.get("hooks", {}) else "agents"
+        subset.setdefault(comp_type, []).append(components[name])
+    (dest / "MANIFEST.json").write_text(json.dumps({"components": subset}, indent=2))
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """'2/4' -> (1, 4): zero-based shard index and shard count."""
+    index, count = (int(x) for x in value.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError(f"invalid shard {value}: expected i/n with 1 <= i <= n")
+    return index - 1, count
 
 
 # ============================================================
@@ -372,178 +914,87 @@ def test_hooks_json_consistency():
 
 
 def main():
+    expectations = json.loads(EXPECTATIONS.read_text())
+    components = load_components()
+
+    if "--stage" in sys.argv:
+        stage(Path(sys.argv[sys.argv.index("--stage") + 1]), expectations, components)
+        return
+    if "--components" in sys.argv:
+        matrix_components = dict.fromkeys(c for _, c, _ in build_matrix(expectations, components))
+        print("\n".join(matrix_components))
+        return
+
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
+    # Components selected with --only; None runs everything
+    only = None
+    if "--only" in sys.argv:
+        idx = sys.argv.index("--only")
+        only = set(filter(None, sys.argv[idx + 1].split(","))) if idx + 1 < len(sys.argv) else set()
+        # hooks.json cross-validation covers the registration of the tested hooks
+        if only & set(expectations.get("hooks", {})):
+            only.add("hooks.json")
+
+    global HOOK_MODE, STUB_TOOLS, CHECK_BUDGETS
+    if "--inprocess" in sys.argv:
+        HOOK_MODE = "inprocess"
+    STUB_TOOLS = "--stub-tools" in sys.argv
+    CHECK_BUDGETS = "--no-budgets" not in sys.argv
+
+    shard = None
+    if "--shard" in sys.argv:
+        shard = parse_shard(sys.argv[sys.argv.index("--shard") + 1])
+
     print("=" * 60)
     print("SANDBOX ISOLATION TEST RUNNER")
     print("=" * 60)
 
-    # --- ruff-validator ---
-    print("\n--- ruff-validator (5 tests) ---")
-    run_test("clean file -> allow", "ruff-validator", test_ruff_good_python)
-    run_test("lint errors -> block", "ruff-validator", test_ruff_bad_lint)
-    run_test("non-.py -> skip", "ruff-validator", test_ruff_non_python)
-    run_test("empty stdin -> allow", "ruff-validator", test_ruff_empty_stdin)
-    run_test("missing uvx -> graceful", "ruff-validator", test_ruff_missing_uvx)
-
-    # --- ty-validator ---
-    print("\n--- ty-validator (5 tests) ---")
-    run_test("clean file -> allow", "ty-validator", test_ty_good_python)
-    run_test("type errors -> block", "ty-validator", test_ty_bad_types)
-    run_test("non-.py -> skip", "ty-validator", test_ty_non_python)
-    run_test("empty stdin -> allow", "ty-validator", test_ty_empty_stdin)
-    run_test("missing uvx -> graceful", "ty-validator", test_ty_missing_uvx)
-
-    # --- meta-agent ---
-    print("\n--- meta-agent (2 tests) ---")
-    run_test(
-        "frontmatter schema",
-        "meta-agent",
-        lambda: validate_frontmatter(
-            AGENTS_DIR / "meta-agent.md",
-            expected_tools=["Write", "Read", "Glob", "Grep", "WebFetch"],
-            expected_model="opus",
-            expected_color="cyan",
-        ),
-    )
-    run_test(
-        "body sections",
-        "meta-agent",
-        lambda: validate_body_sections(
-            AGENTS_DIR / "meta-agent.md",
-            ["Purpose", "Instructions", "Output Format"],
-        ),
-    )
-
-    # --- team-builder ---
-    print("\n--- team-builder (2 tests) ---")
-    run_test(
-        "frontmatter schema",
-        "team-builder",
-        lambda: validate_frontmatter(
-            AGENTS_DIR / "team-builder.md",
-            expected_tools=[
-                "Read", "Write", "Edit", "Glob", "Grep", "Bash",
-                "TaskGet", "TaskUpdate", "TaskList", "SendMessage",
-            ],
-            expected_model="opus",
-            expected_color="cyan",
-        ),
-    )
-    run_test(
-        "body sections",
-        "team-builder",
-        lambda: validate_body_sections(
-            AGENTS_DIR / "team-builder.md",
-            ["Purpose", "Instructions", "Workflow", "Report"],
-        ),
-    )
-
-    # --- team-validator ---
-    print("\n--- team-validator (3 tests) ---")
-    run_test(
-        "frontmatter schema",
-        "team-validator",
-        lambda: validate_frontmatter(
-            AGENTS_DIR / "team-validator.md",
-            expected_tools=[
-                "Read", "Glob", "Grep", "Bash",
-                "TaskGet", "TaskUpdate", "TaskList", "SendMessage",
-            ],
-            expected_model="opus",
-            expected_color="yellow",
-        ),
-    )
-    run_test(
-        "body sections",
-        "team-validator",
-        lambda: validate_body_sections(
-            AGENTS_DIR / "team-validator.md",
-            ["Purpose", "Instructions", "Workflow", "Report"],
-        ),
-    )
-    run_test(
-        "no write/edit tools (read-only)",
-        "team-validator",
-        lambda: validate_frontmatter(
-            AGENTS_DIR / "team-validator.md",
-            forbidden_tools=["Write", "Edit"],
-        ),
+    matrix = build_matrix(expectations, components)
+    total_matrix = len(matrix)
+    if only is not None:
+        matrix = [t for t in matrix if t[1] in only]
+    if shard:
+        # Round-robin over the full matrix so every shard gets a mix of slow
+        # hook tests and fast structural ones
+        matrix = [t for i, t in enumerate(matrix) if i % shard[1] == shard[0]]
+        print(f"Shard {shard[0] + 1}/{shard[1]}: {len(matrix)} test(s)")
+
+    skipped = total_matrix - len(matrix)
+
+    global stream
+    stream = ResultStream(
+        RESULTS_DIR / STREAM_NAME,
+        environment=os.environ.get("SANDBOX_ENVIRONMENT", "E2B sandbox (fullstack-vue-fastapi-node22)"),
+        skipped=skipped,
+        shard=f"{shard[0] + 1}/{shard[1]}" if shard else None,
+        hook_mode=HOOK_MODE + ("+stubs" if STUB_TOOLS else ""),
     )
 
-    # --- hooks.json ---
-    print("\n--- hooks.json cross-validation (1 test) ---")
-    run_test("ruff/ty registered correctly", "hooks.json", test_hooks_json_consistency)
+    by_component: dict[str, list] = {}
+    for name, component, func in matrix:
+        by_component.setdefault(component, []).append((name, func))
+    for component, tests in by_component.items():
+        print(f"\n--- {component} ({len(tests)} test{'s' if len(tests) != 1 else ''}) ---")
+        for name, func in tests:
+            run_test(name, component, func)
+    stream.close()
 
     # ============================================================
-    # Generate reports
+    # Generate reports (from the stream, as report.py does for partial runs)
     # ============================================================
-    total = len(results)
-    passed = sum(1 for r in results if r["status"] == "PASS")
-    failed = sum(1 for r in results if r["status"] == "FAIL")
-    errors = sum(1 for r in results if r["status"] == "ERROR")
-    pass_rate = f"{passed / total * 100:.1f}%" if total else "N/A"
-
-    report = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "environment": "E2B sandbox (fullstack-vue-fastapi-node22)",
-        "summary": {
-            "total": total,
-            "passed": passed,
-            "failed": failed,
-            "errors": errors,
-            "pass_rate": pass_rate,
-        },
-        "results": results,
-    }
-
-    # JSON report
-    (RESULTS_DIR / "report.json").write_text(json.dumps(report, indent=2))
-
-    # Markdown report
-    md = [
-        "# Sandbox Isolation Test Report",
-        "",
-        f"**Date:** {report['timestamp']}",
-        f"**Environment:** {report['environment']}",
-        "",
-        "## Summary",
-        "",
-        "| Metric | Value |",
-        "|--------|-------|",
-        f"| Total Tests | {total} |",
-        f"| Passed | {passed} |",
-        f"| Failed | {failed} |",
-        f"| Errors | {errors} |",
-        f"| Pass Rate | {pass_rate} |",
-        "",
-        "## Results by Component",
-        "",
-    ]
-
-    components: dict[str, list[dict]] = {}
-    for r in results:
-        components.setdefault(r["component"], []).append(r)
-
-    for comp, tests in components.items():
-        md.append(f"### {comp}")
-        md.append("")
-        md.append("| Test | Status | Detail |")
-        md.append("|------|--------|--------|")
-        for t in tests:
-            detail = t["detail"][:80].replace("|", "\\|")
-            md.append(f"| {t['name']} | {t['status']} | {detail} |")
-        md.append("")
-
-    (RESULTS_DIR / "report.md").write_text("\n".join(md))
+    summary = write_reports(RESULTS_DIR)["summary"]
+    passed, total, pass_rate = summary["passed"], summary["total"], summary["pass_rate"]
 
     # Final console summary
     print(f"\n{'=' * 60}")
     print(f"RESULTS: {passed}/{total} passed ({pass_rate})")
+    if skipped:
+        print(f"Skipped: {skipped} (outside --only/--shard selection)")
     print(f"{'=' * 60}")
-    print(f"Reports: {RESULTS_DIR / 'report.json'} | {RESULTS_DIR / 'report.md'}")
+    print(f"Reports: {RESULTS_DIR / 'report.json'} | {RESULTS_DIR / 'report.md'} | {RESULTS_DIR / 'junit.xml'}")
 
-    sys.exit(0 if failed == 0 and errors == 0 else 1)
+    sys.exit(0 if summary["failed"] == 0 and summary["errors"] == 0 else 1)
 
 
 if __name__ == "__main__":